@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext as _
-from .models import User
+
+from core.paginators import EstimatedCountPaginator
+from .models import User, AuthToken
 
 
 class UserAdmin(BaseUserAdmin):
@@ -22,3 +24,14 @@ class UserAdmin(BaseUserAdmin):
 
 
 admin.site.register(User, UserAdmin)
+
+
+@admin.register(AuthToken)
+class AuthTokenAdmin(admin.ModelAdmin):
+    """token admin panel, the table is big so the rows are not counted"""
+    list_display = ('user', 'created', 'expires', 'last_used')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    readonly_fields = ('key', 'created', 'last_used')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
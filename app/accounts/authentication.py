@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import authentication, exceptions
+
+from core.routers import use_primary
+from .models import AuthToken
+
+
+class ExpiringTokenAuthentication(authentication.TokenAuthentication):
+    """
+        Token authentication rejecting expired tokens, the last use of a
+        token is only written when the saved one is older than
+        AUTH_TOKEN_LAST_USED_INTERVAL so requests do not all write
+    """
+    model = AuthToken
+
+    def get_token(self, key):
+        tokens = AuthToken.objects.select_related('user')
+        try:
+            return tokens.get(key=key)
+        except AuthToken.DoesNotExist:
+            # a token issued a moment ago may not be on the replica yet
+            with use_primary():
+                return tokens.filter(key=key).first()
+
+    def authenticate_credentials(self, key):
+        token = self.get_token(key)
+        if token is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+
+        now = timezone.now()
+        if token.expires <= now:
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        if token.last_used is None or (now - token.last_used).total_seconds() \
+                >= settings.AUTH_TOKEN_LAST_USED_INTERVAL:
+            AuthToken.objects.filter(pk=token.pk).update(last_used=now)
+            token.last_used = now
+        return token.user, token
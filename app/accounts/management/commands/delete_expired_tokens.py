@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import AuthToken
+from core.routers import use_primary
+
+
+class Command(BaseCommand):
+    """
+        Django command to delete the expired API tokens. They are deleted by
+        primary key in small batches, each in its own transaction, so the
+        rows and the index are never locked for long
+    """
+    help = 'Delete the expired authentication tokens in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0,
+                            help='seconds to wait between batches')
+
+    def handle(self, *args, **options):
+        now, deleted = timezone.now(), 0
+        expired = AuthToken.objects.filter(expires__lte=now).order_by()
+        with use_primary():
+            while True:
+                keys = list(expired.values_list('key', flat=True)
+                            [:options['batch_size']])
+                if not keys:
+                    break
+                deleted += AuthToken.objects.filter(pk__in=keys).delete()[0]
+                if options['pause']:
+                    time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{deleted} expired tokens deleted'))
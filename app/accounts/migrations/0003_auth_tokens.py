@@ -0,0 +1,57 @@
+# Generated by Django 3.2.5 on 2026-10-19 16:21
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def copy_drf_tokens(apps, schema_editor):
+    """
+        Carry the DRF tokens over so the clients stay logged in, they expire
+        AUTH_TOKEN_TTL after they were created like the new tokens. created
+        is set after the insert, auto_now_add would overwrite it
+    """
+    alias = schema_editor.connection.alias
+    Token = apps.get_model('authtoken', 'Token')
+    AuthToken = apps.get_model('accounts', 'AuthToken')
+    ttl = timedelta(seconds=settings.AUTH_TOKEN_TTL)
+    tokens = Token.objects.using(alias).order_by('key')
+    last = ''
+    while True:
+        batch = list(tokens.filter(key__gt=last)[:BATCH_SIZE])
+        if not batch:
+            break
+        copies = AuthToken.objects.using(alias).bulk_create([
+            AuthToken(key=token.key, user_id=token.user_id,
+                      expires=token.created + ttl)
+            for token in batch])
+        for copy, token in zip(copies, batch):
+            copy.created = token.created
+        AuthToken.objects.using(alias).bulk_update(copies, ['created'])
+        last = batch[-1].key
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_updated'),
+        ('authtoken', '0003_tokenproxy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('expires', models.DateTimeField(db_index=True)),
+                ('last_used', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auth_tokens', to='accounts.user')),
+            ],
+        ),
+        migrations.RunPython(copy_drf_tokens, migrations.RunPython.noop),
+    ]
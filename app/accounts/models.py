@@ -1,4 +1,10 @@
+import binascii
+import os
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
 
@@ -30,7 +36,42 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=100)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # changes on every save, it is the version of the profile for ETags
+    updated = models.DateTimeField(auto_now=True)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
+
+
+class AuthTokenManager(models.Manager):
+    def issue(self, user):
+        """Create a token for the user expiring after AUTH_TOKEN_TTL"""
+        ttl = timedelta(seconds=settings.AUTH_TOKEN_TTL)
+        return self.create(key=binascii.hexlify(os.urandom(20)).decode(),
+                           user=user, expires=timezone.now() + ttl)
+
+
+class AuthToken(models.Model):
+    """
+        Expiring API token, unlike the DRF token a user may have a token per
+        device. The key is the primary key so authentication is a single
+        index lookup, expired tokens are deleted through the expires index
+    """
+    key = models.CharField(max_length=40, primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             related_name='auth_tokens',
+                             on_delete=models.CASCADE)
+    created = models.DateTimeField(auto_now_add=True)
+    expires = models.DateTimeField(db_index=True)
+    # saved at most once per AUTH_TOKEN_LAST_USED_INTERVAL seconds
+    last_used = models.DateTimeField(null=True, blank=True)
+
+    objects = AuthTokenManager()
+
+    def __str__(self):
+        return f'{self.key[:8]}... of {self.user_id}'
+
+    @property
+    def expired(self):
+        return self.expires <= timezone.now()
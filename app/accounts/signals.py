@@ -0,0 +1,12 @@
+from django.core.cache import cache
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import User
+
+PROFILE_CACHE_PREFIX = 'profile'
+
+
+@receiver(post_save, sender=User)
+def invalidate_profile_cache(sender, instance, **kwargs):
+    """Drop the cached profile of the user when it is changed"""
+    cache.delete(f'{PROFILE_CACHE_PREFIX}:{instance.pk}')
@@ -0,0 +1,110 @@
+import io
+from datetime import timedelta
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ..models import AuthToken
+
+TOKEN_URL = reverse('user:token')
+ROTATE_URL = reverse('user:token_rotate')
+ME_URL = reverse('user:me')
+
+
+class TestAuthTokens(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='test1234')
+        self.client = APIClient()
+
+    def login(self):
+        res = self.client.post(TOKEN_URL, {'email': 'test@gmail.com',
+                                           'password': 'test1234'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('expires', res.data)
+        return res.data['token']
+
+    def get_me(self, key):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+        return self.client.get(ME_URL)
+
+    def test_expired_token_is_rejected(self):
+        """Test that a token stops working once it expires"""
+        key = self.login()
+        self.assertEqual(self.get_me(key).status_code, status.HTTP_200_OK)
+
+        AuthToken.objects.filter(pk=key).update(expires=timezone.now())
+        self.assertEqual(self.get_me(key).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    def test_last_used_is_coarse(self):
+        """Test that the last use is only written once per interval"""
+        key = self.login()
+        self.get_me(key)
+        first = AuthToken.objects.get(pk=key).last_used
+        self.assertIsNotNone(first)
+
+        self.get_me(key)
+        self.assertEqual(AuthToken.objects.get(pk=key).last_used, first)
+        with override_settings(AUTH_TOKEN_LAST_USED_INTERVAL=0):
+            self.get_me(key)
+        self.assertGreater(AuthToken.objects.get(pk=key).last_used, first)
+
+    def test_rotation(self):
+        """Test that a rotated token is replaced by the new one"""
+        key = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+        res = self.client.post(ROTATE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotEqual(res.data['token'], key)
+        self.assertEqual(self.get_me(key).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.get_me(res.data['token']).status_code,
+                         status.HTTP_200_OK)
+
+    def test_revocation(self):
+        """Test that a revoked token stops working"""
+        key = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+        res = self.client.delete(ROTATE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(AuthToken.objects.exists())
+
+    def test_delete_expired_tokens(self):
+        """Test that the command deletes only the expired tokens"""
+        tokens = [AuthToken.objects.issue(self.user) for _ in range(5)]
+        AuthToken.objects.filter(pk__in=[token.pk for token in tokens[:3]]) \
+            .update(expires=timezone.now() - timedelta(seconds=1))
+
+        out = io.StringIO()
+        call_command('delete_expired_tokens', batch_size=2, stdout=out)
+        self.assertIn('3 expired tokens deleted', out.getvalue())
+        self.assertEqual(set(AuthToken.objects.values_list('pk', flat=True)),
+                         {token.pk for token in tokens[3:]})
+
+    def test_drf_tokens_are_copied(self):
+        """Test that a copied DRF token keeps its age and expires with it"""
+        old, new = Token.objects.create(user=self.user), Token.objects.create(
+            user=get_user_model().objects.create_user('new@gmail.com', None))
+        created = timezone.now() - timedelta(days=30)
+        Token.objects.filter(pk=old.pk).update(created=created)
+
+        migration = import_module('accounts.migrations.0003_auth_tokens')
+        migration.copy_drf_tokens(apps, connection.schema_editor())
+
+        self.assertEqual(AuthToken.objects.get(pk=old.key).created, created)
+        self.assertEqual(self.get_me(old.key).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.get_me(new.key).status_code,
+                         status.HTTP_200_OK)
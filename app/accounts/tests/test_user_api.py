@@ -1,3 +1,6 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -5,6 +8,8 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from ..serializers import UserSerializer
+
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
 ME_URL = reverse('user:me')
@@ -132,3 +137,36 @@ class PrivateUserAPITest(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertTrue(res.status_code, status.HTTP_200_OK)
+
+    def test_profile_conditional_get(self):
+        """Test that a profile with the same ETag is not sent again"""
+        res = self.client.get(ME_URL)
+        self.assertIn('Last-Modified', res)
+
+        with mock.patch.object(UserSerializer, 'to_representation') as ser:
+            res = self.client.get(ME_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        ser.assert_not_called()
+
+    def test_profile_etag_changes_on_update(self):
+        """Test that updating the profile changes its ETag and cache"""
+        cache.clear()
+        etag = self.client.get(ME_URL)['ETag']
+        self.client.patch(ME_URL, {'name': 'New name'})
+
+        res = self.client.get(ME_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(res.data['name'], 'New name')
+
+    def test_profile_is_cached(self):
+        """Test that the serialized profile is served from the cache"""
+        cache.clear()
+        self.client.get(ME_URL)
+
+        with mock.patch.object(UserSerializer, 'to_representation') as ser:
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['name'], self.user.name)
+        ser.assert_not_called()
@@ -1,10 +1,12 @@
 from django.urls import path
-from .views import CreateUserView, AuthTokenView, ManageUserView
+from .views import CreateUserView, AuthTokenView, ManageUserView, \
+    RotateTokenView
 
 app_name = 'user'
 
 urlpatterns = [
     path('create/', CreateUserView.as_view(), name='create'),
     path('token/', AuthTokenView.as_view(), name='token'),
+    path('token/rotate/', RotateTokenView.as_view(), name='token_rotate'),
     path('me/', ManageUserView.as_view(), name='me'),
 ]
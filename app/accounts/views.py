@@ -1,7 +1,14 @@
-from rest_framework import generics, permissions, authentication
-from rest_framework.authtoken.views import ObtainAuthToken
+from django.db import transaction
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from django.conf import settings
+from core.views import ConditionalRetrieveMixin
+from .authentication import ExpiringTokenAuthentication
+from .models import AuthToken
 from .serializers import UserSerializer, AuthTokenSerializer
+from .signals import PROFILE_CACHE_PREFIX
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -9,17 +16,49 @@ class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
 
 
-class AuthTokenView(ObtainAuthToken):
+def token_data(token):
+    return {'token': token.key, 'expires': token.expires}
+
+
+class AuthTokenView(generics.GenericAPIView):
     """Create a new auth token for user"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    authentication_classes = ()
+    permission_classes = ()
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token = AuthToken.objects.issue(serializer.validated_data['user'])
+        return Response(token_data(token))
+
+
+class RotateTokenView(APIView):
+    """Replace the token of the request with a new one"""
+    authentication_classes = (ExpiringTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        request.auth.delete()
+        return Response(token_data(AuthToken.objects.issue(request.user)),
+                        status=status.HTTP_201_CREATED)
+
+    def delete(self, request, *args, **kwargs):
+        """Revoke the token of the request"""
+        request.auth.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(ConditionalRetrieveMixin,
+                     generics.RetrieveUpdateAPIView):
     """Manage authenticated user profile"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (ExpiringTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
+    cache_prefix = PROFILE_CACHE_PREFIX
+    cache_timeout = settings.PROFILE_CACHE_TIMEOUT
 
     def get_object(self):
         """Retrieve authenticated user"""
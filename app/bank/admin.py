@@ -1,45 +1,111 @@
 from django.contrib import admin
-from django.db.models import Count, Sum
+from django.db.models import Sum
 
+from core.paginators import EstimatedCountPaginator
+from . import sharding
 from .models import Bank, Branch, Account, Transaction, Withdraw, \
-    Transfer, Deposit, Pay
+    Transfer, Deposit, Pay, Loan, Repayment, StandingOrder, \
+    InterestProduct, Interest, Settlement
+
+ACCOUNT_RELATED = ('account__user', 'account__branch__bank')
+
+
+class ShardedAdminMixin:
+    """
+        Mixin for panels of sharded models. The admin reads the default
+        database only, which has no bank rows once DATABASE_SHARDS is set,
+        so the panels are turned off instead of showing empty lists
+    """
+
+    def has_module_permission(self, request):
+        return not sharding.is_enabled() and \
+            super().has_module_permission(request)
+
+    def has_view_permission(self, request, obj=None):
+        return not sharding.is_enabled() and \
+            super().has_view_permission(request, obj)
+
+    def has_add_permission(self, request):
+        return not sharding.is_enabled() and \
+            super().has_add_permission(request)
+
+    def has_change_permission(self, request, obj=None):
+        return not sharding.is_enabled() and \
+            super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return not sharding.is_enabled() and \
+            super().has_delete_permission(request, obj)
+
+
+class LargeTableAdminMixin(ShardedAdminMixin):
+    """
+        Mixin for panels of big tables, the rows are counted from the planner
+        estimate and the unfiltered total is not counted at all
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class BranchListFilter(admin.RelatedFieldListFilter):
+    """Branch filter that loads the bank of all branches in one query"""
+
+    def field_choices(self, field, request, model_admin):
+        branches = Branch.objects.select_related('bank') \
+            .order_by('bank__name', 'name')
+        return [(branch.pk, str(branch)) for branch in branches]
 
 
 @admin.register(Bank)
-class BankAdmin(admin.ModelAdmin):
+class BankAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """bank admin panel"""
     list_display = ('name', 'address', 'banker')
+    list_select_related = ('banker',)
+    raw_id_fields = ('banker',)
 
 
 @admin.register(Branch)
-class BranchAdmin(admin.ModelAdmin):
+class BranchAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """branch admin panel"""
 
+    def get_queryset(self, request):
+        return super().get_queryset(request) \
+            .annotate(money=Sum('customers__balance'))
+
+    @admin.display(ordering='money')
     def money(self, obj):
         """field to include total money each branch has"""
-        return obj.customers.aggregate(Sum('balance'))['balance__sum']
+        return obj.money
 
     list_display = ('bank', 'name', 'address', 'teller', 'money')
     list_filter = ('bank',)
+    list_select_related = ('bank', 'teller')
+    raw_id_fields = ('teller',)
 
 
 @admin.register(Account)
-class AccountAdmin(admin.ModelAdmin):
+class AccountAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """account admin panel"""
 
+    @admin.display(ordering='branch__bank')
     def bank(self, obj):
         """bank field to display in list"""
-        return obj.branch.bank
+        return obj.branch.bank if obj.branch else None
 
     list_display = ('user', 'number', 'balance', 'branch', 'bank')
-    list_filter = ('branch',)
-    ordering = ('balance',)
+    list_filter = (('branch', BranchListFilter), 'is_hot')
+    list_select_related = ('user', 'branch__bank')
+    raw_id_fields = ('user',)
+    # number is unique so the rows are read in index order
+    ordering = ('number',)
 
 
-class BaseTransactionTypeMixin:
+class BaseTransactionTypeMixin(LargeTableAdminMixin):
     """Mixin to include common fields for Withdraw, Pay, Deposit panel"""
-    list_display = ('id', 'amount', 'account')
-    ordering = ('amount',)
+    list_display = ('id', 'amount', 'account', 'created')
+    list_select_related = ACCOUNT_RELATED
+    raw_id_fields = ('account',)
+    ordering = ('-created',)
 
 
 @admin.register(Withdraw)
@@ -57,17 +123,100 @@ class DepositAdmin(BaseTransactionTypeMixin, admin.ModelAdmin):
 @admin.register(Pay)
 class PayAdmin(BaseTransactionTypeMixin, admin.ModelAdmin):
     """Pay admin panel"""
-    pass
+    list_display = BaseTransactionTypeMixin.list_display + ('merchant',
+                                                            'settled')
+    list_select_related = ACCOUNT_RELATED + ('merchant__user',
+                                             'merchant__branch__bank')
+    raw_id_fields = ('account', 'merchant')
+
+
+@admin.register(Loan)
+class LoanAdmin(BaseTransactionTypeMixin, admin.ModelAdmin):
+    """Loan admin panel"""
+    list_display = BaseTransactionTypeMixin.list_display + (
+        'annual_rate', 'term_months', 'outstanding', 'accrued_interest')
+
+
+@admin.register(Repayment)
+class RepaymentAdmin(BaseTransactionTypeMixin, admin.ModelAdmin):
+    """Repayment admin panel"""
+    list_display = BaseTransactionTypeMixin.list_display + (
+        'repaid_loan', 'interest_paid')
+    list_select_related = ACCOUNT_RELATED + ('repaid_loan__account__user',)
+    raw_id_fields = ('account', 'repaid_loan')
+
+
+@admin.register(Interest)
+class InterestAdmin(BaseTransactionTypeMixin, admin.ModelAdmin):
+    """Interest admin panel"""
+    list_display = BaseTransactionTypeMixin.list_display + ('product', 'day')
+    list_select_related = ACCOUNT_RELATED + ('product__bank',
+                                             'product__branch__bank')
+    raw_id_fields = ('account', 'product')
+
+
+@admin.register(Settlement)
+class SettlementAdmin(BaseTransactionTypeMixin, admin.ModelAdmin):
+    """Settlement admin panel"""
+    list_display = BaseTransactionTypeMixin.list_display + ('payments',)
 
 
 @admin.register(Transfer)
-class TransferAdmin(admin.ModelAdmin):
+class TransferAdmin(BaseTransactionTypeMixin, admin.ModelAdmin):
     """transfer admin panel"""
-    list_display = ('id', 'amount', 'account', 'to_account')
-    ordering = ('amount',)
+    list_display = ('id', 'amount', 'account', 'to_account', 'created')
+    list_select_related = ACCOUNT_RELATED + ('to_account__user',
+                                             'to_account__branch__bank')
+    raw_id_fields = ('account', 'to_account')
 
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """Transaction admin panel"""
-    list_display = ('id', 'transaction_type')
+
+    def get_queryset(self, request):
+        # one query per transaction type instead of one per row
+        return super().get_queryset(request) \
+            .prefetch_related('transaction_type__account__user')
+
+    @admin.display(ordering='transaction_ct')
+    def kind(self, obj):
+        """name of the transaction type"""
+        return obj.transaction_ct.name if obj.transaction_ct else None
+
+    def amount(self, obj):
+        """amount of the withdraw, deposit, transfer ..."""
+        return getattr(obj.transaction_type, 'amount', None)
+
+    def customer(self, obj):
+        """user of the account the transaction was made with"""
+        movement = obj.transaction_type
+        if movement is None or movement.account is None:
+            return None
+        return movement.account.user
+
+    list_display = ('id', 'kind', 'amount', 'customer', 'branch', 'created')
+    list_select_related = ('transaction_ct', 'branch__bank')
+    ordering = ('-created',)
+
+
+@admin.register(StandingOrder)
+class StandingOrderAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Standing order admin panel"""
+    list_display = ('id', 'amount', 'account', 'to_account', 'every',
+                    'period', 'next_run', 'failures', 'active')
+    list_filter = ('active', 'period')
+    list_select_related = ACCOUNT_RELATED + ('to_account__user',
+                                             'to_account__branch__bank')
+    raw_id_fields = ('account', 'to_account')
+    ordering = ('next_run',)
+
+
+@admin.register(InterestProduct)
+class InterestProductAdmin(ShardedAdminMixin, admin.ModelAdmin):
+    """Interest product admin panel"""
+    list_display = ('name', 'bank', 'branch', 'annual_rate', 'min_balance',
+                    'active')
+    list_filter = ('active', 'bank')
+    list_select_related = ('bank', 'branch__bank')
+    raw_id_fields = ('branch',)
@@ -0,0 +1,70 @@
+from collections import defaultdict, namedtuple
+from decimal import Decimal, ROUND_HALF_UP, localcontext
+
+from core.money import Money
+
+CENT = Decimal('0.01')
+MONTHS = 12
+
+Installment = namedtuple('Installment',
+                         ('number', 'payment', 'interest', 'principal',
+                          'balance'))
+
+
+def _cents(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def annuity_factor(annual_rate, term_months):
+    """Monthly payment of a loan with a principal of 1"""
+    with localcontext() as context:
+        context.prec = 34
+        rate = Decimal(annual_rate) / MONTHS
+        if not rate:
+            return Decimal(1) / term_months
+        return rate / (1 - (1 + rate) ** -term_months)
+
+
+def portfolio_schedules(loans):
+    """
+        Compute the payment schedule of many loans at once. Loans with the
+        same rate and term share one annuity factor and their schedules are
+        built month by month for the whole group, every amount is rounded
+        to cents and the last payment clears the remaining balance.
+        Returns a dict of loan id to a list of Installment
+    """
+    groups = defaultdict(list)
+    for loan in loans:
+        groups[(loan.annual_rate, loan.term_months)].append(loan)
+
+    schedules = {}
+    for (annual_rate, term_months), group in groups.items():
+        factor = annuity_factor(annual_rate, term_months)
+        monthly_rate = Decimal(annual_rate) / MONTHS
+        balances = [Money.of(loan.amount).decimal for loan in group]
+        payments = [_cents(balance * factor) for balance in balances]
+        rows = [[] for _ in group]
+
+        for number in range(1, term_months + 1):
+            interests = [_cents(balance * monthly_rate)
+                         for balance in balances]
+            if number == term_months:
+                payments = [balance + interest for balance, interest
+                            in zip(balances, interests)]
+            principals = [payment - interest for payment, interest
+                          in zip(payments, interests)]
+            balances = [balance - principal for balance, principal
+                        in zip(balances, principals)]
+            for index, row in enumerate(rows):
+                row.append(Installment(number, payments[index],
+                                       interests[index], principals[index],
+                                       balances[index]))
+
+        for loan, row in zip(group, rows):
+            schedules[loan.pk] = row
+    return schedules
+
+
+def schedule(loan):
+    """Compute the payment schedule of a single loan"""
+    return portfolio_schedules([loan])[loan.pk]
@@ -0,0 +1,97 @@
+import hashlib
+
+from .models import AuditChain, BaseTransaction, Transaction
+
+VERIFY_CHUNK_SIZE = 10000
+
+# values of an entry covered by its hash, the amount and account are the
+# ones of its movement
+ENTRY_FIELDS = ('pk', 'branch_id', 'transaction_ct_id', 'transaction_id',
+                'created')
+
+
+def digest(previous_hash, index, values):
+    """Hash of the entry at index chained to the hash of the previous one"""
+    message = '|'.join([previous_hash, str(index)] +
+                       ['' if value is None else str(value)
+                        for value in values])
+    return hashlib.sha256(message.encode()).hexdigest()
+
+
+def entry_values(pk, branch_id, ct_id, movement_id, created, amount,
+                 account_id):
+    return (pk, branch_id, ct_id, movement_id, created.isoformat(),
+            None if amount is None else amount.minor, account_id)
+
+
+def link(transactions, using):
+    """
+        Chain new transactions to the last entry of their branch before they
+        are inserted. The heads of the chains are locked in branch order
+        until the transaction commits, after the accounts of the movements,
+        so the entries of a branch are chained one at a time
+    """
+    by_branch = {}
+    for entry in transactions:
+        if entry.branch_id is not None:
+            by_branch.setdefault(entry.branch_id, []).append(entry)
+    if not by_branch:
+        return transactions
+
+    chains = AuditChain.objects.using(using).select_for_update()
+    heads = {head.branch_id: head for head in
+             chains.filter(branch__in=list(by_branch)).order_by('branch')}
+    for branch_id in sorted(set(by_branch) - set(heads)):
+        heads[branch_id], _ = chains.get_or_create(branch_id=branch_id)
+
+    for branch_id, entries in by_branch.items():
+        head = heads[branch_id]
+        for entry in entries:
+            movement = entry.transaction_type
+            head.length += 1
+            head.last_hash = digest(head.last_hash, head.length, entry_values(
+                entry.pk, entry.branch_id, entry.transaction_ct_id,
+                entry.transaction_id, entry.created,
+                movement and movement.amount,
+                movement and movement.account_id))
+            entry.chain_index, entry.hash = head.length, head.last_hash
+    AuditChain.objects.using(using).bulk_update(
+        list(heads.values()), ['length', 'last_hash'])
+    return transactions
+
+
+def verify(using, branch_id, full=False, chunk_size=VERIFY_CHUNK_SIZE):
+    """
+        Check the chain of the branch from its last verified entry, or from
+        the first one when full. Returns the error found or None with the
+        length and hash the chain was verified up to
+    """
+    head = AuditChain.objects.using(using).get(branch_id=branch_id)
+    index, previous = (0, AuditChain.GENESIS) if full else \
+        (head.verified_length, head.verified_hash)
+    entries = Transaction.objects.using(using).filter(
+        branch_id=branch_id, chain_index__lte=head.length) \
+        .order_by('chain_index')
+
+    while True:
+        rows = list(entries.filter(chain_index__gt=index).values_list(
+            'chain_index', 'hash', *ENTRY_FIELDS)[:chunk_size])
+        if not rows:
+            break
+        movements = {pk: (amount, account) for pk, amount, account in
+                     BaseTransaction.objects.using(using)
+                     .filter(pk__in=[row[5] for row in rows])
+                     .values_list('pk', 'amount', 'account_id')}
+        for chain_index, stored_hash, *values in rows:
+            index += 1
+            if chain_index != index:
+                return f'entry {index} is missing', None, None
+            amount, account = movements.get(values[3], (None, None))
+            if digest(previous, index, entry_values(
+                    *values, amount, account)) != stored_hash:
+                return f'entry {index} was altered', None, None
+            previous = stored_hash
+
+    if index != head.length or previous != head.last_hash:
+        return f'entry {index + 1} is missing', None, None
+    return None, index, previous
@@ -0,0 +1,281 @@
+import asyncio
+import json
+import queue
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+from django.utils.module_loading import import_string
+
+from .models import Account
+
+
+class Subscription:
+    """Queue of the events of some channels for one subscriber"""
+
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = set(channels)
+        self.events = queue.Queue(maxsize=settings.EVENT_QUEUE_SIZE)
+
+    def put(self, event):
+        """Add the event, the oldest one is dropped for slow subscribers"""
+        while True:
+            try:
+                self.events.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Return the next event or None when there is none in timeout"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class AsyncSubscription(Subscription):
+    """
+        Subscription read from an event loop, the events delivered by other
+        threads are handed to the loop so waiting for them holds no thread
+    """
+
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = set(channels)
+        self.loop = asyncio.get_running_loop()
+        self.events = asyncio.Queue(maxsize=settings.EVENT_QUEUE_SIZE)
+
+    def put(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self.put_nowait, event)
+        except RuntimeError:  # the loop is closed, nobody is listening
+            pass
+
+    def put_nowait(self, event):
+        if self.events.full():
+            self.events.get_nowait()
+        self.events.put_nowait(event)
+
+    async def get(self):
+        return await self.events.get()
+
+
+class Broker:
+    """
+        Fan out the events of this process to the subscriptions of their
+        channel, events of other processes come through the backend
+    """
+
+    def __init__(self, backend_class):
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+        self.backend = backend_class(self)
+
+    def subscribe(self, channels, subscription_class=Subscription):
+        self.backend.start()
+        subscription = subscription_class(self, channels)
+        with self.lock:
+            for channel in subscription.channels:
+                self.subscriptions.setdefault(channel, set()).add(
+                    subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                subscribers = self.subscriptions.get(channel, set())
+                subscribers.discard(subscription)
+                if not subscribers:
+                    self.subscriptions.pop(channel, None)
+
+    def deliver(self, channel, event):
+        """Put the event in the queue of each subscription of the channel"""
+        with self.lock:
+            subscribers = list(self.subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+
+class LocalBackend:
+    """Backend for a single process, events are delivered right away"""
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def start(self):
+        pass
+
+    def publish(self, channel, event, using):
+        self.broker.deliver(channel, event)
+
+
+class PostgresBackend:
+    """
+        Backend sending the events with NOTIFY, so every process listening
+        to PG_CHANNEL gets them. The listener thread is started by the first
+        subscription of the process
+    """
+    PG_CHANNEL = 'bank_events'
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.lock = threading.Lock()
+        self.listener = None
+
+    def start(self):
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(target=self.listen,
+                                                 daemon=True)
+                self.listener.start()
+
+    def publish(self, channel, event, using):
+        payload = json.dumps({'channel': channel, 'event': event})
+        with connections[using].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)',
+                           [self.PG_CHANNEL, payload])
+
+    def listen(self):
+        while True:
+            connection = connections.create_connection(DEFAULT_DB_ALIAS)
+            try:
+                connection.ensure_connection()
+                raw = connection.connection
+                raw.autocommit = True
+                with raw.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.PG_CHANNEL}')
+                while True:
+                    if select.select([raw], [], [], 60) == ([], [], []):
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        message = json.loads(raw.notifies.pop(0).payload)
+                        self.broker.deliver(message['channel'],
+                                            message['event'])
+            except Exception:  # reconnect when the database goes away
+                time.sleep(1)
+            finally:
+                connection.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = Broker(import_string(settings.EVENT_BACKEND))
+    return _broker
+
+
+def account_channel(account_id):
+    return f'account:{account_id}'
+
+
+def message(event):
+    """Server-sent event of an event, None is a keepalive comment"""
+    if event is None:
+        return ': keepalive\n\n'
+    return f'event: {event["type"]}\ndata: {json.dumps(event)}\n\n'
+
+
+def retry_message():
+    return f'retry: {settings.EVENT_KEEPALIVE * 1000}\n\n'
+
+
+class StreamSlots:
+    """
+        Number of streams a process serves from WSGI threads, each one holds
+        its thread until the client goes away (see EVENT_MAX_STREAMS)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.used = 0
+
+    def acquire(self):
+        with self.lock:
+            if self.used >= settings.EVENT_MAX_STREAMS:
+                return False
+            self.used += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.used -= 1
+
+
+stream_slots = StreamSlots()
+
+
+def publish(channel, event, using=DEFAULT_DB_ALIAS):
+    """Publish the event once the current transaction is committed"""
+    event = json.loads(json.dumps(event, cls=DjangoJSONEncoder))
+    transaction.on_commit(
+        lambda: get_broker().backend.publish(channel, event, using),
+        using=using)
+
+
+def _accounts_of(movements, using):
+    """
+        Accounts of the movements by pk, the ones already loaded on the
+        movements are used as they are and the others are read together
+    """
+    accounts, missing = {}, set()
+    for movement in movements:
+        # the merchant of a payment is credited later by the settlement
+        for name in ('account', 'to_account'):
+            pk = getattr(movement, f'{name}_id', None)
+            if pk is None:
+                continue
+            if getattr(type(movement), name).is_cached(movement):
+                accounts[pk] = getattr(movement, name)
+            else:
+                missing.add(pk)
+    missing -= accounts.keys()
+    if missing:
+        accounts.update(Account.objects.using(using).in_bulk(missing))
+    return accounts
+
+
+def publish_transactions(transactions, using=DEFAULT_DB_ALIAS):
+    """
+        Publish new ledger entries to the holders of the accounts of their
+        movements with the balances after them, for the entries saved one by
+        one and the ones inserted in bulk alike
+    """
+    entries = [(entry, entry.transaction_type) for entry in transactions]
+    entries = [(entry, movement) for entry, movement in entries
+               if movement is not None]
+    accounts = _accounts_of([movement for _, movement in entries], using)
+    balances = {}
+    for entry, movement in entries:
+        for pk in (movement.account_id,
+                   getattr(movement, 'to_account_id', None)):
+            if pk not in accounts:
+                continue
+            if pk not in balances:
+                balances[pk] = accounts[pk].total_balance()
+            publish(account_channel(pk), {
+                'type': 'transaction',
+                'transaction': entry.pk,
+                'kind': movement._meta.model_name,
+                'amount': str(movement.amount),
+                'account': pk,
+                'balance': str(balances[pk]),
+                'created': entry.created,
+            }, using)
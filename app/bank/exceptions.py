@@ -8,3 +8,12 @@ class AccountAlreadyExistError(IntegrityError):
     """
     def __init__(self, message='There is already an account with this user'):
         super().__init__(message)
+
+
+class SuspectedFraudError(Exception):
+    """
+        This exception is raised when a fraud rule rejects a transaction
+    """
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
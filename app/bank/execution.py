@@ -0,0 +1,86 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, transaction, OperationalError
+
+from .models import Account
+
+ISOLATION_LEVELS = ('READ COMMITTED', 'REPEATABLE READ', 'SERIALIZABLE')
+
+# SQLSTATE of serialization failures and deadlocks, PostgreSQL rolls the
+# transaction back and it can be run again as it is
+RETRYABLE_PGCODES = ('40001', '40P01')
+# primary result codes of sqlite3 for a busy or a locked database
+RETRYABLE_SQLITE_CODES = (5, 6)
+
+
+def is_retryable(error):
+    """Whether the database error is solved by running the transaction again"""
+    cause = error.__cause__
+    if getattr(cause, 'pgcode', None) in RETRYABLE_PGCODES:
+        return True
+    return (getattr(cause, 'sqlite_errorcode', 0) & 0xff) in \
+        RETRYABLE_SQLITE_CODES
+
+
+def backoff(attempt):
+    """
+        Seconds to wait before running a transaction again, random up to an
+        exponential ceiling so the transactions which conflicted don't
+        collide again
+    """
+    ceiling = min(settings.MONEY_RETRY_MAX_BACKOFF,
+                  settings.MONEY_RETRY_BACKOFF * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+
+def set_isolation_level(connection):
+    level = settings.MONEY_ISOLATION_LEVEL
+    if not level or connection.vendor != 'postgresql':
+        return
+    if level.upper() not in ISOLATION_LEVELS:
+        raise ImproperlyConfigured(
+            f'MONEY_ISOLATION_LEVEL must be one of {ISOLATION_LEVELS}')
+    with connection.cursor() as cursor:
+        cursor.execute(f'SET TRANSACTION ISOLATION LEVEL {level.upper()}')
+
+
+def execute(using, func, *args, **kwargs):
+    """
+        Run func in a transaction at MONEY_ISOLATION_LEVEL, the transaction
+        is run again when it is chosen as a deadlock victim or fails to
+        serialize, up to MONEY_RETRY_ATTEMPTS times. Inside a transaction
+        func only gets a savepoint, the outermost execute() owns the retries
+        since the whole transaction is rolled back
+    """
+    connection = connections[using]
+    if connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            return func(*args, **kwargs)
+
+    attempts = settings.MONEY_RETRY_ATTEMPTS
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic(using=using):
+                set_isolation_level(connection)
+                return func(*args, **kwargs)
+        except OperationalError as error:
+            if attempt + 1 >= attempts or not is_retryable(error):
+                raise
+        time.sleep(backoff(attempt))
+
+
+def lock_accounts(using, *accounts):
+    """
+        Lock the rows of the accounts in primary key order, so movements
+        between the same accounts wait for each other whatever their
+        direction instead of deadlocking. The balances of the instances are
+        refreshed from the locked rows
+    """
+    balances = dict(Account.objects.using(using).select_for_update()
+                    .filter(pk__in=[account.pk for account in accounts])
+                    .order_by('pk').values_list('pk', 'balance'))
+    for account in accounts:
+        account.balance = balances[account.pk]
@@ -0,0 +1,303 @@
+import heapq
+import threading
+import time
+from collections import deque, namedtuple
+from itertools import takewhile
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import sharding
+from .exceptions import SuspectedFraudError
+from .models import Withdraw, Deposit, Pay, Transfer, Loan, Repayment
+
+# account and counterparty are ids, time is a unix timestamp
+Movement = namedtuple('Movement',
+                      ('kind', 'account', 'counterparty', 'amount', 'time'))
+
+DEBITS = ('withdraw', 'pay', 'transfer')
+
+# seconds between two sweeps of the state of the rules for idle accounts
+PRUNE_INTERVAL = 60
+
+# counterparty field of each movement model, None when it has none
+LEDGER = ((Withdraw, None), (Deposit, None), (Pay, 'merchant'),
+          (Transfer, 'to_account'), (Loan, None), (Repayment, None))
+
+
+class SlidingWindow:
+    """
+        Count and sum of the values added in the last ``window`` seconds. The
+        window is kept as slices with running totals so adding and reading
+        are O(1), the oldest slice is dropped as a whole which makes the
+        window up to one slice longer
+    """
+    __slots__ = ('window', 'width', 'slices', 'count', 'total')
+
+    def __init__(self, window, slices=60):
+        self.window = window
+        self.width = window / slices
+        self.slices = deque()  # [start, count, total]
+        self.count = 0
+        self.total = 0
+
+    def _expire(self, now):
+        edge = now - self.window - self.width
+        while self.slices and self.slices[0][0] <= edge:
+            _, count, total = self.slices.popleft()
+            self.count -= count
+            self.total -= total
+
+    def add(self, value, now):
+        self._expire(now)
+        start = now - now % self.width
+        if self.slices and self.slices[-1][0] >= start:
+            self.slices[-1][1] += 1
+            self.slices[-1][2] += value
+        else:
+            self.slices.append([start, 1, value])
+        self.count += 1
+        self.total += value
+
+    def totals(self, now):
+        self._expire(now)
+        return self.count, self.total
+
+
+class Rule:
+    """
+        Base class of the fraud rules, check() returns the reason to reject
+        a movement or None and record() adds an applied movement to the
+        state of the rule. lookback is how many seconds of the ledger the
+        rule needs to be warmed with
+    """
+    kinds = DEBITS
+    lookback = 0
+
+    def __init__(self, kinds=None):
+        if kinds is not None:
+            self.kinds = tuple(kinds)
+
+    def applies(self, movement):
+        return movement.kind in self.kinds
+
+    def check(self, movement):
+        raise NotImplementedError('.check() must be overridden')
+
+    def record(self, movement):
+        raise NotImplementedError('.record() must be overridden')
+
+    def prune(self, now):
+        """Forget the state that can't reject a movement anymore"""
+
+
+def prune_oldest(entries, expired):
+    """
+        Drop the entries from the oldest one until one is not expired, the
+        rules move an entry to the end of its dict when it is updated
+    """
+    for key in list(takewhile(lambda key: expired(entries[key]), entries)):
+        del entries[key]
+
+
+class VelocityRule(Rule):
+    """Limit the amount and the number of movements of an account in window"""
+
+    def __init__(self, window=3600, max_amount=None, max_count=None,
+                 kinds=None):
+        super().__init__(kinds)
+        self.lookback = window
+        self.max_amount = max_amount
+        self.max_count = max_count
+        self.windows = {}
+
+    def check(self, movement):
+        window = self.windows.get(movement.account)
+        if window is None:
+            return None
+        count, total = window.totals(movement.time)
+        if not count:
+            del self.windows[movement.account]
+            return None
+        if self.max_count is not None and count + 1 > self.max_count:
+            return f'More than {self.max_count} movements in ' \
+                   f'{self.lookback} seconds'
+        if self.max_amount is not None and \
+                total + movement.amount > self.max_amount:
+            return f'More than {self.max_amount} moved in ' \
+                   f'{self.lookback} seconds'
+        return None
+
+    def record(self, movement):
+        window = self.windows.pop(movement.account, None)
+        if window is None:
+            window = SlidingWindow(self.lookback)
+        self.windows[movement.account] = window
+        window.add(movement.amount, movement.time)
+
+    def prune(self, now):
+        prune_oldest(self.windows, lambda window: not window.totals(now)[0])
+
+
+class NewCounterpartyRule(Rule):
+    """
+        Limit the amount sent to a counterparty the account didn't send
+        money to in the last ``days``
+    """
+    kinds = ('transfer', 'pay')
+
+    def __init__(self, max_amount, days=90, kinds=None):
+        super().__init__(kinds)
+        self.lookback = days * 24 * 3600
+        self.max_amount = max_amount
+        self.last_sent = {}
+
+    def check(self, movement):
+        if movement.counterparty is None or \
+                movement.amount <= self.max_amount:
+            return None
+        sent = self.last_sent.get((movement.account, movement.counterparty))
+        if sent is None or sent < movement.time - self.lookback:
+            return f'More than {self.max_amount} sent to a new counterparty'
+        return None
+
+    def record(self, movement):
+        if movement.counterparty is not None:
+            key = (movement.account, movement.counterparty)
+            self.last_sent.pop(key, None)
+            self.last_sent[key] = movement.time
+
+    def prune(self, now):
+        prune_oldest(self.last_sent,
+                     lambda sent: sent < now - self.lookback)
+
+
+class RoundTripRule(Rule):
+    """Reject sending money back to an account it came from within window"""
+    kinds = ('transfer',)
+
+    def __init__(self, window=24 * 3600, kinds=None):
+        super().__init__(kinds)
+        self.lookback = window
+        self.last_sent = {}
+
+    def check(self, movement):
+        received = self.last_sent.get((movement.counterparty,
+                                       movement.account))
+        if received is not None and \
+                received >= movement.time - self.lookback:
+            return 'Money is sent back to the account it came from'
+        return None
+
+    def record(self, movement):
+        if movement.counterparty is not None:
+            key = (movement.account, movement.counterparty)
+            self.last_sent.pop(key, None)
+            self.last_sent[key] = movement.time
+
+    def prune(self, now):
+        prune_oldest(self.last_sent,
+                     lambda sent: sent < now - self.lookback)
+
+
+class FraudEngine:
+    """
+        Run the rules on movements before they are applied. The state of the
+        rules is kept in memory, so each process only sees the movements it
+        applied after it was warmed from the ledger. Requests and lanes check
+        and record from many threads, so the state is only used under the
+        lock, and the state of idle accounts is swept every PRUNE_INTERVAL
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.lock = threading.Lock()
+        self.pruned = time.time()
+
+    def check(self, movement):
+        """Raise SuspectedFraudError when a rule rejects the movement"""
+        with self.lock:
+            for rule in self.rules:
+                if rule.applies(movement):
+                    reason = rule.check(movement)
+                    if reason:
+                        raise SuspectedFraudError(reason)
+
+    def record(self, movement):
+        with self.lock:
+            for rule in self.rules:
+                if rule.applies(movement):
+                    rule.record(movement)
+            if movement.time - self.pruned >= PRUNE_INTERVAL:
+                self.prune(movement.time)
+
+    def prune(self, now):
+        self.pruned = now
+        for rule in self.rules:
+            rule.prune(now)
+
+
+def _ledger_rows(db, model, counterparty, since):
+    fields = ['account_id', 'amount', 'created']
+    if counterparty:
+        fields.append(f'{counterparty}_id')
+    rows = model.objects.using(db).filter(created__gte=since) \
+        .order_by('created').values_list(*fields)
+    kind = model._meta.model_name
+    for account, amount, created, *other in rows.iterator():
+        yield Movement(kind, account, other[0] if other else None, amount,
+                       created.timestamp())
+
+
+def ledger_movements(since, kinds):
+    """
+        Movements of the kinds created after ``since`` on all shards, the
+        rows are streamed and merged by time
+    """
+    return heapq.merge(*[_ledger_rows(db, model, counterparty, since)
+                         for db in sharding.shards() or [DEFAULT_DB_ALIAS]
+                         for model, counterparty in LEDGER
+                         if model._meta.model_name in kinds],
+                       key=lambda movement: movement.time)
+
+
+def build_engine():
+    """Engine with the rules of FRAUD_RULES warmed from the ledger"""
+    rules = [import_string(rule['NAME'])(**rule.get('OPTIONS', {}))
+             for rule in settings.FRAUD_RULES]
+    now = timezone.now()
+    for rule in rules:
+        since = now - timezone.timedelta(seconds=rule.lookback)
+        for movement in ledger_movements(since, rule.kinds):
+            rule.record(movement)
+    return FraudEngine(rules)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = build_engine()
+    return _engine
+
+
+@receiver(setting_changed)
+def reset_engine(setting=None, **kwargs):
+    global _engine
+    if setting in (None, 'FRAUD_RULES'):
+        _engine = None
+
+
+def pending_movement(kind, account, amount, counterparty=None):
+    """Movement of a request that is being processed"""
+    return Movement(kind, account.pk, counterparty and counterparty.pk,
+                    amount, time.time())
@@ -0,0 +1,150 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections, transaction, OperationalError
+from django.dispatch import receiver
+
+from . import execution, sharding
+
+# func is run on the database alias using with the shard of the request,
+# the jobs of a batch are committed together by key
+Job = namedtuple('Job', ('using', 'shard', 'key', 'func', 'future'))
+
+
+class Lane:
+    """
+        Worker thread applying the movements routed to it one after the
+        other. The movements waiting in its queue are committed together in
+        one transaction (group commit), each in a savepoint of its own so a
+        failing movement doesn't roll back the others. The jobs of different
+        keys (branches) are committed apart, so a transaction locks the head
+        of one audit chain only. The future of a movement is resolved once
+        its transaction is committed
+    """
+
+    def __init__(self, name):
+        self.jobs = queue.Queue()
+        self.batches = 0
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run, name=name,
+                                       daemon=True)
+        self.thread.start()
+
+    def submit(self, using, func, key=None):
+        future = Future()
+        self.jobs.put(Job(using, sharding.current_shard(), key, func, future))
+        return future
+
+    def stop(self):
+        """Stop the thread once the movements already queued are applied"""
+        self.jobs.put(None)
+
+    def take_batch(self):
+        """
+            The next job with the ones queued after it, up to
+            MOVEMENT_LANE_BATCH_SIZE jobs and MOVEMENT_LANE_WAIT seconds
+        """
+        job = self.jobs.get()
+        if job is None:
+            self.stopping = True
+            return []
+        batch = [job]
+        deadline = time.monotonic() + settings.MOVEMENT_LANE_WAIT
+        while len(batch) < settings.MOVEMENT_LANE_BATCH_SIZE:
+            try:
+                job = self.jobs.get(timeout=max(deadline - time.monotonic(),
+                                                0))
+            except queue.Empty:
+                break
+            if job is None:
+                self.stopping = True
+                break
+            batch.append(job)
+        return batch
+
+    def run(self):
+        while not self.stopping:
+            batch = self.take_batch()
+            for using, key in dict.fromkeys((job.using, job.key)
+                                            for job in batch):
+                self.commit(using, [job for job in batch
+                                    if (job.using, job.key) == (using, key)])
+
+    def commit(self, using, jobs):
+        def apply():
+            results = []
+            for job in jobs:
+                try:
+                    with sharding.using_shard(job.shard), \
+                            transaction.atomic(using=using):
+                        results.append((job.func(), None))
+                except OperationalError as error:
+                    if execution.is_retryable(error):
+                        raise  # the whole transaction is run again
+                    results.append((None, error))
+                except Exception as error:
+                    results.append((None, error))
+            return results
+
+        try:
+            results = execution.execute(using, apply)
+        except Exception as error:  # the batch could not be committed
+            for job in jobs:
+                job.future.set_exception(error)
+            return
+        finally:
+            connections[using].close_if_unusable_or_obsolete()
+
+        self.batches += 1
+        for job, (result, error) in zip(jobs, results):
+            if error is None:
+                job.future.set_result(result)
+            else:
+                job.future.set_exception(error)
+
+
+class Lanes:
+    """
+        Fixed set of lanes of this process keyed by branch. The entries of a
+        branch are chained one at a time anyway, so its movements go to the
+        same lane and the lanes never wait on each other's audit chain or
+        account row locks
+    """
+
+    def __init__(self, count):
+        self.lanes = [Lane(f'movement-lane-{index}') for index in range(count)]
+
+    def submit(self, key, using, func):
+        """Run func in the lane of the key, return the Future of its result"""
+        return self.lanes[hash(key) % len(self.lanes)].submit(using, func,
+                                                              key)
+
+    def stop(self):
+        for lane in self.lanes:
+            lane.stop()
+
+
+_lanes = None
+_lanes_lock = threading.Lock()
+
+
+def get_lanes():
+    global _lanes
+    if _lanes is None:
+        with _lanes_lock:
+            if _lanes is None:
+                _lanes = Lanes(settings.MOVEMENT_LANES)
+    return _lanes
+
+
+@receiver(setting_changed)
+def reset_lanes(setting=None, **kwargs):
+    global _lanes
+    if setting in (None, 'MOVEMENT_LANES') and _lanes is not None:
+        _lanes.stop()
+        _lanes = None
@@ -0,0 +1,69 @@
+from django.db import transaction
+
+from .models import LedgerEvent, LedgerSequence
+
+SEQUENCE_BATCH_SIZE = 10000
+
+# counterparty field of the movement models which have one
+COUNTERPARTIES = {'transfer': 'to_account_id', 'pay': 'merchant_id'}
+
+
+def record_movements(movements, using):
+    """
+        Write the events of new movements, in the transaction which creates
+        them so an event is committed if and only if its movement is
+    """
+    events = []
+    for movement in movements:
+        kind = movement._meta.model_name
+        counterparty = COUNTERPARTIES.get(kind)
+        events.append(LedgerEvent(
+            kind=kind, movement=movement.pk, account=movement.account_id,
+            counterparty=counterparty and getattr(movement, counterparty),
+            amount=movement.amount, created=movement.created))
+    return LedgerEvent.objects.using(using).bulk_create(events)
+
+
+def sequence_events(using, batch_size=SEQUENCE_BATCH_SIZE):
+    """
+        Number the committed events which have no sequence yet in the order
+        they were written, under the lock of the LedgerSequence row. Numbers
+        taken when an event is written would follow the start of the
+        transactions instead of their commit, so a consumer could read past
+        a number which is committed later. The events are numbered by the
+        sequence_ledger job and by tail_ledger before each read, not at
+        commit. Returns the number of events
+    """
+    with transaction.atomic(using=using):
+        counter, _ = LedgerSequence.objects.using(using) \
+            .select_for_update().get_or_create(pk=1)
+        pending = list(LedgerEvent.objects.using(using)
+                       .filter(sequence__isnull=True).order_by('id')
+                       .values_list('id', flat=True)[:batch_size])
+        if not pending:
+            return 0
+        LedgerEvent.objects.using(using).bulk_update(
+            [LedgerEvent(id=pk, sequence=counter.last + number)
+             for number, pk in enumerate(pending, 1)],
+            ['sequence'], batch_size=1000)
+        counter.last += len(pending)
+        counter.save(update_fields=['last'])
+        return len(pending)
+
+
+def read_events(using, after=0, limit=1000):
+    """Events numbered after the checkpoint, in the order of their number"""
+    return list(LedgerEvent.objects.using(using)
+                .filter(sequence__gt=after).order_by('sequence')[:limit])
+
+
+def event_data(event):
+    return {
+        'sequence': event.sequence,
+        'kind': event.kind,
+        'movement': event.movement,
+        'account': event.account,
+        'counterparty': event.counterparty,
+        'amount': str(event.amount),
+        'created': event.created,
+    }
@@ -0,0 +1,93 @@
+import datetime
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F, Func, Q, Value
+from django.utils import timezone
+
+from bank import sharding
+from bank.execution import execute
+from bank.models import Account, InterestProduct, Interest, Transaction
+from bank.utils import bulk_create_movements, bulk_create_transactions, \
+    fold_credits
+from core.money import MoneyField
+
+DAYS_IN_YEAR = Decimal(365)
+
+
+class Command(BaseCommand):
+    """
+        Django command to credit one day of interest to the accounts of every
+        interest product. The interest is computed and added to the balances
+        by one UPDATE per chunk of accounts and posted as Interest movements,
+        the command can be restarted, accounts credited for the day are
+        skipped. The credit slots of hot accounts are folded first so their
+        pending credits earn interest too
+    """
+    help = 'Credit daily interest to the accounts of the interest products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=datetime.date.fromisoformat,
+                            help='day to accrue (YYYY-MM-DD), default today')
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def accrue(self, alias, product, day, chunk_size):
+        # balances are in minor units so the interest is rounded to cents
+        daily_interest = Func(
+            F('balance') * Value(product.annual_rate) / DAYS_IN_YEAR,
+            function='ROUND', output_field=MoneyField())
+        pending = product.accounts().using(alias).filter(
+            Q(interest_accrued_until__lt=day) |
+            Q(interest_accrued_until__isnull=True),
+            is_hot=True, credit_slots__amount__gt=0).distinct()
+        for account in pending:
+            fold_credits(account)
+
+        accounts = product.accounts().using(alias).filter(
+            Q(interest_accrued_until__lt=day) |
+            Q(interest_accrued_until__isnull=True),
+            balance__gt=0,
+            balance__gte=product.min_balance).order_by('pk')
+
+        credited, last_pk = 0, None
+        while True:
+            chunk = accounts if last_pk is None else \
+                accounts.filter(pk__gt=last_pk)
+            ids = list(chunk.values_list('pk', flat=True)[:chunk_size])
+            if not ids:
+                return credited
+            credited += execute(alias, self.credit, alias, ids, product,
+                                day, daily_interest)
+            last_pk = ids[-1]
+
+    def credit(self, alias, ids, product, day, daily_interest):
+        """Credit the interest to a chunk of accounts, in pk order"""
+        rows = Account.objects.using(alias).select_for_update() \
+            .filter(pk__in=ids).order_by('pk').annotate(
+                interest=daily_interest) \
+            .values_list('pk', 'branch_id', 'interest')
+        rows = [row for row in rows if row[2] > 0]
+        Account.objects.using(alias).filter(pk__in=ids).update(
+            balance=F('balance') + daily_interest,
+            interest_accrued_until=day)
+        credits = bulk_create_movements(
+            [Interest(account_id=pk, amount=interest,
+                      product=product, day=day)
+             for pk, _, interest in rows], alias)
+        bulk_create_transactions(
+            [Transaction(branch_id=branch_id, transaction_type=credit)
+             for (_, branch_id, _), credit in zip(rows, credits)], alias)
+        return len(rows)
+
+    def handle(self, *args, **options):
+        day = options['date'] or timezone.localdate()
+        credited = 0
+        for alias in sharding.shards() or [DEFAULT_DB_ALIAS]:
+            products = InterestProduct.objects.using(alias).filter(
+                active=True).order_by('branch', 'pk')
+            for product in products:
+                credited += self.accrue(alias, product, day,
+                                        options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Interest credited to {credited} accounts for {day}'))
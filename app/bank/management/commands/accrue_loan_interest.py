@@ -0,0 +1,82 @@
+import datetime
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Q
+from django.utils import timezone
+
+from bank import sharding
+from bank.models import Loan
+from core.money import MINOR_UNITS
+
+DAYS_IN_YEAR = Decimal(365)
+
+
+def accrual_start(accrued_until, created):
+    """
+        Day after which interest is owed, a loan that was never accrued owes
+        interest for the day it was created
+    """
+    if accrued_until is not None:
+        return accrued_until
+    return timezone.localdate(created) - datetime.timedelta(days=1)
+
+
+def interest_for(days):
+    # outstanding is in minor units, accrued_interest in major units
+    return ExpressionWrapper(
+        F('outstanding') * F('annual_rate') * days /
+        (DAYS_IN_YEAR * MINOR_UNITS),
+        output_field=DecimalField())
+
+
+class Command(BaseCommand):
+    """
+        Django command to accrue the interest of every open loan up to a day,
+        a loan owes one day of interest for each day since it was last
+        accrued so skipped runs are caught up. Loans are updated in chunks
+        with one UPDATE statement per accrual start in a chunk and the
+        command can be restarted, loans accrued for the day are skipped
+    """
+    help = 'Accrue daily interest on open loans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=datetime.date.fromisoformat,
+                            help='day to accrue (YYYY-MM-DD), default today')
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def accrue(self, alias, day, chunk_size):
+        loans = Loan.objects.using(alias).filter(
+            Q(accrued_until__lt=day) | Q(accrued_until__isnull=True),
+            outstanding__gt=0).order_by('pk')
+
+        accrued, last_pk = 0, None
+        while True:
+            chunk = loans if last_pk is None else loans.filter(pk__gt=last_pk)
+            rows = list(chunk.values_list('pk', 'accrued_until', 'created')
+                        [:chunk_size])
+            if not rows:
+                return accrued
+            starts = {}
+            for pk, accrued_until, created in rows:
+                start = accrual_start(accrued_until, created)
+                if start < day:
+                    starts.setdefault((start, accrued_until), []).append(pk)
+            with transaction.atomic(using=alias):
+                for (start, accrued_until), ids in starts.items():
+                    # a concurrent run accruing the loans first wins
+                    accrued += Loan.objects.using(alias).filter(
+                        pk__in=ids, accrued_until=accrued_until) \
+                        .update(accrued_interest=F('accrued_interest') +
+                                interest_for((day - start).days),
+                                accrued_until=day)
+            last_pk = rows[-1][0]
+
+    def handle(self, *args, **options):
+        day = options['date'] or timezone.localdate()
+        accrued = 0
+        for alias in sharding.shards() or [DEFAULT_DB_ALIAS]:
+            accrued += self.accrue(alias, day, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Interest accrued on {accrued} loans for {day}'))
@@ -0,0 +1,162 @@
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import AuthToken
+from bank.models import Account, Bank, Branch
+
+MODES = ('sync', 'threaded', 'asgi')
+
+# the throttles would turn most of the load into 429 responses
+UNTHROTTLED = {
+    'THROTTLE_TELLER_RATE': '1000000/s',
+    'THROTTLE_BRANCH_RATE': '1000000/s',
+    'THROTTLE_ACCOUNT_RATE': '1000000/s',
+}
+
+BENCH_ACCOUNT_NUMBER = 9000000000000000
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    """
+        Django command to compare the worker models of config/gunicorn.py.
+        A server is started in each mode against the configured database and
+        tellers deposit into the bench accounts from concurrent keep-alive
+        connections. The velocity fraud rule rejects more than 30 deposits
+        an hour per account, so use enough --accounts for the requests
+    """
+    help = 'Benchmark the server modes on the deposit endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('modes', nargs='*',
+                            help=f'any of {", ".join(MODES)}, all of them '
+                                 f'by default')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--accounts', type=int, default=200)
+        parser.add_argument('--workers', type=int,
+                            help='processes of the server, WEB_CONCURRENCY '
+                                 'or the default of the mode otherwise')
+
+    def setup(self, accounts):
+        """The bench branch, its accounts and the token of its teller"""
+        users = get_user_model().objects
+        teller = users.filter(email='bench-teller@digify.local').first() or \
+            users.create_user('bench-teller@digify.local', None)
+        customer = users.filter(email='bench@digify.local').first() or \
+            users.create_user('bench@digify.local', None)
+        bank, _ = Bank.objects.get_or_create(
+            name='Bench', defaults={'address': 'bench', 'banker': teller})
+        branch, _ = Branch.objects.get_or_create(
+            name='Bench', bank=bank,
+            defaults={'address': 'bench', 'teller': teller})
+        numbers = range(BENCH_ACCOUNT_NUMBER, BENCH_ACCOUNT_NUMBER + accounts)
+        existing = set(Account.objects.filter(number__in=numbers)
+                       .values_list('number', flat=True))
+        Account.objects.bulk_create([
+            Account(user=customer, branch=branch, number=number)
+            for number in numbers if number not in existing])
+        account_ids = [str(pk) for pk in Account.objects.filter(
+            number__in=numbers).values_list('pk', flat=True)]
+        token = AuthToken.objects.issue(teller)
+        return branch, account_ids, token.key
+
+    def start_server(self, mode, port, workers):
+        env = dict(os.environ, SERVER_MODE=mode, PORT=str(port),
+                   **UNTHROTTLED)
+        if workers:
+            env['WEB_CONCURRENCY'] = str(workers)
+        server = subprocess.Popen(
+            ['gunicorn', '-c', 'config/gunicorn.py'], cwd=settings.BASE_DIR,
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'the {mode} server did not start')
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', port)
+                connection.request('GET', '/healthz')
+                if connection.getresponse().status == 200:
+                    return server
+            except OSError:
+                time.sleep(0.1)
+        server.terminate()
+        raise CommandError(f'the {mode} server did not answer')
+
+    def load(self, port, path, account_ids, token, options):
+        """Send the deposits and return the latencies and status codes"""
+        latencies, statuses = [], Counter()
+        lock = threading.Lock()
+        count = iter(range(options['requests']))
+        headers = {'Authorization': f'Token {token}',
+                   'Content-Type': 'application/json'}
+
+        def client():
+            connection = http.client.HTTPConnection('127.0.0.1', port)
+            for index in count:
+                body = json.dumps({
+                    'account': account_ids[index % len(account_ids)],
+                    'amount': 1})
+                start = time.perf_counter()
+                try:
+                    connection.request('POST', path, body, headers)
+                    response = connection.getresponse()
+                    response.read()
+                    status = response.status
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    status = 'error'
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+                    statuses[status] += 1
+
+        threads = [threading.Thread(target=client)
+                   for _ in range(options['concurrency'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start, latencies, statuses
+
+    def handle(self, *args, **options):
+        modes = options['modes'] or list(MODES)
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f'Unknown modes: {", ".join(unknown)}')
+
+        branch, account_ids, token = self.setup(options['accounts'])
+        path = f'/bank/deposit/{branch.pk}/'
+        for mode in modes:
+            port = free_port()
+            server = self.start_server(mode, port, options['workers'])
+            try:
+                seconds, latencies, statuses = self.load(
+                    port, path, account_ids, token, options)
+            finally:
+                server.terminate()
+                server.wait()
+
+            latencies.sort()
+            p99 = latencies[int(len(latencies) * 0.99) - 1]
+            self.stdout.write(
+                f'{mode:<10} {len(latencies) / seconds:8.1f} req/s '
+                f'p50 {statistics.median(latencies) * 1000:7.1f} ms '
+                f'p99 {p99 * 1000:7.1f} ms '
+                f'{dict(sorted(statuses.items(), key=str))}')
@@ -0,0 +1,89 @@
+import timeit
+import uuid
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from bank.models import Account, Deposit
+from bank.serializers import SerializerCreator
+from core.money import Money
+from core.renderers import FastJSONRenderer
+
+
+class Command(BaseCommand):
+    """
+        Django command to benchmark serializing and rendering a large
+        statement of deposits and adding up its amounts as Decimal and as
+        Money, and the balance arithmetic of apply_deposit and
+        apply_withdraw on its amounts. No database is needed
+    """
+    help = 'Benchmark the JSON fast path on a large statement payload'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def best(self, func, repeat):
+        return min(timeit.repeat(func, number=1, repeat=repeat))
+
+    def balance_updates(self, account, field, amounts):
+        """What apply_deposit then apply_withdraw compute, without queries"""
+        for amount in amounts:
+            assert amount > 0
+            account.balance += amount
+            field.get_prep_value(account.balance)
+            if (account.balance - amount) >= 0:
+                account.balance -= amount
+                field.get_prep_value(account.balance)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deposits = [Deposit(id=uuid.uuid4(), created=now,
+                            amount=Money(index % 100000),
+                            account_id=uuid.uuid4())
+                    for index in range(options['rows'])]
+        amounts = [deposit.amount for deposit in deposits]
+        decimals = [amount.decimal for amount in amounts]
+
+        fast_serializer = SerializerCreator.model_serializer_factory(Deposit)
+
+        class DefaultSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = Deposit
+                fields = '__all__'
+
+            # what the column was before amounts were stored as minor units
+            amount = serializers.DecimalField(max_digits=20, decimal_places=2,
+                                              source='amount.decimal')
+
+        # the balance column before amounts were stored as minor units
+        decimal_account = SimpleNamespace(balance=Decimal(0))
+        decimal_field = models.DecimalField(max_digits=20, decimal_places=2)
+        positive = [amount + 1 for amount in amounts]
+        positive_decimals = [amount.decimal for amount in positive]
+
+        data = fast_serializer(deposits, many=True).data
+        results = {
+            'sum (Decimal)': lambda: sum(decimals, Decimal(0)),
+            'sum (Money)': lambda: sum(amounts, Money(0)),
+            'sum (Money.sum)': lambda: Money.sum(amounts),
+            'balance (Decimal)': lambda: self.balance_updates(
+                decimal_account, decimal_field, positive_decimals),
+            'balance (Money)': lambda: self.balance_updates(
+                Account(balance=0), Account._meta.get_field('balance'),
+                positive),
+            'serialize (DRF)': lambda: DefaultSerializer(
+                deposits, many=True).data,
+            'serialize (fast)': lambda: fast_serializer(
+                deposits, many=True).data,
+            'render (json)': lambda: JSONRenderer().render(data),
+            'render (orjson)': lambda: FastJSONRenderer().render(data),
+        }
+        for name, func in results.items():
+            seconds = self.best(func, options['repeat'])
+            self.stdout.write(f'{name:<20} {seconds * 1000:10.1f} ms')
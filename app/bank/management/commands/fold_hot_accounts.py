@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from bank import sharding
+from bank.models import Account
+from bank.utils import fold_credits
+
+
+class Command(BaseCommand):
+    """Django command to fold the pending credits of hot accounts"""
+    help = 'Fold the credit slots of hot accounts into their balance'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=0,
+                            help='keep folding every given seconds')
+
+    def fold(self):
+        folded = 0
+        for alias in sharding.shards() or [DEFAULT_DB_ALIAS]:
+            accounts = Account.objects.using(alias).filter(
+                is_hot=True, credit_slots__amount__gt=0).distinct()
+            for account in accounts:
+                fold_credits(account)
+                folded += 1
+        return folded
+
+    def handle(self, *args, **options):
+        while True:
+            folded = self.fold()
+            self.stdout.write(f'{folded} hot accounts folded')
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,37 @@
+import csv
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from bank import sharding
+from bank.amortization import portfolio_schedules
+from bank.models import Loan
+
+
+class Command(BaseCommand):
+    """Django command to export the payment schedules of all open loans"""
+    help = 'Write the payment schedules of open loans as csv'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        writer = csv.writer(self.stdout, lineterminator='\n')
+        writer.writerow(('loan', 'number', 'payment', 'interest',
+                         'principal', 'balance'))
+        for alias in sharding.shards() or [DEFAULT_DB_ALIAS]:
+            loans = Loan.objects.using(alias).filter(outstanding__gt=0) \
+                .only('amount', 'annual_rate', 'term_months').order_by('pk')
+            chunk = []
+            for loan in loans.iterator(chunk_size=options['chunk_size']):
+                chunk.append(loan)
+                if len(chunk) == options['chunk_size']:
+                    self.write(writer, chunk)
+                    chunk = []
+            self.write(writer, chunk)
+
+    @staticmethod
+    def write(writer, loans):
+        for loan_id, installments in portfolio_schedules(loans).items():
+            writer.writerows((loan_id, *installment)
+                             for installment in installments)
@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from bank import sharding
+from bank.models import Bank, Branch, Account, AccountCreditSlot, \
+    Transaction, BaseTransaction, Withdraw, Deposit, Pay, Transfer, Loan, \
+    Repayment, StandingOrder, InterestProduct, Interest, AuditChain, \
+    LedgerEvent, Settlement, ShardDirectory
+
+BATCH_SIZE = 500
+
+
+def copy_rows(queryset, target, exclude=()):
+    """
+        Insert the rows into the target database as they are, unlike
+        bulk_create the ``created`` dates are not reset. The excluded fields
+        get their default on the target
+    """
+    model = queryset.model
+    manager = model._base_manager.db_manager(target)
+    fields = [field for field in model._meta.local_concrete_fields
+              if field.name not in exclude]
+    batch, copied = [], 0
+    for obj in queryset.iterator(chunk_size=BATCH_SIZE):
+        batch.append(obj)
+        if len(batch) == BATCH_SIZE:
+            manager._insert(batch, fields=fields, using=target, raw=True)
+            copied, batch = copied + len(batch), []
+    if batch:
+        manager._insert(batch, fields=fields, using=target, raw=True)
+        copied += len(batch)
+    return copied
+
+
+class Command(BaseCommand):
+    """
+        Django command to move a bank with all of its rows to another shard,
+        writes to the bank must be stopped while it runs
+    """
+    help = 'Move a bank with its branches, accounts and transactions ' \
+           'to another shard'
+
+    def add_arguments(self, parser):
+        parser.add_argument('bank_id')
+        parser.add_argument('shard', choices=settings.DATABASE_SHARDS or None)
+
+    def handle(self, *args, **options):
+        if not sharding.is_enabled():
+            raise CommandError('There is no shard configured')
+
+        bank_id, target = options['bank_id'], options['shard']
+        source = sharding.shard_for_bank(bank_id)
+        if source == target:
+            self.stdout.write(f'bank is already on {target}')
+            return
+        if not Bank.objects.using(source).filter(pk=bank_id).exists():
+            raise CommandError(f'There is no bank {bank_id} on {source}')
+
+        banks = Bank.objects.using(source).filter(pk=bank_id)
+        branches = Branch.objects.using(source).filter(bank_id=bank_id)
+        accounts = Account.objects.using(source).filter(
+            branch__bank_id=bank_id)
+        credit_slots = AccountCreditSlot.objects.using(source).filter(
+            account__branch__bank_id=bank_id)
+        movements = BaseTransaction.objects.using(source).filter(
+            account__branch__bank_id=bank_id)
+        transactions = Transaction.objects.using(source).filter(
+            branch__bank_id=bank_id)
+
+        products = InterestProduct.objects.using(source).filter(
+            bank_id=bank_id)
+
+        querysets = [banks, branches, products, accounts, credit_slots,
+                     movements]
+        querysets += [model.objects.using(source).filter(
+            account__branch__bank_id=bank_id)
+            for model in (Withdraw, Deposit, Pay, Transfer, Loan, Repayment,
+                          Interest, Settlement, StandingOrder)]
+        # the audit chains go with the branches, with their checkpoints
+        querysets += [transactions, AuditChain.objects.using(source).filter(
+            branch__bank_id=bank_id)]
+        # the change log of the movements goes along, LedgerSequence is the
+        # counter of each database so the events are numbered again by the
+        # tailer of the target after its own ones
+        ledger_events = LedgerEvent.objects.using(source).filter(
+            movement__in=movements.values('pk'))
+
+        with transaction.atomic(using=target):
+            for queryset in querysets:
+                copied = copy_rows(queryset, target)
+                self.stdout.write(f'{queryset.model.__name__}: {copied}')
+            copied = copy_rows(ledger_events, target, exclude=['sequence'])
+            self.stdout.write(f'LedgerEvent: {copied}')
+
+        ShardDirectory.objects.filter(bank_id=bank_id).update(shard=target)
+
+        with transaction.atomic(using=source):
+            # children of BaseTransaction are deleted along with it,
+            # standing orders along with their accounts and audit chains
+            # along with their branches
+            for queryset in (ledger_events, transactions, movements,
+                             credit_slots, accounts, products, branches,
+                             banks):
+                queryset.delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Bank {bank_id} moved from {source} to {target}'))
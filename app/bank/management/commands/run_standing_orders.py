@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from bank import sharding
+from bank.utils import run_standing_orders, STANDING_ORDER_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """
+        Django command to make the transfers of the due standing orders, the
+        orders are run in batches until none of them is due
+    """
+    help = 'Run the due standing orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=0,
+                            help='keep running every given seconds')
+        parser.add_argument('--batch-size', type=int,
+                            default=STANDING_ORDER_BATCH_SIZE)
+
+    def tick(self, batch_size):
+        now = timezone.now()
+        executed, failed = 0, 0
+        for alias in sharding.shards() or [DEFAULT_DB_ALIAS]:
+            while True:
+                done, errors = run_standing_orders(alias, now, batch_size)
+                if not done + errors:
+                    break
+                executed, failed = executed + done, failed + errors
+        return executed, failed
+
+    def handle(self, *args, **options):
+        while True:
+            executed, failed = self.tick(options['batch_size'])
+            self.stdout.write(
+                f'{executed} standing orders executed, {failed} failed')
+            if not options['every']:
+                break
+            time.sleep(options['every'])
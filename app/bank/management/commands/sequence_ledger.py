@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from bank import sharding
+from bank.ledger import sequence_events, SEQUENCE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """
+        Django command to number the committed ledger events of every
+        database, so the log is numbered whether a tail_ledger consumer is
+        running or not
+    """
+    help = 'Number the committed events of the ledger change log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=0,
+                            help='keep numbering every given seconds')
+
+    def sequence(self):
+        numbered = 0
+        for alias in sharding.shards() or [DEFAULT_DB_ALIAS]:
+            while True:
+                batch = sequence_events(alias)
+                numbered += batch
+                if batch < SEQUENCE_BATCH_SIZE:
+                    break
+        return numbered
+
+    def handle(self, *args, **options):
+        while True:
+            numbered = self.sequence()
+            self.stdout.write(f'{numbered} ledger events numbered')
+            if not options['every']:
+                break
+            time.sleep(options['every'])
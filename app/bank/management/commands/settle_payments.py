@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from bank import sharding
+from bank.models import Account, Pay
+from bank.utils import settle_payments
+
+
+class Command(BaseCommand):
+    """
+        Django command to settle the payments of merchants, each merchant
+        is credited once per run with the sum of its payments
+    """
+    help = 'Credit merchants with their unsettled payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=0,
+                            help='keep settling every given seconds')
+
+    def settle(self):
+        until = timezone.now()
+        merchants, payments = 0, 0
+        for alias in sharding.shards() or [DEFAULT_DB_ALIAS]:
+            merchant_ids = Pay.objects.using(alias) \
+                .filter(settled__isnull=True, merchant__isnull=False) \
+                .values_list('merchant_id', flat=True).distinct()
+            for merchant in Account.objects.using(alias).filter(
+                    pk__in=list(merchant_ids)):
+                settled, _ = settle_payments(merchant, until)
+                merchants += 1
+                payments += settled
+        return merchants, payments
+
+    def handle(self, *args, **options):
+        while True:
+            merchants, payments = self.settle()
+            self.stdout.write(
+                f'{payments} payments settled for {merchants} merchants')
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,71 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS
+
+from bank.ledger import sequence_events, read_events, event_data, \
+    SEQUENCE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """
+        Django command to write the change log of the movements of a
+        database as JSON lines, in batches from a checkpoint. The events
+        committed since the last batch are numbered first. The checkpoint
+        file keeps the last sequence written so a consumer restarting the
+        command goes on where it stopped
+    """
+    help = 'Tail the change log of the ledger movements'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='database or shard of the log')
+        parser.add_argument('--after', type=int,
+                            help='sequence to start after, default the '
+                                 'checkpoint')
+        parser.add_argument('--checkpoint',
+                            help='file keeping the last written sequence')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--every', type=float, default=0,
+                            help='keep polling every given seconds')
+
+    def read_checkpoint(self, path):
+        try:
+            with open(path) as file:
+                return int(file.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def write_checkpoint(self, path, sequence):
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w') as file:
+            file.write(str(sequence))
+        os.replace(temporary, path)
+
+    def handle(self, *args, **options):
+        database, checkpoint = options['database'], options['checkpoint']
+        after = options['after']
+        if after is None:
+            after = self.read_checkpoint(checkpoint) if checkpoint else 0
+
+        while True:
+            numbered = sequence_events(database)
+            events = read_events(database, after, options['batch_size'])
+            for event in events:
+                self.stdout.write(json.dumps(event_data(event),
+                                             cls=DjangoJSONEncoder))
+            if events:
+                after = events[-1].sequence
+                # the events are written before they are checkpointed
+                self.stdout.flush()
+                if checkpoint:
+                    self.write_checkpoint(checkpoint, after)
+
+            if len(events) < options['batch_size'] and \
+                    numbered < SEQUENCE_BATCH_SIZE:
+                if not options['every']:
+                    break
+                time.sleep(options['every'])
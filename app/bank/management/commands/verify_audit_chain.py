@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from bank import sharding
+from bank.audit import verify, VERIFY_CHUNK_SIZE
+from bank.models import AuditChain
+
+
+class Command(BaseCommand):
+    """
+        Django command to check the hash chains of the ledger entries of all
+        branches. Each chain is checked from the entry it was last verified
+        up to, the branches are checked in parallel and the checkpoints are
+        moved once the chains are found intact
+    """
+    help = 'Verify the audit hash chains of the branches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='check the chains from their first entry')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--chunk-size', type=int,
+                            default=VERIFY_CHUNK_SIZE)
+
+    def check_branch(self, alias, branch_id, options):
+        try:
+            return branch_id, verify(alias, branch_id, options['full'],
+                                     options['chunk_size'])
+        finally:
+            if options['workers'] > 1:
+                connections[alias].close()
+
+    def handle(self, *args, **options):
+        failed, verified = 0, 0
+        for alias in sharding.shards() or [DEFAULT_DB_ALIAS]:
+            branch_ids = list(AuditChain.objects.using(alias)
+                              .values_list('branch_id', flat=True))
+            check = partial(self.check_branch, alias, options=options)
+            if options['workers'] > 1:
+                with ThreadPoolExecutor(options['workers']) as pool:
+                    results = list(pool.map(check, branch_ids))
+            else:
+                results = [check(branch_id) for branch_id in branch_ids]
+
+            now = timezone.now()
+            for branch_id, (error, length, last_hash) in results:
+                if error:
+                    failed += 1
+                    self.stderr.write(f'branch {branch_id}: {error}')
+                    continue
+                verified += 1
+                AuditChain.objects.using(alias).filter(
+                    branch_id=branch_id).update(verified_length=length,
+                                                verified_hash=last_hash,
+                                                verified=now)
+
+        if failed:
+            raise CommandError(f'{failed} audit chains are broken')
+        self.stdout.write(self.style.SUCCESS(
+            f'{verified} audit chains verified'))
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.5 on 2026-10-19 15:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('bank', '0005_alter_transaction_transaction_ct'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardDirectory',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('bank_id', models.UUIDField(db_index=True)),
+                ('shard', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='account',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='accounts', to='accounts.user'),
+        ),
+        migrations.AlterField(
+            model_name='bank',
+            name='banker',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='accounts.user'),
+        ),
+        migrations.AlterField(
+            model_name='branch',
+            name='teller',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='accounts.user'),
+        ),
+    ]
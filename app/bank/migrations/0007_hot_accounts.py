@@ -0,0 +1,31 @@
+# Generated by Django 3.2.5 on 2026-10-19 15:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank', '0006_shard_directory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='is_hot',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='AccountCreditSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credit_slots', to='bank.account')),
+            ],
+            options={
+                'unique_together': {('account', 'slot')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.5 on 2026-10-19 15:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank', '0007_hot_accounts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pay',
+            name='merchant',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='received_payments', to='bank.account'),
+        ),
+        migrations.AddField(
+            model_name='pay',
+            name='settled',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='pay',
+            index=models.Index(fields=['merchant', 'settled'], name='bank_pay_merchan_907221_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.5 on 2026-10-19 15:23
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank', '0008_pay_merchant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Loan',
+            fields=[
+                ('basetransaction_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='bank.basetransaction')),
+                ('annual_rate', models.DecimalField(decimal_places=4, max_digits=6, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)])),
+                ('term_months', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('outstanding', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10)),
+                ('accrued_interest', models.DecimalField(decimal_places=6, default=0, editable=False, max_digits=16)),
+                ('accrued_until', models.DateField(editable=False, null=True)),
+            ],
+            bases=('bank.basetransaction',),
+        ),
+        migrations.CreateModel(
+            name='Repayment',
+            fields=[
+                ('basetransaction_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='bank.basetransaction')),
+                ('interest_paid', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10)),
+                ('repaid_loan', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='repayments', to='bank.loan')),
+            ],
+            options={
+                'abstract': False,
+            },
+            bases=('bank.basetransaction',),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['accrued_until'], name='bank_loan_accrued_6bc669_idx'),
+        ),
+    ]
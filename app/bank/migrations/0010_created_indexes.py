@@ -0,0 +1,21 @@
+# Generated by Django 3.2.5 on 2026-10-19 15:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank', '0009_loan'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='basetransaction',
+            index=models.Index(fields=['created'], name='bank_basetr_created_665b19_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['created'], name='bank_transa_created_e9c31c_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.2.5 on 2026-10-19 15:37
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank', '0010_created_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StandingOrder',
+            fields=[
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(0.01)])),
+                ('start', models.DateTimeField()),
+                ('every', models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)])),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], default='month', max_length=5)),
+                ('end', models.DateTimeField(blank=True, null=True)),
+                ('next_run', models.DateTimeField(editable=False)),
+                ('runs', models.PositiveIntegerField(default=0, editable=False)),
+                ('failures', models.PositiveIntegerField(default=0, editable=False)),
+                ('last_error', models.CharField(blank=True, editable=False, max_length=200)),
+                ('active', models.BooleanField(default=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standing_orders', to='bank.account')),
+                ('to_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='incoming_standing_orders', to='bank.account')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='standingorder',
+            index=models.Index(fields=['active', 'next_run'], name='bank_standi_active_4baeb4_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.2.5 on 2026-10-19 15:40
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank', '0011_standing_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='interest_accrued_until',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='InterestProduct',
+            fields=[
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('name', models.CharField(max_length=200)),
+                ('annual_rate', models.DecimalField(decimal_places=4, max_digits=6, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)])),
+                ('min_balance', models.DecimalField(decimal_places=2, default=0, max_digits=10, validators=[django.core.validators.MinValueValidator(0)])),
+                ('active', models.BooleanField(default=True)),
+                ('bank', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interest_products', to='bank.bank')),
+                ('branch', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='interest_product', to='bank.branch')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Interest',
+            fields=[
+                ('basetransaction_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='bank.basetransaction')),
+                ('day', models.DateField()),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='credits', to='bank.interestproduct')),
+            ],
+            options={
+                'abstract': False,
+            },
+            bases=('bank.basetransaction',),
+        ),
+    ]
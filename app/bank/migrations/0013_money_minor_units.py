@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import F, Value
+
+import core.money
+
+# money columns, they held major units in DecimalField(10, 2) before
+MONEY_FIELDS = (
+    ('account', 'balance',
+     {'default': 0,
+      'validators': [django.core.validators.MinValueValidator(0)]}),
+    ('accountcreditslot', 'amount', {'default': 0}),
+    ('basetransaction', 'amount',
+     {'validators': [django.core.validators.MinValueValidator(0)]}),
+    ('loan', 'outstanding', {'default': 0, 'editable': False}),
+    ('repayment', 'interest_paid', {'default': 0, 'editable': False}),
+    ('interestproduct', 'min_balance',
+     {'default': 0,
+      'validators': [django.core.validators.MinValueValidator(0)]}),
+    ('standingorder', 'amount',
+     {'validators': [django.core.validators.MinValueValidator(0.01)]}),
+)
+
+
+def alter_fields(field_factory):
+    return [migrations.AlterField(model_name=model_name, name=name,
+                                  field=field_factory(**options))
+            for model_name, name, options in MONEY_FIELDS]
+
+
+def wide_decimal(**options):
+    # wide enough for the values in minor units
+    return models.DecimalField(max_digits=20, decimal_places=2, **options)
+
+
+def _update_amounts(apps, schema_editor, expression):
+    alias = schema_editor.connection.alias
+    for model_name, name, _ in MONEY_FIELDS:
+        model = apps.get_model('bank', model_name)
+        model.objects.using(alias).update(**{name: expression(F(name))})
+
+
+def to_minor_units(apps, schema_editor):
+    _update_amounts(apps, schema_editor, lambda amount: amount * 100)
+
+
+def to_major_units(apps, schema_editor):
+    _update_amounts(apps, schema_editor,
+                    lambda amount: amount * Value(Decimal('0.01')))
+
+
+class Migration(migrations.Migration):
+    """
+        Store amounts of money as BIGINT minor units: the columns are
+        widened, multiplied by 100 in place and then cast to bigint
+    """
+
+    dependencies = [
+        ('bank', '0012_interest_products'),
+    ]
+
+    operations = alter_fields(wide_decimal) + [
+        migrations.RunPython(to_minor_units, to_major_units),
+    ] + alter_fields(core.money.MoneyField) + [
+        migrations.AddField(
+            model_name='account',
+            name='currency',
+            field=models.CharField(default='IRR', max_length=3),
+        ),
+    ]
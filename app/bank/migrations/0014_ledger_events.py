@@ -0,0 +1,38 @@
+# Generated by Django 3.2.5 on 2026-10-19 16:00
+
+import core.money
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank', '0013_money_minor_units'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.BigIntegerField(editable=False, null=True, unique=True)),
+                ('kind', models.CharField(max_length=20)),
+                ('movement', models.UUIDField()),
+                ('account', models.UUIDField(null=True)),
+                ('counterparty', models.UUIDField(null=True)),
+                ('amount', core.money.MoneyField()),
+                ('created', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LedgerSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='ledgerevent',
+            index=models.Index(condition=models.Q(('sequence__isnull', True)), fields=['id'], name='bank_ledger_unsequenced_idx'),
+        ),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 3.2.5 on 2026-10-19 16:03
+
+import hashlib
+
+from django.db import migrations, models
+from django.db.models import Q
+import django.db.models.deletion
+import django.utils.timezone
+
+BATCH_SIZE = 1000
+
+
+# copies of bank.audit as it is when the chains start, the migration has to
+# hash the entries the same way whatever the module becomes
+def digest(previous_hash, index, values):
+    message = '|'.join([previous_hash, str(index)] +
+                       ['' if value is None else str(value)
+                        for value in values])
+    return hashlib.sha256(message.encode()).hexdigest()
+
+
+def entry_values(pk, branch_id, ct_id, movement_id, created, amount,
+                 account_id):
+    return (pk, branch_id, ct_id, movement_id, created.isoformat(),
+            None if amount is None else amount.minor, account_id)
+
+
+def chain_existing_entries(apps, schema_editor):
+    """
+        Chain the ledger entries of each branch in the order of creation,
+        the entries are read in chunks after the (created, id) of the last
+        one so a branch is never loaded whole
+    """
+    alias = schema_editor.connection.alias
+    Transaction = apps.get_model('bank', 'Transaction')
+    BaseTransaction = apps.get_model('bank', 'BaseTransaction')
+    AuditChain = apps.get_model('bank', 'AuditChain')
+    entries = Transaction.objects.using(alias)
+    branch_ids = entries.filter(branch__isnull=False).order_by() \
+        .values_list('branch_id', flat=True).distinct()
+    for branch_id in list(branch_ids):
+        length, previous = 0, AuditChain._meta.get_field('last_hash').default
+        branch_entries = entries.filter(branch_id=branch_id) \
+            .order_by('created', 'id')
+        batch = list(branch_entries[:BATCH_SIZE])
+        while batch:
+            movements = {pk: (amount, account) for pk, amount, account in
+                         BaseTransaction.objects.using(alias)
+                         .filter(pk__in=[entry.transaction_id
+                                         for entry in batch])
+                         .values_list('pk', 'amount', 'account_id')}
+            for entry in batch:
+                length += 1
+                amount, account = movements.get(entry.transaction_id,
+                                                (None, None))
+                previous = digest(previous, length, entry_values(
+                    entry.pk, entry.branch_id, entry.transaction_ct_id,
+                    entry.transaction_id, entry.created, amount, account))
+                entry.chain_index, entry.hash = length, previous
+            entries.bulk_update(batch, ['chain_index', 'hash'])
+            last = batch[-1]
+            batch = list(branch_entries.filter(
+                Q(created__gt=last.created) |
+                Q(created=last.created, id__gt=last.id))[:BATCH_SIZE])
+        AuditChain.objects.using(alias).create(
+            branch_id=branch_id, length=length, last_hash=previous)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank', '0014_ledger_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditChain',
+            fields=[
+                ('branch', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='audit_chain', serialize=False, to='bank.branch')),
+                ('length', models.BigIntegerField(default=0)),
+                ('last_hash', models.CharField(default='0000000000000000000000000000000000000000000000000000000000000000', max_length=64)),
+                ('verified_length', models.BigIntegerField(default=0)),
+                ('verified_hash', models.CharField(default='0000000000000000000000000000000000000000000000000000000000000000', max_length=64)),
+                ('verified', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='chain_index',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='created',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(fields=('branch', 'chain_index'), name='bank_transaction_chain'),
+        ),
+        migrations.RunPython(chain_existing_entries,
+                             migrations.RunPython.noop),
+    ]
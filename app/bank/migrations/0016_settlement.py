@@ -0,0 +1,25 @@
+# Generated by Django 3.2.5 on 2026-10-19 17:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank', '0015_audit_chain'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Settlement',
+            fields=[
+                ('basetransaction_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='bank.basetransaction')),
+                ('payments', models.PositiveIntegerField()),
+            ],
+            options={
+                'abstract': False,
+            },
+            bases=('bank.basetransaction',),
+        ),
+    ]
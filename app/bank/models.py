@@ -1,9 +1,16 @@
-from django.db import models
+import calendar
+from datetime import timedelta
+
+from django.db import models, router, transaction
+from django.db.models import Sum
+from django.utils import timezone
 from django.core.validators import MinValueValidator, \
     MaxValueValidator
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from core.models import BaseModelMixin
+from core.money import MoneyField, DEFAULT_CURRENCY
+from .sharding import ShardedManager
 from django.conf import settings
 
 
@@ -14,7 +21,10 @@ class Bank(BaseModelMixin):
     name = models.CharField(max_length=200)
     address = models.CharField(max_length=200)
     banker = models.OneToOneField(settings.AUTH_USER_MODEL,
-                                  on_delete=models.CASCADE)
+                                  on_delete=models.CASCADE,
+                                  db_constraint=False)
+
+    objects = ShardedManager()
 
     def __str__(self):
         return f"{self.name}"
@@ -29,7 +39,10 @@ class Branch(BaseModelMixin):
     name = models.CharField(max_length=200)
     address = models.CharField(max_length=200)
     teller = models.OneToOneField(settings.AUTH_USER_MODEL,
-                                  on_delete=models.CASCADE)
+                                  on_delete=models.CASCADE,
+                                  db_constraint=False)
+
+    objects = ShardedManager()
 
     class Meta:
         unique_together = ('bank', 'teller')
@@ -48,7 +61,8 @@ class Account(BaseModelMixin):
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE,
-                             related_name='accounts')
+                             related_name='accounts',
+                             db_constraint=False)
 
     branch = models.ForeignKey(Branch,
                                on_delete=models.SET_NULL,
@@ -60,14 +74,47 @@ class Account(BaseModelMixin):
                                         MinValueValidator(ACCOUNT_MIN_NUMBER),
                                         MaxValueValidator(ACCOUNT_MAX_NUMBER)])
 
-    balance = models.DecimalField(default=0.0,
-                                  max_digits=10,
-                                  decimal_places=2,
-                                  validators=[MinValueValidator(0.0)])
+    balance = MoneyField(default=0, validators=[MinValueValidator(0)])
+    currency = models.CharField(max_length=3, default=DEFAULT_CURRENCY)
+
+    # credits of hot accounts go to AccountCreditSlot rows instead of the
+    # balance, so they don't wait on the lock of this row
+    is_hot = models.BooleanField(default=False)
+
+    interest_accrued_until = models.DateField(null=True, editable=False)
+
+    objects = ShardedManager()
 
     def __str__(self):
         return f"{self.user} {self.branch} {self.balance}"
 
+    def total_balance(self):
+        """Balance including the credits which are not folded yet"""
+        if not self.is_hot:
+            return self.balance
+        pending = self.credit_slots.aggregate(Sum('amount'))['amount__sum']
+        return self.balance + (pending or 0)
+
+
+class AccountCreditSlot(models.Model):
+    """
+        Sub balance of a hot account, credits are spread over the slots and
+        folded into the account balance periodically
+    """
+    account = models.ForeignKey(Account,
+                                on_delete=models.CASCADE,
+                                related_name='credit_slots')
+    slot = models.PositiveSmallIntegerField()
+    amount = MoneyField(default=0)
+
+    objects = ShardedManager()
+
+    class Meta:
+        unique_together = ('account', 'slot')
+
+    def __str__(self):
+        return f"{self.account_id} [{self.slot}] {self.amount}"
+
 
 class Transaction(BaseModelMixin):
     """
@@ -88,6 +135,29 @@ class Transaction(BaseModelMixin):
                                       db_index=True)
     transaction_type = GenericForeignKey('transaction_ct', 'transaction_id')
 
+    # set when the instance is built since it is covered by the hash
+    created = models.DateTimeField(default=timezone.now, editable=False)
+    # position and hash of the entry in the audit chain of the branch
+    chain_index = models.BigIntegerField(null=True, editable=False)
+    hash = models.CharField(max_length=64, blank=True, editable=False)
+
+    objects = ShardedManager()
+
+    class Meta:
+        indexes = [models.Index(fields=['created'])]
+        constraints = [models.UniqueConstraint(
+            fields=['branch', 'chain_index'], name='bank_transaction_chain')]
+
+    def save(self, *args, **kwargs):
+        """
+            Save in a transaction, a new entry locks the head of the audit
+            chain of its branch until it is inserted
+        """
+        using = kwargs.get('using') or \
+            router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f'{self.transaction_type}'
 
@@ -97,16 +167,17 @@ class BaseTransaction(BaseModelMixin):
         Base abstract transaction that all other transactions
         inherit from
     """
-    amount = models.DecimalField(max_digits=10,
-                                 decimal_places=2,
-                                 validators=[MinValueValidator(0.0)])
+    amount = MoneyField(validators=[MinValueValidator(0)])
 
     account = models.ForeignKey(Account,
                                 on_delete=models.SET_NULL,
                                 null=True)
 
+    objects = ShardedManager()
+
     class Meta:
         abstract: True
+        indexes = [models.Index(fields=['created'])]
 
     def __str__(self):
         name = self.__class__.__name__  # class name
@@ -123,8 +194,23 @@ class Deposit(BaseTransaction):
 
 
 class Pay(BaseTransaction):
-    """Pay model to send money to an account"""
-    pass
+    """
+        Pay model to send money to a merchant account, the merchant is
+        credited later by the settlement in batches
+    """
+    merchant = models.ForeignKey(Account,
+                                 on_delete=models.SET_NULL,
+                                 null=True,
+                                 related_name='received_payments')
+    settled = models.DateTimeField(null=True, editable=False)
+
+    class Meta:
+        indexes = [models.Index(fields=['merchant', 'settled'])]
+
+
+class Settlement(BaseTransaction):
+    """Settlement model to credit a merchant with its settled payments"""
+    payments = models.PositiveIntegerField()
 
 
 class Transfer(BaseTransaction):
@@ -138,4 +224,210 @@ class Transfer(BaseTransaction):
         return f"{self.amount}\tfrom\t{self.account}\tto\t" \
                f"{self.to_account}\t{name}"
 
-# TODO: CREATE Load Model
+
+class Loan(BaseTransaction):
+    """
+        Loan model to lend money to the account, the amount is the
+        principal which is paid back in term_months monthly payments
+    """
+    annual_rate = models.DecimalField(max_digits=6,
+                                      decimal_places=4,
+                                      validators=[MinValueValidator(0),
+                                                  MaxValueValidator(1)])
+    term_months = models.PositiveIntegerField(
+        validators=[MinValueValidator(1)])
+
+    outstanding = MoneyField(default=0, editable=False)
+    # fractions of a cent add up here so it is not Money
+    accrued_interest = models.DecimalField(default=0,
+                                           max_digits=16,
+                                           decimal_places=6,
+                                           editable=False)
+    accrued_until = models.DateField(null=True, editable=False)
+
+    class Meta:
+        indexes = [models.Index(fields=['accrued_until'])]
+
+
+class Repayment(BaseTransaction):
+    """Repayment model to pay back a loan from the account"""
+    # "loan" is taken by the parent link of Loan on BaseTransaction
+    repaid_loan = models.ForeignKey(Loan,
+                                    on_delete=models.SET_NULL,
+                                    null=True,
+                                    related_name='repayments')
+    interest_paid = MoneyField(default=0, editable=False)
+
+
+class InterestProduct(BaseModelMixin):
+    """
+        Interest paid daily on the balance of the accounts of a bank, a
+        product of a branch is used instead for the accounts of the branch
+    """
+    bank = models.ForeignKey(Bank,
+                             on_delete=models.CASCADE,
+                             related_name='interest_products')
+    branch = models.OneToOneField(Branch,
+                                  on_delete=models.CASCADE,
+                                  null=True,
+                                  blank=True,
+                                  related_name='interest_product')
+    name = models.CharField(max_length=200)
+    annual_rate = models.DecimalField(max_digits=6,
+                                      decimal_places=4,
+                                      validators=[MinValueValidator(0),
+                                                  MaxValueValidator(1)])
+    min_balance = MoneyField(default=0, validators=[MinValueValidator(0)])
+    active = models.BooleanField(default=True)
+
+    objects = ShardedManager()
+
+    def __str__(self):
+        return f"{self.name} {self.annual_rate} ({self.branch or self.bank})"
+
+    def accounts(self):
+        """Accounts earning interest with this product"""
+        if self.branch_id:
+            return Account.objects.filter(branch=self.branch_id)
+        return Account.objects.filter(branch__bank=self.bank_id).exclude(
+            branch__interest_product__active=True)
+
+
+class Interest(BaseTransaction):
+    """Interest model to credit the daily interest of a product"""
+    product = models.ForeignKey(InterestProduct,
+                                on_delete=models.SET_NULL,
+                                null=True,
+                                related_name='credits')
+    day = models.DateField()
+
+
+class StandingOrder(BaseModelMixin):
+    """
+        Standing order to transfer the amount from the account to another
+        account on ``start`` and then every ``every`` periods until ``end``
+    """
+    DAY, WEEK, MONTH = 'day', 'week', 'month'
+    PERIOD_CHOICES = ((DAY, 'Day'), (WEEK, 'Week'), (MONTH, 'Month'))
+
+    account = models.ForeignKey(Account,
+                                on_delete=models.CASCADE,
+                                related_name='standing_orders')
+    to_account = models.ForeignKey(Account,
+                                   on_delete=models.CASCADE,
+                                   related_name='incoming_standing_orders')
+    amount = MoneyField(validators=[MinValueValidator(0.01)])
+
+    start = models.DateTimeField()
+    every = models.PositiveSmallIntegerField(default=1,
+                                             validators=[MinValueValidator(1)])
+    period = models.CharField(max_length=5,
+                              choices=PERIOD_CHOICES,
+                              default=MONTH)
+    end = models.DateTimeField(null=True, blank=True)
+
+    # runs is the number of past occurrences, failed ones included
+    next_run = models.DateTimeField(editable=False)
+    runs = models.PositiveIntegerField(default=0, editable=False)
+    failures = models.PositiveIntegerField(default=0, editable=False)
+    last_error = models.CharField(max_length=200, blank=True, editable=False)
+    active = models.BooleanField(default=True)
+
+    objects = ShardedManager()
+
+    class Meta:
+        indexes = [models.Index(fields=['active', 'next_run'])]
+
+    def __str__(self):
+        return f"{self.amount} every {self.every} {self.period} " \
+               f"from {self.account_id} to {self.to_account_id}"
+
+    def occurrence(self, number):
+        """Date of the occurrence with the number, the first one is 0"""
+        steps = number * self.every
+        if self.period == self.DAY:
+            return self.start + timedelta(days=steps)
+        if self.period == self.WEEK:
+            return self.start + timedelta(weeks=steps)
+        month = self.start.month - 1 + steps
+        year = self.start.year + month // 12
+        month = month % 12 + 1
+        day = min(self.start.day, calendar.monthrange(year, month)[1])
+        return self.start.replace(year=year, month=month, day=day)
+
+    def save(self, *args, **kwargs):
+        if self.next_run is None:
+            self.next_run = self.occurrence(self.runs)
+        return super().save(*args, **kwargs)
+
+
+class LedgerEvent(models.Model):
+    """
+        Change log of the movements, an event is written in the transaction
+        of its movement and gets its sequence number after it is committed,
+        from the sequence_ledger job or the tail_ledger command (see
+        bank.ledger), so consumers can read the log by sequence
+    """
+    sequence = models.BigIntegerField(null=True, unique=True, editable=False)
+    kind = models.CharField(max_length=20)
+    movement = models.UUIDField()
+    account = models.UUIDField(null=True)
+    counterparty = models.UUIDField(null=True)
+    amount = MoneyField()
+    created = models.DateTimeField()
+
+    objects = ShardedManager()
+
+    class Meta:
+        indexes = [models.Index(fields=['id'],
+                                condition=models.Q(sequence__isnull=True),
+                                name='bank_ledger_unsequenced_idx')]
+
+    def __str__(self):
+        return f"{self.sequence} {self.kind} {self.amount}"
+
+
+class LedgerSequence(models.Model):
+    """Last sequence number given to a ledger event in the database"""
+    last = models.BigIntegerField(default=0)
+
+    objects = ShardedManager()
+
+    def __str__(self):
+        return f"{self.last}"
+
+
+class AuditChain(models.Model):
+    """
+        Last entry of the hash chain of the transactions of a branch and the
+        entry up to which the chain was verified
+    """
+    GENESIS = '0' * 64
+
+    branch = models.OneToOneField(Branch,
+                                  on_delete=models.CASCADE,
+                                  primary_key=True,
+                                  related_name='audit_chain')
+    length = models.BigIntegerField(default=0)
+    last_hash = models.CharField(max_length=64, default=GENESIS)
+    verified_length = models.BigIntegerField(default=0)
+    verified_hash = models.CharField(max_length=64, default=GENESIS)
+    verified = models.DateTimeField(null=True, blank=True)
+
+    objects = ShardedManager()
+
+    def __str__(self):
+        return f"{self.branch_id} {self.length}"
+
+
+class ShardDirectory(models.Model):
+    """
+        Directory that maps banks, branches and bankers to the database shard
+        holding the bank data, it always lives in the default database
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    bank_id = models.UUIDField(db_index=True)
+    shard = models.CharField(max_length=100)
+
+    def __str__(self):
+        return f"{self.key} -> {self.shard}"
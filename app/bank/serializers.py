@@ -1,5 +1,47 @@
+import functools
+
 from rest_framework import serializers
-from .models import Account, BaseTransaction, Transaction, Branch
+from rest_framework.settings import api_settings
+from core.money import Money, MoneyField as MoneyModelField, \
+    DECIMAL_PLACES, MAX_AMOUNT
+from .models import Account, BaseTransaction, Transaction, Branch, \
+    StandingOrder
+
+
+class MoneyField(serializers.DecimalField):
+    """
+        Field for amounts of money, the input is read as a Decimal and
+        turned into Money and Money is written without going through Decimal.
+        The range of the BIGINT column is in minor units, so the limits taken
+        from the model field are brought down to what the column holds
+    """
+
+    def __init__(self, max_digits=None, decimal_places=DECIMAL_PLACES,
+                 **kwargs):
+        kwargs['max_value'] = min(kwargs.get('max_value', MAX_AMOUNT),
+                                  MAX_AMOUNT)
+        kwargs['min_value'] = max(kwargs.get('min_value', -MAX_AMOUNT),
+                                  -MAX_AMOUNT)
+        super().__init__(max_digits, decimal_places, **kwargs)
+
+    def to_internal_value(self, data):
+        return Money.of(super().to_internal_value(data))
+
+    def to_representation(self, value):
+        if isinstance(value, Money) and not self.localize:
+            if getattr(self, 'coerce_to_string',
+                       api_settings.COERCE_DECIMAL_TO_STRING):
+                return str(value)
+            return value.decimal
+        return super().to_representation(value)
+
+
+class MoneySerializerMixin:
+    """Mixin for model serializers to use MoneyField for amounts"""
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        MoneyModelField: MoneyField,
+    }
 
 
 class BranchSerializer(serializers.ModelSerializer):
@@ -13,15 +55,17 @@ class BranchSerializer(serializers.ModelSerializer):
         extra_kwargs = {"bank": {'read_only': True}}
 
 
-class AccountSerializer(serializers.ModelSerializer):
+class AccountSerializer(MoneySerializerMixin,
+                        serializers.ModelSerializer):
     """
         Model serializer to open an account
     """
 
+    balance = MoneyField(source='total_balance', read_only=True)
+
     class Meta:
         model = Account
         fields = ['number', 'branch', 'balance']
-        extra_kwargs = {"balance": {'read_only': True}}
 
     def create(self, validated_data):
         """
@@ -44,8 +88,12 @@ class SerializerCreator:
     """
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def model_serializer_factory(model):
-        """Factory to create generic ModelSerializer"""
+        """
+            Factory to create generic ModelSerializer, the class is built
+            once per model instead of on every request
+        """
         assert issubclass(model, BaseTransaction)
         Meta = type('Meta',
                     (object,),
@@ -55,7 +103,8 @@ class SerializerCreator:
                      })
 
         Serializer = type('TransactionTypeSerializer',
-                          (serializers.ModelSerializer,),
+                          (MoneySerializerMixin,
+                           serializers.ModelSerializer),
                           {'Meta': Meta})
         return Serializer
 
@@ -68,3 +117,28 @@ class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transaction
         fields = ('branch', 'transaction_type')
+
+
+class StandingOrderSerializer(MoneySerializerMixin,
+                              serializers.ModelSerializer):
+    """
+        Model serializer to create a standing order
+    """
+
+    class Meta:
+        model = StandingOrder
+        fields = ('id', 'account', 'to_account', 'amount', 'start', 'every',
+                  'period', 'end', 'next_run', 'active')
+        read_only_fields = ('next_run', 'active')
+
+    def validate(self, attrs):
+        if attrs['account'] == attrs['to_account']:
+            raise serializers.ValidationError(
+                'The accounts of a standing order must differ')
+        if attrs['account'].currency != attrs['to_account'].currency:
+            raise serializers.ValidationError(
+                'The accounts of a standing order must have one currency')
+        if attrs.get('end') and attrs['end'] < attrs['start']:
+            raise serializers.ValidationError(
+                {'end': 'The end must be after the start'})
+        return attrs
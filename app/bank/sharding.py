@@ -0,0 +1,193 @@
+import threading
+import uuid
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, models
+
+# models of the bank app that are stored on the shard of their bank
+SHARDED_MODELS = ('bank', 'branch', 'account', 'accountcreditslot',
+                  'transaction', 'basetransaction', 'withdraw', 'deposit',
+                  'pay', 'transfer', 'loan', 'repayment', 'standingorder',
+                  'interestproduct', 'interest', 'settlement',
+                  'ledgerevent', 'ledgersequence', 'auditchain')
+
+# models kept once in the default database, the shards have copies of the
+# content types only for the generic relations resolved on them
+DEFAULT_MODELS = ('bank.sharddirectory', 'contenttypes.contenttype')
+
+_local = threading.local()
+
+
+class ShardNotSelected(Exception):
+    """A sharded model is read outside of a shard while shards are on"""
+
+
+def shards():
+    """Return the aliases of the configured shards"""
+    return getattr(settings, 'DATABASE_SHARDS', [])
+
+
+def is_enabled():
+    return bool(shards())
+
+
+def is_sharded(model):
+    return model._meta.app_label == 'bank' and \
+        model._meta.model_name in SHARDED_MODELS
+
+
+def _directory():
+    return apps.get_model('bank', 'ShardDirectory').objects.using(
+        DEFAULT_DB_ALIAS)
+
+
+def _lookup(key):
+    return _directory().filter(key=key).values_list('shard', flat=True) \
+        .first()
+
+
+def hashed_shard(bank_id):
+    """Pick the shard of a bank which is not in the directory yet"""
+    all_shards = shards()
+    return all_shards[uuid.UUID(str(bank_id)).int % len(all_shards)]
+
+
+def shard_for_bank(bank_id):
+    if not is_enabled() or bank_id is None:
+        return None
+    return _lookup(f'bank:{bank_id}') or hashed_shard(bank_id)
+
+
+def shard_for_branch(branch_id):
+    if not is_enabled() or branch_id is None:
+        return None
+    return _lookup(f'branch:{branch_id}')
+
+
+def shard_for_banker(banker_id):
+    if not is_enabled() or banker_id is None:
+        return None
+    return _lookup(f'banker:{banker_id}')
+
+
+def shard_for_instance(instance):
+    """Find the shard of an unsaved instance from its parent rows"""
+    name = instance._meta.model_name
+    if name == 'bank':
+        return shard_for_bank(instance.pk)
+    if name == 'branch':
+        return shard_for_bank(instance.bank_id)
+    if name in ('account', 'transaction'):
+        return shard_for_branch(instance.branch_id)
+    if instance.account_id is not None:
+        return instance.account._state.db
+    return None
+
+
+def register(key, bank_id, shard):
+    """Save where the rows reachable through the key are stored"""
+    _directory().update_or_create(key=key, defaults={'bank_id': bank_id,
+                                                     'shard': shard})
+
+
+def current_shard():
+    return getattr(_local, 'shard', None)
+
+
+@contextmanager
+def using_shard(alias):
+    """
+        Route all bank queries inside the block to the shard, passing None
+        keeps the current routing
+    """
+    if alias is None:
+        yield
+        return
+    previous = current_shard()
+    _local.shard = alias
+    try:
+        yield
+    finally:
+        _local.shard = previous
+
+
+class ShardedQuerySet(models.QuerySet):
+    """
+        QuerySet for sharded models, ``create`` lets the router pick the
+        database from the new instance instead of the model
+    """
+
+    def create(self, **kwargs):
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
+ShardedManager = models.Manager.from_queryset(ShardedQuerySet)
+
+
+class ShardRouter:
+    """
+        Database router that places each bank with its branches, accounts
+        and transactions on one of DATABASE_SHARDS, the shard is taken from
+        the current ``using_shard`` block or from the instance being saved.
+        Reading a sharded model without either raises ShardNotSelected
+        instead of reading the empty tables of the default database. It does
+        nothing while no shard is configured
+    """
+
+    def db_for_read(self, model, **hints):
+        if not is_enabled():
+            return None
+        if model._meta.label_lower in DEFAULT_MODELS:
+            return DEFAULT_DB_ALIAS
+        if not is_sharded(model):
+            return None
+        if current_shard():
+            return current_shard()
+        instance = hints.get('instance')
+        if instance is not None and is_sharded(type(instance)) and \
+                instance._state.db:
+            return instance._state.db
+        # the default database has the bank tables too, but empty
+        raise ShardNotSelected(
+            f'{model._meta.label} is read without a shard, use .using() or '
+            f'sharding.using_shard()')
+
+    def db_for_write(self, model, **hints):
+        if not is_enabled():
+            return None
+        if model._meta.label_lower in DEFAULT_MODELS:
+            return DEFAULT_DB_ALIAS
+        if not is_sharded(model):
+            return None
+        if current_shard():
+            return current_shard()
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if isinstance(instance, model) and instance._state.adding:
+            return shard_for_instance(instance)
+        if is_sharded(type(instance)):
+            return instance._state.db
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not is_enabled():
+            return None
+        # users and content types are shared by all shards
+        if is_sharded(type(obj1)) != is_sharded(type(obj2)):
+            return True
+        # new rows are saved on the shard of their parent
+        if obj1._state.adding or obj2._state.adding:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in shards() and app_label == 'bank' and \
+                model_name == 'sharddirectory':
+            return False
+        return None
@@ -1,13 +1,46 @@
-from django.db.models.signals import post_save
-from .models import Transaction
+from django.db.models.signals import post_save, pre_save
+from .models import Transaction, Bank, Branch, BaseTransaction
 from django.dispatch import receiver
+from . import sharding, events, ledger, audit
+
+
+@receiver(pre_save, sender=Transaction)
+def link_transaction(sender, instance, raw, using, **kwargs):
+    """Chain a new ledger entry to the audit log of its branch"""
+    if instance._state.adding and not raw and instance.chain_index is None:
+        audit.link([instance], using)
 
 
 @receiver(post_save, sender=Transaction)
-def actions_for_transaction_creation(sender, instance, **kwargs):
+def actions_for_transaction_creation(sender, instance, created, using,
+                                     **kwargs):
     """
         Send message to user when a transaction related to his/her
         account was created
      """
     # TODO, Use Celery and RabbitMQ to for sending mail or SMS
-    pass
+    if created:
+        events.publish_transactions([instance], using)
+
+
+@receiver(post_save)
+def record_movement(sender, instance, created, using, raw=False, **kwargs):
+    """Write the change log event of a new movement in its transaction"""
+    if created and not raw and isinstance(instance, BaseTransaction) and \
+            sender is not BaseTransaction:
+        ledger.record_movements([instance], using)
+
+
+@receiver(post_save, sender=Bank)
+def register_bank_shard(sender, instance, created, using, **kwargs):
+    """Save the shard of a new bank so it can be found by bank or banker"""
+    if created and sharding.is_enabled():
+        sharding.register(f'bank:{instance.pk}', instance.pk, using)
+        sharding.register(f'banker:{instance.banker_id}', instance.pk, using)
+
+
+@receiver(post_save, sender=Branch)
+def register_branch_shard(sender, instance, created, using, **kwargs):
+    """Save the shard of a new branch so requests can be routed by branch"""
+    if created and sharding.is_enabled():
+        sharding.register(f'branch:{instance.pk}', instance.bank_id, using)
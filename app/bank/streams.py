@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import reverse
+from rest_framework import exceptions
+
+from accounts.authentication import ExpiringTokenAuthentication
+from . import events, sharding
+from .models import Account
+
+
+def account_channels(user):
+    """Event channels of the accounts of the user on all shards"""
+    return [events.account_channel(pk)
+            for alias in sharding.shards() or [None]
+            for pk in Account.objects.using(alias).filter(user=user)
+            .values_list('pk', flat=True)]
+
+
+def _channels_of_token(header):
+    keyword, _, key = header.partition(' ')
+    if keyword != 'Token' or not key:
+        raise exceptions.NotAuthenticated()
+    user, _ = ExpiringTokenAuthentication().authenticate_credentials(key)
+    return account_channels(user)
+
+
+class AccountEventsApp:
+    """
+        ASGI application serving the account events stream on the event loop
+        and passing every other request to Django. Django 3.2 reads the
+        streaming responses of its views synchronously, which would block
+        the loop for as long as a client listens. The stream is token
+        authenticated like the view and skips the middleware
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.path = None
+
+    async def __call__(self, scope, receive, send):
+        if self.path is None:
+            self.path = reverse('account_events')
+        if scope['type'] == 'http' and scope['path'] == self.path and \
+                scope['method'] == 'GET':
+            return await self.stream(scope, receive, send)
+        return await self.application(scope, receive, send)
+
+    def channels(self, header):
+        """
+            Channels of the token, the stream skips the handler of Django so
+            the connections are closed here like it does around a request
+        """
+        close_old_connections()
+        try:
+            return _channels_of_token(header)
+        finally:
+            close_old_connections()
+
+    async def respond(self, send, status, data, headers=()):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json'),
+                                *headers]})
+        await send({'type': 'http.response.body',
+                    'body': json.dumps(data).encode()})
+
+    async def stream(self, scope, receive, send):
+        header = dict(scope['headers']).get(b'authorization', b'').decode()
+        try:
+            channels = await sync_to_async(self.channels)(header)
+        except exceptions.APIException as error:
+            return await self.respond(send, error.status_code,
+                                      {'detail': str(error.detail)},
+                                      [(b'www-authenticate', b'Token')])
+
+        subscription = events.get_broker().subscribe(
+            channels, events.AsyncSubscription)
+        disconnected = asyncio.ensure_future(self.wait_disconnect(receive))
+        try:
+            await send({'type': 'http.response.start', 'status': 200,
+                        'headers': [(b'content-type', b'text/event-stream'),
+                                    (b'cache-control', b'no-cache'),
+                                    (b'x-accel-buffering', b'no')]})
+            await self.send(send, events.retry_message())
+            while not disconnected.done():
+                getter = asyncio.ensure_future(subscription.get())
+                await asyncio.wait({getter, disconnected},
+                                   timeout=settings.EVENT_KEEPALIVE,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    await self.send(send, events.message(getter.result()))
+                else:
+                    getter.cancel()
+                    if not disconnected.done():
+                        await self.send(send, events.message(None))
+        finally:
+            disconnected.cancel()
+            subscription.close()
+
+    async def send(self, send, text):
+        await send({'type': 'http.response.body', 'body': text.encode(),
+                    'more_body': True})
+
+    async def wait_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
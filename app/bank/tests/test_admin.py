@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+
+from ..models import Account, Transaction, Deposit, Transfer
+from .test_models import sample_user, sample_branch
+
+# session, user, count and the page itself plus the list filter and
+# prefetch queries
+CHANGELIST_QUERIES = {
+    'bank': 4,
+    'branch': 5,
+    'account': 5,
+    'deposit': 4,
+    'transfer': 4,
+    # deposits, transfers, their accounts and users
+    'transaction': 8,
+}
+
+
+class TestAdminChangelist(TestCase):
+    def setUp(self):
+        self.branch = sample_branch()
+        self.accounts = 0
+        admin = get_user_model().objects.create_superuser(
+            email='admin@gmail.com', password='test1234')
+        self.client.force_login(admin)
+
+    def add_rows(self, count):
+        """Create accounts with a deposit and a transfer each"""
+        for _ in range(count):
+            self.accounts += 1
+            user = sample_user(f'user{self.accounts}@gmail.com')
+            account = Account.objects.create(
+                user=user, branch=self.branch,
+                number=1111111111111111 + self.accounts, balance=100)
+            deposit = Deposit.objects.create(account=account, amount=10)
+            transfer = Transfer.objects.create(account=account,
+                                               to_account=account, amount=5)
+            for movement in (deposit, transfer):
+                Transaction.objects.create(branch=self.branch,
+                                           transaction_type=movement)
+
+    def test_changelist_query_count(self):
+        """Test that a changelist page runs a fixed number of queries"""
+        self.add_rows(12)
+        for name, queries in CHANGELIST_QUERIES.items():
+            url = reverse(f'admin:bank_{name}_changelist')
+            with self.subTest(name), self.assertNumQueries(queries):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_query_count_doesnt_grow_with_rows(self):
+        """Test that more rows don't add queries to a changelist page"""
+        url = reverse('admin:bank_transaction_changelist')
+        self.add_rows(2)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        self.add_rows(10)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+
+        self.assertEqual(len(few), len(many))
@@ -138,6 +138,22 @@ class TestModel(APITestCase):
         account.refresh_from_db()
         self.assertEqual(payload['amount'], account.balance)
 
+    def test_deposit_out_of_range(self):
+        """Test that amounts a BIGINT of minor units can't hold are rejected"""
+        account = Account.objects.create(user=self.user5, branch=self.branch,
+                                         number=1111111111111111)
+        url = reverse('deposit', args=[self.branch.id])
+        self.client.force_authenticate(self.branch.teller)
+
+        for amount in (100000000000000000, -100000000000000000):
+            response = self.client.post(url, data={'amount': amount,
+                                                   'account': account.id})
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+            self.assertIn('amount', response.data)
+        account.refresh_from_db()
+        self.assertEqual(account.balance, 0)
+
     def test_only_teller_can_deposit(self):
         """Test that only teller can deposit"""
         number = 1111111111111111
@@ -260,6 +276,48 @@ class TestModel(APITestCase):
         self.assertEqual(from_account.balance, balance)
         self.assertEqual(to_account.balance, balance)
 
+    def test_pay_works_successfully(self):
+        """Test that pay debits the account and waits for settlement"""
+        number, balance = 1111111111111111, 1000.00
+        account = Account.objects.create(user=self.user5, branch=self.branch,
+                                         number=number, balance=balance)
+        merchant = Account.objects.create(user=self.user4, branch=self.branch,
+                                          number=number + 2)
+
+        payload = {'amount': 300, 'account': account.id,
+                   'merchant': merchant.id}
+        url = reverse('pay', args=[self.branch.id])
+        self.client.force_authenticate(self.branch.teller)
+        response = self.client.post(url, data=payload)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        account.refresh_from_db()
+        merchant.refresh_from_db()
+        self.assertEqual(account.balance, balance - payload['amount'])
+        self.assertEqual(merchant.balance, 0)
+        pay = Pay.objects.get(account=account)
+        self.assertIsNone(pay.settled)
+        self.assertTrue(Transaction.objects.filter(
+            transaction_id=pay.id).exists())
+
+    def test_pay_without_merchant_fail(self):
+        """Test that pay needs a merchant other than the account"""
+        account = Account.objects.create(user=self.user5, branch=self.branch,
+                                         number=1111111111111111,
+                                         balance=1000)
+        url = reverse('pay', args=[self.branch.id])
+        self.client.force_authenticate(self.branch.teller)
+
+        for payload in ({'amount': 300, 'account': account.id},
+                        {'amount': 300, 'account': account.id,
+                         'merchant': account.id}):
+            response = self.client.post(url, data=payload)
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+        account.refresh_from_db()
+        self.assertEqual(account.balance, 1000)
+        self.assertFalse(Pay.objects.exists())
+
     def test_banker_can_create_branch(self):
         """Test that banker can create branch"""
         payload = {'name': 'Iran',
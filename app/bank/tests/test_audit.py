@@ -0,0 +1,147 @@
+import io
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.core.management import call_command, CommandError
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from ..audit import link as audit_link
+from ..models import Account, AuditChain, Deposit, Transaction
+from ..utils import bulk_create_movements, bulk_create_transactions
+from .test_models import sample_user, sample_branch
+
+
+def post(account, amount, branch=None):
+    """Create a deposit with its ledger entry like the endpoints do"""
+    deposit = Deposit.objects.create(account=account, amount=amount)
+    return Transaction.objects.create(branch=branch or account.branch,
+                                      transaction_type=deposit)
+
+
+def verify_chains(workers=1, **options):
+    out, err = io.StringIO(), io.StringIO()
+    options['workers'] = workers
+    call_command('verify_audit_chain', stdout=out, stderr=err, **options)
+    return out.getvalue()
+
+
+class TestAuditChain(TestCase):
+    def setUp(self):
+        self.branch = sample_branch()
+        self.account = Account.objects.create(
+            user=sample_user('customer@gmail.com'), branch=self.branch,
+            number=1111111111111111, balance=1000)
+
+    def test_entries_are_chained(self):
+        """Test that each entry is chained to the previous one of its branch"""
+        other = sample_branch(bank=self.branch.bank, name='other',
+                              teller=sample_user('t2@gmail.com'))
+        first, second = post(self.account, 10), post(self.account, 20)
+        elsewhere = post(self.account, 30, branch=other)
+        deposits = bulk_create_movements(
+            [Deposit(account=self.account, amount=40)], 'default')
+        bulk, = bulk_create_transactions(
+            [Transaction(branch=self.branch, transaction_type=deposits[0])],
+            'default')
+
+        self.assertEqual([first.chain_index, second.chain_index,
+                          bulk.chain_index], [1, 2, 3])
+        self.assertEqual(elsewhere.chain_index, 1)
+        self.assertNotEqual(first.hash, elsewhere.hash)
+        head = AuditChain.objects.get(branch=self.branch)
+        self.assertEqual((head.length, head.last_hash), (3, bulk.hash))
+
+    def test_verification_is_incremental(self):
+        """Test that the checkpoint moves to the last verified entry"""
+        post(self.account, 10)
+        self.assertIn('1 audit chains verified', verify_chains())
+        last = post(self.account, 20)
+        verify_chains()
+
+        head = AuditChain.objects.get(branch=self.branch)
+        self.assertEqual((head.verified_length, head.verified_hash),
+                         (2, last.hash))
+        self.assertIsNotNone(head.verified)
+
+    def test_altered_movement_is_found(self):
+        """Test that changing an amount breaks the chain"""
+        entry = post(self.account, 10)
+        post(self.account, 20)
+        Deposit.objects.filter(pk=entry.transaction_id).update(amount=1000)
+
+        with self.assertRaisesMessage(CommandError, '1 audit chains'):
+            verify_chains()
+        head = AuditChain.objects.get(branch=self.branch)
+        self.assertEqual(head.verified_length, 0)
+
+    def test_deleted_entry_is_found(self):
+        """Test that removing an entry breaks the chain"""
+        post(self.account, 10)
+        entry = post(self.account, 20)
+        post(self.account, 30)
+        verify_chains()
+        entry.delete()
+
+        # the entry was verified already, only a full check sees it
+        verify_chains()
+        with self.assertRaisesMessage(CommandError, '1 audit chains'):
+            verify_chains(full=True)
+
+    def test_migration_chains_existing_entries(self):
+        """Test that the entries are chained in chunks by creation order"""
+        entries = [post(self.account, amount) for amount in range(1, 6)]
+        tied = [entry.pk for entry in entries[1:4]]
+        Transaction.objects.filter(pk__in=tied).update(created=timezone.now())
+        Transaction.objects.update(chain_index=None, hash='')
+        AuditChain.objects.all().delete()
+
+        migration = import_module('bank.migrations.0015_audit_chain')
+        with mock.patch.object(migration, 'BATCH_SIZE', 2):
+            migration.chain_existing_entries(apps, connection.schema_editor())
+
+        chained = Transaction.objects.order_by('created', 'id')
+        self.assertEqual(list(chained.values_list('chain_index', flat=True)),
+                         [1, 2, 3, 4, 5])
+        self.assertEqual(AuditChain.objects.get().length, 5)
+        self.assertIn('1 audit chains verified', verify_chains(full=True))
+
+
+class TestAutocommit(TransactionTestCase):
+    def test_entry_is_saved_in_a_transaction(self):
+        """Test that an entry saved in autocommit mode locks its chain"""
+        account = Account.objects.create(
+            user=sample_user('customer@gmail.com'), branch=sample_branch(),
+            number=1111111111111111)
+        atomic = []
+
+        def link(transactions, using):
+            atomic.append(connections[using].in_atomic_block)
+            return audit_link(transactions, using)
+
+        with mock.patch('bank.audit.link', side_effect=link):
+            entry = post(account, 10)
+        self.assertEqual(atomic, [True])
+        self.assertEqual(entry.chain_index, 1)
+
+
+class TestParallelVerification(TransactionTestCase):
+    databases = '__all__'
+
+    def test_branches_are_verified_in_parallel(self):
+        """Test that the workers verify the chains of all branches"""
+        bank = None
+        for number in range(3):
+            branch = sample_branch(bank=bank, name=f'branch{number}',
+                                   teller=sample_user(f't{number}@gmail.com'))
+            bank = branch.bank
+            account = Account.objects.create(
+                user=sample_user(f'c{number}@gmail.com'), branch=branch,
+                number=1111111111111111 + number, balance=1000)
+            post(account, 10)
+
+        self.assertIn('3 audit chains verified', verify_chains(workers=3))
+        self.assertEqual(AuditChain.objects.filter(verified_length=1)
+                         .count(), 3)
@@ -0,0 +1,163 @@
+import json
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.test import SimpleTestCase, TransactionTestCase, \
+    override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+
+from accounts.models import AuthToken
+from .. import events
+from ..streams import AccountEventsApp
+from ..models import Account
+from .test_models import sample_user, sample_branch
+
+
+class TestBroker(SimpleTestCase):
+    def test_events_fan_out_to_channel_subscribers(self):
+        """Test that an event reaches only the subscribers of its channel"""
+        broker = events.Broker(events.LocalBackend)
+        first = broker.subscribe(['a', 'b'])
+        second = broker.subscribe(['a'])
+        other = broker.subscribe(['c'])
+
+        broker.backend.publish('a', {'n': 1}, 'default')
+
+        self.assertEqual(first.get(0), {'n': 1})
+        self.assertEqual(second.get(0), {'n': 1})
+        self.assertIsNone(other.get(0))
+
+        second.close()
+        broker.deliver('a', {'n': 2})
+        self.assertIsNone(second.get(0))
+        self.assertEqual(broker.subscriptions.keys(), {'a', 'b', 'c'})
+
+    @override_settings(EVENT_QUEUE_SIZE=2)
+    def test_slow_subscriber_loses_oldest_events(self):
+        """Test that a full queue drops its oldest event"""
+        broker = events.Broker(events.LocalBackend)
+        subscription = broker.subscribe(['a'])
+        for number in range(3):
+            broker.deliver('a', number)
+        self.assertEqual([subscription.get(0), subscription.get(0)], [1, 2])
+
+
+# closing a stream sends request_finished, which closes the connections like
+# at the end of a request and would close the one of a TestCase
+@override_settings(EVENT_KEEPALIVE=0.01)
+class TestAccountEvents(APITransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.branch = sample_branch()
+        self.customer = sample_user('c@gmail.com')
+        self.account = Account.objects.create(user=self.customer,
+                                              branch=self.branch,
+                                              number=1111111111111111,
+                                              balance=100)
+
+    def test_deposit_is_pushed_to_account_holder(self):
+        """Test that the holder gets the deposit and the new balance"""
+        self.client.force_authenticate(self.customer)
+        response = self.client.get(reverse('account_events'),
+                                   HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = iter(response.streaming_content)
+        self.assertTrue(next(stream).startswith(b'retry:'))
+
+        self.client.force_authenticate(self.branch.teller)
+        self.client.post(reverse('deposit', args=[self.branch.id]),
+                         {'amount': 50, 'account': self.account.id})
+
+        chunk = next(stream).decode()
+        while chunk.startswith(':'):  # keepalive
+            chunk = next(stream).decode()
+        name, data = chunk.strip().split('\n')
+        self.assertEqual(name, 'event: transaction')
+        event = json.loads(data[len('data: '):])
+        self.assertEqual(event['kind'], 'deposit')
+        self.assertEqual(event['balance'], '150.00')
+        self.assertEqual(event['account'], str(self.account.pk))
+        response.close()
+
+    def test_events_need_authentication(self):
+        """Test that anonymous users can't subscribe"""
+        response = self.client.get(reverse('account_events'),
+                                   HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_streams_are_limited(self):
+        """Test that a process refuses streams over EVENT_MAX_STREAMS"""
+        self.client.force_authenticate(self.customer)
+        url = reverse('account_events')
+        with override_settings(EVENT_MAX_STREAMS=1):
+            first = self.client.get(url, HTTP_ACCEPT='text/event-stream')
+            refused = self.client.get(url, HTTP_ACCEPT='text/event-stream')
+            first.close()
+            second = self.client.get(url, HTTP_ACCEPT='text/event-stream')
+            second.close()
+
+        self.assertEqual(refused.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(events.stream_slots.used, 0)
+
+
+# the stream closes the old connections like a request handler
+@override_settings(EVENT_KEEPALIVE=5)
+class TestAsgiAccountEvents(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        branch = sample_branch()
+        self.customer = sample_user('c@gmail.com')
+        self.account = Account.objects.create(user=self.customer,
+                                              branch=branch,
+                                              number=1111111111111111)
+
+    def scope(self, key):
+        return {'type': 'http', 'method': 'GET',
+                'path': reverse('account_events'),
+                'headers': [(b'authorization', f'Token {key}'.encode())]}
+
+    @async_to_sync
+    async def listen(self, key, event=None):
+        """Messages sent for the stream until the client goes away"""
+        async def django(scope, receive, send):
+            raise AssertionError('the stream must not reach Django')
+
+        app = ApplicationCommunicator(AccountEventsApp(django),
+                                      self.scope(key))
+        await app.send_input({'type': 'http.request'})
+        messages = [await app.receive_output(1)]
+        if messages[0]['status'] == 200:
+            messages.append(await app.receive_output(1))  # retry
+            channel = events.account_channel(self.account.pk)
+            events.get_broker().deliver(channel, event)
+            messages.append(await app.receive_output(1))
+            await app.send_input({'type': 'http.disconnect'})
+        else:
+            messages.append(await app.receive_output(1))
+        await app.wait(1)
+        return messages
+
+    def test_events_are_streamed(self):
+        """Test that events reach the holder through the ASGI stream"""
+        token = AuthToken.objects.issue(self.customer)
+        start, retry, message = self.listen(
+            token.key, {'type': 'transaction', 'kind': 'deposit'})
+
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'),
+                      start['headers'])
+        self.assertTrue(retry['body'].startswith(b'retry:'))
+        self.assertTrue(message['body'].startswith(b'event: transaction\n'))
+
+    def test_stream_needs_a_token(self):
+        """Test that an invalid token is answered with 401"""
+        start, body = self.listen('wrong')
+        self.assertEqual(start['status'], 401)
+        self.assertIn(b'Invalid token', body['body'])
@@ -0,0 +1,120 @@
+import random
+import threading
+
+from django.db import connections, transaction, OperationalError
+from django.db.models import Sum
+from django.test import TransactionTestCase, override_settings
+
+from .. import utils
+from ..execution import execute, backoff
+from ..models import Account, Transfer
+from .test_models import sample_user, sample_branch
+
+
+class DatabaseError(Exception):
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+def failing(pgcode, times):
+    """Function which fails like the database times times then returns"""
+    calls = []
+
+    def func():
+        calls.append(None)
+        if len(calls) <= times:
+            error = OperationalError(f'SQLSTATE {pgcode}')
+            error.__cause__ = DatabaseError(pgcode)
+            raise error
+        return len(calls)
+    return func
+
+
+@override_settings(MONEY_RETRY_ATTEMPTS=3, MONEY_RETRY_BACKOFF=0)
+class TestExecute(TransactionTestCase):
+    def test_deadlocks_are_retried(self):
+        """Test that deadlocks and serialization failures are run again"""
+        self.assertEqual(execute('default', failing('40P01', 2)), 3)
+        self.assertEqual(execute('default', failing('40001', 1)), 2)
+
+    def test_attempts_are_bounded(self):
+        """Test that the error is raised after the last attempt"""
+        with self.assertRaises(OperationalError):
+            execute('default', failing('40P01', 3))
+
+    def test_other_errors_are_raised(self):
+        """Test that errors which are not transient are not retried"""
+        with self.assertRaises(OperationalError):
+            execute('default', failing('42P01', 1))
+
+    def test_no_retry_inside_transaction(self):
+        """Test that the outermost transaction owns the retries"""
+        with self.assertRaises(OperationalError):
+            with transaction.atomic():
+                execute('default', failing('40P01', 1))
+
+    @override_settings(MONEY_RETRY_BACKOFF=0.01, MONEY_RETRY_MAX_BACKOFF=0.05)
+    def test_backoff(self):
+        """Test that the wait grows exponentially up to the cap"""
+        self.assertLessEqual(backoff(0), 0.01)
+        self.assertLessEqual(max(backoff(10) for _ in range(100)), 0.05)
+
+
+@override_settings(MONEY_RETRY_ATTEMPTS=50, MONEY_RETRY_BACKOFF=0.001)
+class TestCrossingTransfers(TransactionTestCase):
+    databases = '__all__'
+    THREADS = 4
+    TRANSFERS = 25
+
+    def setUp(self):
+        connection = connections['default']
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('threads share the in-memory database')
+        branch = sample_branch()
+        self.accounts = [Account.objects.create(
+            user=sample_user(f'user{number}@gmail.com'), branch=branch,
+            number=1111111111111111 + number, balance=1000)
+            for number in range(4)]
+
+    def transfer(self, source, target, amount):
+        if utils.apply_transfer(source, target, amount):
+            Transfer.objects.create(account=source, to_account=target,
+                                    amount=amount)
+
+    def worker(self, seed, errors):
+        rng = random.Random(seed)
+        try:
+            for _ in range(self.TRANSFERS):
+                source, target = rng.sample(self.accounts, 2)
+                # fresh instances like a request would load them
+                source = Account.objects.get(pk=source.pk)
+                target = Account.objects.get(pk=target.pk)
+                execute('default', self.transfer, source, target,
+                        rng.randint(1, 300))
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connections.close_all()
+
+    def test_no_lost_updates(self):
+        """Test that concurrent transfers in both directions add up"""
+        errors = []
+        threads = [threading.Thread(target=self.worker, args=(seed, errors))
+                   for seed in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        for account in self.accounts:
+            account.refresh_from_db()
+            sent = Transfer.objects.filter(account=account) \
+                .aggregate(total=Sum('amount'))
+            received = Transfer.objects.filter(to_account=account) \
+                .aggregate(total=Sum('amount'))
+            self.assertGreaterEqual(account.balance, 0)
+            self.assertEqual(account.balance, 1000 - (sent['total'] or 0) +
+                             (received['total'] or 0))
+        self.assertTrue(Transfer.objects.exists())
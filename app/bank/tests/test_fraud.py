@@ -0,0 +1,140 @@
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .. import fraud
+from ..exceptions import SuspectedFraudError
+from ..models import Account, Withdraw
+from .test_models import sample_user, sample_branch
+
+RULES = [
+    {'NAME': 'bank.fraud.VelocityRule',
+     'OPTIONS': {'window': 60, 'max_amount': 1000, 'max_count': 3}},
+    {'NAME': 'bank.fraud.NewCounterpartyRule', 'OPTIONS': {'max_amount': 500}},
+    {'NAME': 'bank.fraud.RoundTripRule', 'OPTIONS': {'window': 600}},
+]
+
+
+def movement(kind, amount, now, account='a', counterparty=None):
+    return fraud.Movement(kind, account, counterparty, amount, now)
+
+
+class TestRules(SimpleTestCase):
+    def test_sliding_window(self):
+        """Test that values leave the window once it passes them"""
+        window = fraud.SlidingWindow(60, slices=6)
+        window.add(5, now=1000)
+        window.add(7, now=1030)
+        self.assertEqual(window.totals(1059), (2, 12))
+        self.assertEqual(window.totals(1075), (1, 7))
+        self.assertEqual(window.totals(1200), (0, 0))
+
+    def test_velocity_rule(self):
+        """Test that the count and the amount per window are limited"""
+        rule = fraud.VelocityRule(window=60, max_amount=100, max_count=2)
+        rule.record(movement('withdraw', 60, 1000))
+        self.assertIsNone(rule.check(movement('withdraw', 40, 1010)))
+        self.assertIsNotNone(rule.check(movement('withdraw', 41, 1010)))
+
+        rule.record(movement('withdraw', 10, 1010))
+        self.assertIsNotNone(rule.check(movement('withdraw', 1, 1020)))
+        self.assertIsNone(rule.check(movement('withdraw', 1, 1200)))
+        self.assertIsNone(rule.check(movement('withdraw', 1, 1020,
+                                              account='b')))
+
+    def test_new_counterparty_rule(self):
+        """Test that big amounts to new counterparties are rejected"""
+        rule = fraud.NewCounterpartyRule(max_amount=100)
+        self.assertIsNone(rule.check(movement('transfer', 100, 0, 'a', 'b')))
+        self.assertIsNotNone(rule.check(movement('transfer', 101, 0,
+                                                 'a', 'b')))
+
+        rule.record(movement('transfer', 50, 0, 'a', 'b'))
+        self.assertIsNone(rule.check(movement('transfer', 101, 10, 'a', 'b')))
+
+    def test_round_trip_rule(self):
+        """Test that money can't be sent back where it came from"""
+        rule = fraud.RoundTripRule(window=60)
+        rule.record(movement('transfer', 50, 0, 'a', 'b'))
+        self.assertIsNone(rule.check(movement('transfer', 50, 10, 'a', 'b')))
+        self.assertIsNotNone(rule.check(movement('transfer', 50, 10,
+                                                 'b', 'a')))
+        self.assertIsNone(rule.check(movement('transfer', 50, 100, 'b', 'a')))
+
+    def test_engine_raises(self):
+        """Test that the engine raises the reason of the rejecting rule"""
+        engine = fraud.FraudEngine([fraud.VelocityRule(max_count=1)])
+        engine.record(movement('withdraw', 1, 0))
+        self.assertRaises(SuspectedFraudError, engine.check,
+                          movement('withdraw', 1, 1))
+        engine.check(movement('deposit', 1, 1))
+
+    def test_idle_state_is_dropped(self):
+        """Test that the state of the accounts gone idle is forgotten"""
+        velocity = fraud.VelocityRule(window=60, max_count=5)
+        counterparty = fraud.NewCounterpartyRule(max_amount=100)
+        engine = fraud.FraudEngine([velocity, counterparty])
+        engine.record(movement('transfer', 1, 0, 'a', 'b'))
+        engine.record(movement('transfer', 1, 1000, 'c', 'd'))
+        self.assertEqual(list(velocity.windows), ['a', 'c'])
+        self.assertEqual(list(counterparty.last_sent),
+                         [('a', 'b'), ('c', 'd')])
+
+        engine.prune(counterparty.lookback + 500)
+        self.assertEqual(list(velocity.windows), [])
+        self.assertEqual(list(counterparty.last_sent), [('c', 'd')])
+
+        engine.record(movement('transfer', 1, 2000, 'e', 'f'))
+        engine.check(movement('transfer', 1, 2000, 'e', 'f'))
+        engine.check(movement('transfer', 1, 3000, 'e', 'f'))
+        self.assertEqual(list(velocity.windows), [])
+
+
+@override_settings(FRAUD_RULES=RULES)
+class TestFraudChecks(APITestCase):
+    def setUp(self):
+        self.branch = sample_branch()
+        self.first, self.second = [Account.objects.create(
+            user=sample_user(f'user{number}@gmail.com'), branch=self.branch,
+            number=1111111111111111 + number, balance=2000)
+            for number in range(2)]
+        self.client.force_authenticate(self.branch.teller)
+
+    def tearDown(self):
+        fraud.reset_engine()
+
+    def post(self, name, **payload):
+        url = reverse(name, args=[self.branch.id])
+        return self.client.post(url, data=payload)
+
+    def test_engine_is_warmed_from_ledger(self):
+        """Test that movements made before startup count in the windows"""
+        for _ in range(3):
+            Withdraw.objects.create(account=self.first, amount=10)
+        fraud.reset_engine()
+
+        response = self.post('withdraw', account=self.first.id, amount=10)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.balance, 2000)
+
+    def test_round_trip_transfer_is_rejected(self):
+        """Test that a transfer back to the sender is rejected"""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post('transfer', account=self.first.id,
+                                 to_account=self.second.id, amount=100)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.post('transfer', account=self.second.id,
+                             to_account=self.first.id, amount=100)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.balance, 2100)
+
+    def test_big_transfer_to_new_counterparty(self):
+        """Test that a big transfer needs a known counterparty"""
+        response = self.post('transfer', account=self.first.id,
+                             to_account=self.second.id, amount=600)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,65 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import utils
+from ..models import Account, AccountCreditSlot
+from .test_models import sample_user, sample_branch
+
+
+@override_settings(HOT_ACCOUNT_SLOTS=4)
+class TestHotAccount(TestCase):
+    def setUp(self):
+        branch = sample_branch()
+        self.merchant = Account.objects.create(user=sample_user('m@gmail.com'),
+                                               branch=branch,
+                                               number=1111111111111111,
+                                               balance=100,
+                                               is_hot=True)
+        self.customer = Account.objects.create(user=sample_user('c@gmail.com'),
+                                               branch=branch,
+                                               number=1111111111111112,
+                                               balance=1000)
+
+    def test_credits_go_to_slots(self):
+        """Test that deposits to a hot account don't touch its balance"""
+        for _ in range(20):
+            utils.apply_deposit(self.merchant, 10)
+
+        self.merchant.refresh_from_db()
+        self.assertEqual(self.merchant.balance, 100)
+        self.assertLessEqual(self.merchant.credit_slots.count(), 4)
+        self.assertEqual(self.merchant.total_balance(), 300)
+
+    def test_transfer_to_hot_account(self):
+        """Test that a transfer credits the slots of a hot account"""
+        self.assertTrue(utils.apply_transfer(self.customer, self.merchant, 50))
+
+        self.customer.refresh_from_db()
+        self.merchant.refresh_from_db()
+        self.assertEqual(self.customer.balance, 950)
+        self.assertEqual(self.merchant.balance, 100)
+        self.assertEqual(self.merchant.total_balance(), 150)
+
+    def test_withdraw_sees_pending_credits(self):
+        """Test that a debit folds the pending credits before checking"""
+        utils.apply_deposit(self.merchant, 200)
+
+        self.assertTrue(utils.apply_withdraw(self.merchant, 250))
+        self.merchant.refresh_from_db()
+        self.assertEqual(self.merchant.balance, 50)
+        self.assertEqual(self.merchant.total_balance(), 50)
+        self.assertFalse(utils.apply_withdraw(self.merchant, 60))
+
+    def test_fold_command(self):
+        """Test that the fold command moves the credits into the balance"""
+        for _ in range(8):
+            utils.apply_deposit(self.merchant, 5)
+
+        call_command('fold_hot_accounts', stdout=io.StringIO())
+
+        self.merchant.refresh_from_db()
+        self.assertEqual(self.merchant.balance, 140)
+        self.assertFalse(AccountCreditSlot.objects.filter(
+            amount__gt=0).exists())
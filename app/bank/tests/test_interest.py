@@ -0,0 +1,94 @@
+import datetime
+import io
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Account, AccountCreditSlot, InterestProduct, \
+    Interest, Transaction
+from .test_models import sample_user, sample_branch
+
+DAY = datetime.date(2021, 10, 1)
+
+
+class TestInterestAccrual(TestCase):
+    def setUp(self):
+        self.branch = sample_branch()
+        self.other_branch = sample_branch(bank=self.branch.bank,
+                                          name='other',
+                                          teller=sample_user('t2@gmail.com'))
+        self.saving, self.checking, self.empty = [Account.objects.create(
+            user=sample_user(f'user{number}@gmail.com'), branch=branch,
+            number=1111111111111111 + number, balance=balance)
+            for number, (branch, balance) in enumerate((
+                (self.branch, 36500), (self.other_branch, 3650),
+                (self.branch, 0)))]
+        self.bank_product = InterestProduct.objects.create(
+            bank=self.branch.bank, name='saving', annual_rate='0.0365')
+        self.branch_product = InterestProduct.objects.create(
+            bank=self.branch.bank, branch=self.other_branch,
+            name='checking', annual_rate='0.0100')
+
+    def accrue(self, day=DAY, **options):
+        call_command('accrue_interest', date=day, stdout=io.StringIO(),
+                     **options)
+
+    def test_interest_is_credited_and_posted(self):
+        """Test that each account gets the interest of its product"""
+        self.accrue(chunk_size=1)
+
+        self.saving.refresh_from_db()
+        self.checking.refresh_from_db()
+        self.assertEqual(self.saving.balance, Decimal('36503.65'))
+        self.assertEqual(self.checking.balance, Decimal('3650.10'))
+
+        credits = {credit.account_id: credit
+                   for credit in Interest.objects.all()}
+        self.assertEqual(set(credits), {self.saving.pk, self.checking.pk})
+        self.assertEqual(credits[self.saving.pk].product, self.bank_product)
+        self.assertEqual(credits[self.checking.pk].amount, Decimal('0.10'))
+        ids = [credit.pk for credit in credits.values()]
+        self.assertEqual(Transaction.objects.filter(
+            transaction_id__in=ids).count(), 2)
+
+    def test_accrual_is_restartable(self):
+        """Test that running the same day again credits nothing"""
+        Account.objects.filter(pk=self.saving.pk).update(
+            interest_accrued_until=DAY)
+
+        self.accrue()
+        self.accrue()
+
+        self.saving.refresh_from_db()
+        self.assertEqual(self.saving.balance, 36500)
+        self.assertEqual(Interest.objects.count(), 1)
+
+        self.accrue(DAY + datetime.timedelta(days=1))
+        self.assertEqual(Interest.objects.count(), 3)
+
+    def test_min_balance(self):
+        """Test that accounts below the minimum balance earn nothing"""
+        InterestProduct.objects.filter(pk=self.bank_product.pk).update(
+            min_balance=50000)
+
+        self.accrue()
+
+        self.assertFalse(Interest.objects.filter(
+            account=self.saving).exists())
+
+    def test_credit_slots_earn_interest(self):
+        """Test that the pending credits of a hot account are in the base"""
+        Account.objects.filter(pk=self.empty.pk).update(is_hot=True)
+        AccountCreditSlot.objects.create(account=self.empty, slot=0,
+                                         amount=20000)
+        AccountCreditSlot.objects.create(account=self.empty, slot=1,
+                                         amount=16500)
+
+        self.accrue()
+
+        self.empty.refresh_from_db()
+        self.assertEqual(self.empty.balance, Decimal('36503.65'))
+        self.assertEqual(self.empty.total_balance(), Decimal('36503.65'))
+        self.assertEqual(Interest.objects.get(account=self.empty).amount,
+                         Decimal('3.65'))
@@ -0,0 +1,112 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .. import fraud, lanes
+from ..models import Account, Transaction
+from .test_models import sample_user, sample_branch
+
+
+def create_user(email):
+    return get_user_model().objects.create_user(email=email,
+                                                password='test1234')
+
+
+@override_settings(MOVEMENT_LANE_WAIT=0.05)
+class TestLane(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.lane = lanes.Lane('test-lane')
+
+    def tearDown(self):
+        self.lane.stop()
+        self.lane.thread.join()
+
+    def test_queued_movements_are_committed_together(self):
+        """Test that the movements waiting in the lane share a commit"""
+        started, release = threading.Event(), threading.Event()
+
+        def blocker():
+            started.set()
+            release.wait()
+            return 'first'
+
+        futures = [self.lane.submit('default', blocker)]
+        started.wait()
+        futures += [self.lane.submit('default',
+                                     lambda number=number: number)
+                    for number in range(5)]
+        release.set()
+
+        results = [future.result(timeout=5) for future in futures]
+        self.assertEqual(results, ['first', 0, 1, 2, 3, 4])
+        self.assertEqual(self.lane.batches, 2)
+
+    def test_keys_are_committed_apart(self):
+        """Test that the movements of two branches don't share a commit"""
+        started, release = threading.Event(), threading.Event()
+
+        def blocker():
+            started.set()
+            release.wait()
+
+        futures = [self.lane.submit('default', blocker)]
+        started.wait()
+        futures += [self.lane.submit('default', lambda: None, key)
+                    for key in ('a', 'b', 'a')]
+        release.set()
+
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(self.lane.batches, 3)
+
+    def test_failing_movement_is_rolled_back_alone(self):
+        """Test that a movement raising doesn't undo the others"""
+        def failing():
+            create_user('failed@gmail.com')
+            raise ValueError('insufficient balance')
+
+        failed = self.lane.submit('default', failing)
+        applied = self.lane.submit(
+            'default', lambda: create_user('applied@gmail.com').email)
+
+        self.assertEqual(applied.result(timeout=5), 'applied@gmail.com')
+        with self.assertRaises(ValueError):
+            failed.result(timeout=5)
+        self.assertEqual(
+            list(get_user_model().objects.values_list('email', flat=True)),
+            ['applied@gmail.com'])
+
+
+@override_settings(MOVEMENT_LANES=2)
+class TestLaneEndpoints(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.branch = sample_branch()
+        self.account = Account.objects.create(
+            user=sample_user('customer@gmail.com'), branch=self.branch,
+            number=1111111111111111, balance=1000)
+        self.client = APIClient()
+        self.client.force_authenticate(self.branch.teller)
+
+    def tearDown(self):
+        lanes.reset_lanes()
+        fraud.reset_engine()
+
+    def test_movements_are_applied_by_lanes(self):
+        """Test that the response is sent once the lane committed"""
+        for name in ('deposit', 'withdraw', 'withdraw'):
+            response = self.client.post(reverse(name, args=[self.branch.id]),
+                                        {'account': self.account.id,
+                                         'amount': 300})
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, 700)
+        self.assertEqual(Transaction.objects.count(), 3)
@@ -0,0 +1,95 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+
+from .. import ledger
+from ..models import Account, Deposit, Transfer, LedgerEvent
+from ..utils import bulk_create_movements
+from .test_models import sample_user, sample_branch
+
+
+class TestLedger(TestCase):
+    def setUp(self):
+        branch = sample_branch()
+        self.first, self.second = [Account.objects.create(
+            user=sample_user(f'user{number}@gmail.com'), branch=branch,
+            number=1111111111111111 + number, balance=1000)
+            for number in range(2)]
+
+    def test_movements_are_logged(self):
+        """Test that saved and bulk created movements write an event"""
+        deposit = Deposit.objects.create(account=self.first, amount=10)
+        transfers = bulk_create_movements(
+            [Transfer(account=self.first, to_account=self.second, amount=5)
+             for _ in range(2)], 'default')
+
+        self.assertEqual(ledger.sequence_events('default'), 3)
+        events = ledger.read_events('default')
+        self.assertEqual([event.sequence for event in events], [1, 2, 3])
+        movements = [deposit] + transfers
+        self.assertEqual([event.movement for event in events],
+                         [movement.pk for movement in movements])
+        data = ledger.event_data(events[1])
+        self.assertEqual(data['kind'], 'transfer')
+        self.assertEqual(data['account'], self.first.pk)
+        self.assertEqual(data['counterparty'], self.second.pk)
+        self.assertEqual(data['amount'], '5.00')
+
+    def test_rolled_back_movements_are_not_logged(self):
+        """Test that the event is written in the transaction of its movement"""
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                Deposit.objects.create(account=self.first, amount=10)
+                raise ValueError
+        self.assertFalse(LedgerEvent.objects.exists())
+
+    def test_sequence_goes_on(self):
+        """Test that events are numbered after the ones already numbered"""
+        Deposit.objects.create(account=self.first, amount=10)
+        ledger.sequence_events('default')
+        Deposit.objects.create(account=self.first, amount=20)
+        Deposit.objects.create(account=self.first, amount=30)
+        ledger.sequence_events('default', batch_size=1)
+
+        events = ledger.read_events('default', after=1)
+        self.assertEqual([(event.sequence, str(event.amount))
+                          for event in events], [(2, '20.00')])
+        self.assertEqual(ledger.sequence_events('default'), 1)
+
+    def test_sequence_command(self):
+        """Test that the job numbers the events without a tailer"""
+        for amount in (10, 20):
+            Deposit.objects.create(account=self.first, amount=amount)
+
+        out = io.StringIO()
+        call_command('sequence_ledger', stdout=out)
+
+        self.assertIn('2 ledger events numbered', out.getvalue())
+        self.assertEqual([event.sequence for event
+                          in ledger.read_events('default')], [1, 2])
+
+    def test_tail_command_checkpoint(self):
+        """Test that the command goes on after the checkpointed event"""
+        def tail():
+            out = io.StringIO()
+            call_command('tail_ledger', checkpoint=checkpoint, batch_size=2,
+                         stdout=out)
+            return [json.loads(line) for line in out.getvalue().splitlines()]
+
+        checkpoint = os.path.join(tempfile.mkdtemp(), 'ledger')
+        for amount in (10, 20, 30):
+            Deposit.objects.create(account=self.first, amount=amount)
+
+        self.assertEqual([event['amount'] for event in tail()],
+                         ['10.00', '20.00', '30.00'])
+        self.assertEqual(tail(), [])
+
+        Deposit.objects.create(account=self.second, amount=40)
+        self.assertEqual([event['sequence'] for event in tail()], [4])
+        with open(checkpoint) as file:
+            self.assertEqual(file.read(), '4')
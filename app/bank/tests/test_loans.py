@@ -0,0 +1,137 @@
+import datetime
+import io
+import uuid
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .. import amortization
+from ..models import Account, Loan, Repayment
+from .test_models import sample_user, sample_branch
+
+
+class TestAmortization(TestCase):
+    def loan(self, amount, annual_rate, term_months):
+        return Loan(pk=uuid.uuid4(), amount=Decimal(amount),
+                    annual_rate=Decimal(annual_rate), term_months=term_months)
+
+    def test_schedule_pays_the_principal_back(self):
+        """Test that the schedule has fixed payments and ends at zero"""
+        loan = self.loan('1000.00', '0.1200', 12)
+        installments = amortization.schedule(loan)
+
+        self.assertEqual(len(installments), 12)
+        self.assertEqual(installments[0].payment, Decimal('88.85'))
+        self.assertEqual(installments[0].interest, Decimal('10.00'))
+        self.assertEqual(installments[-1].balance, 0)
+        self.assertEqual(sum(row.principal for row in installments),
+                         loan.amount)
+
+    def test_zero_rate(self):
+        """Test that a loan without interest is split in equal payments"""
+        installments = amortization.schedule(self.loan('1200', '0', 12))
+        self.assertTrue(all(row.payment == 100 for row in installments))
+        self.assertTrue(all(row.interest == 0 for row in installments))
+
+    def test_portfolio_matches_single_schedules(self):
+        """Test that schedules computed together are the same as alone"""
+        loans = [self.loan('1000', '0.12', 12), self.loan('2500', '0.12', 12),
+                 self.loan('777.77', '0.0575', 36), self.loan('10', '0', 3)]
+
+        schedules = amortization.portfolio_schedules(loans)
+
+        for loan in loans:
+            self.assertEqual(schedules[loan.pk], amortization.schedule(loan))
+
+
+class TestLoan(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.branch = sample_branch()
+        self.account = Account.objects.create(user=sample_user('c@gmail.com'),
+                                              branch=self.branch,
+                                              number=1111111111111111)
+
+    def test_loan_credits_the_account(self):
+        """Test that originating a loan credits the principal"""
+        payload = {'amount': 1000, 'account': self.account.id,
+                   'annual_rate': '0.1825', 'term_months': 12}
+        url = reverse('loan', args=[self.branch.id])
+        self.client.force_authenticate(self.branch.teller)
+        response = self.client.post(url, data=payload)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, 1000)
+        self.assertEqual(Loan.objects.get().outstanding, 1000)
+
+    def test_accrual_and_repayment(self):
+        """Test that interest accrues once a day and is repaid first"""
+        self.account.balance = 1000
+        self.account.save()
+        loan = Loan.objects.create(account=self.account, amount=1000,
+                                   outstanding=1000, annual_rate='0.1825',
+                                   term_months=12)
+        day = timezone.localdate(loan.created)
+        for _ in range(2):  # running it again on the same day does nothing
+            call_command('accrue_loan_interest', date=day,
+                         stdout=io.StringIO())
+        loan.refresh_from_db()
+        self.assertEqual(loan.accrued_interest, Decimal('0.5'))
+        self.assertEqual(loan.accrued_until, day)
+
+        url = reverse('repay', args=[self.branch.id])
+        self.client.force_authenticate(self.branch.teller)
+        response = self.client.post(url, data={'amount': 100.5,
+                                               'account': self.account.id,
+                                               'repaid_loan': loan.id})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        loan.refresh_from_db()
+        self.account.refresh_from_db()
+        self.assertEqual(loan.accrued_interest, 0)
+        self.assertEqual(loan.outstanding, 900)
+        self.assertEqual(self.account.balance, Decimal('899.50'))
+        self.assertEqual(Repayment.objects.get().interest_paid,
+                         Decimal('0.50'))
+
+    def test_skipped_days_are_accrued(self):
+        """Test that a run accrues every day since the last accrual"""
+        loan = Loan.objects.create(account=self.account, amount=1000,
+                                   outstanding=1000, annual_rate='0.1825',
+                                   term_months=12)
+        day = timezone.localdate(loan.created)
+        call_command('accrue_loan_interest', date=day - datetime.timedelta(1),
+                     stdout=io.StringIO())
+        loan.refresh_from_db()
+        self.assertIsNone(loan.accrued_until)
+
+        call_command('accrue_loan_interest', date=day, stdout=io.StringIO())
+        # the run of the next day is skipped
+        call_command('accrue_loan_interest', date=day + datetime.timedelta(2),
+                     stdout=io.StringIO())
+        loan.refresh_from_db()
+        self.assertEqual(loan.accrued_interest, Decimal('1.5'))
+        self.assertEqual(loan.accrued_until, day + datetime.timedelta(2))
+
+    def test_repay_more_than_owed_fail(self):
+        """Test that a loan can not be repaid more than it is owed"""
+        self.account.balance = 5000
+        self.account.save()
+        loan = Loan.objects.create(account=self.account, amount=1000,
+                                   outstanding=1000, annual_rate='0.1',
+                                   term_months=12)
+        url = reverse('repay', args=[self.branch.id])
+        self.client.force_authenticate(self.branch.teller)
+        response = self.client.post(url, data={'amount': 1500,
+                                               'account': self.account.id,
+                                               'repaid_loan': loan.id})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, 5000)
@@ -0,0 +1,75 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import utils
+from ..models import Account, Pay, Settlement, Transaction, LedgerEvent
+from .test_models import sample_user, sample_branch
+
+
+class TestSettlement(TestCase):
+    def setUp(self):
+        branch = sample_branch()
+        self.customer = Account.objects.create(user=sample_user('c@gmail.com'),
+                                               branch=branch,
+                                               number=1111111111111111,
+                                               balance=1000)
+        self.merchant = Account.objects.create(user=sample_user('m@gmail.com'),
+                                               branch=branch,
+                                               number=1111111111111112)
+
+    def pay(self, amount, merchant=None):
+        merchant = merchant or self.merchant
+        utils.apply_pay(self.customer, merchant, amount)
+        return Pay.objects.create(account=self.customer, merchant=merchant,
+                                  amount=amount)
+
+    def test_payments_are_settled_at_once(self):
+        """Test that all payments of a merchant are credited together"""
+        for amount in (10, 20, 30):
+            self.pay(amount)
+
+        count, total = utils.settle_payments(self.merchant)
+
+        self.assertEqual((count, total), (3, 60))
+        self.merchant.refresh_from_db()
+        self.assertEqual(self.merchant.balance, 60)
+        self.assertFalse(Pay.objects.filter(settled__isnull=True).exists())
+        self.assertEqual(utils.settle_payments(self.merchant), (0, 0))
+
+    def test_settlement_is_a_movement(self):
+        """Test that the credit is in the ledger, audit chain and log"""
+        self.pay(10)
+        self.pay(20)
+
+        utils.settle_payments(self.merchant)
+
+        settlement = Settlement.objects.get()
+        self.assertEqual((settlement.account, settlement.amount,
+                          settlement.payments), (self.merchant, 30, 2))
+        entry = Transaction.objects.get(transaction_id=settlement.pk)
+        self.assertEqual(entry.branch, self.merchant.branch)
+        self.assertIsNotNone(entry.chain_index)
+        self.assertTrue(LedgerEvent.objects.filter(
+            kind='settlement', movement=settlement.pk,
+            account=self.merchant.pk, amount=30).exists())
+
+    def test_settle_command(self):
+        """Test that the command settles the payments of every merchant"""
+        other = Account.objects.create(user=sample_user('o@gmail.com'),
+                                       branch=self.merchant.branch,
+                                       number=1111111111111113)
+        self.pay(100)
+        self.pay(50, merchant=other)
+
+        out = io.StringIO()
+        call_command('settle_payments', stdout=out)
+
+        self.merchant.refresh_from_db()
+        other.refresh_from_db()
+        self.customer.refresh_from_db()
+        self.assertEqual(self.merchant.balance, 100)
+        self.assertEqual(other.balance, 50)
+        self.assertEqual(self.customer.balance, 850)
+        self.assertIn('2 payments settled for 2 merchants', out.getvalue())
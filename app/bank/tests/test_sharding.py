@@ -0,0 +1,141 @@
+import io
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .. import sharding
+from ..models import Bank, Branch, Account, Deposit, Transaction, \
+    LedgerEvent, ShardDirectory
+from .test_api import sample_user
+
+
+class TestShardSelection(SimpleTestCase):
+    def test_no_shard_keeps_default_routing(self):
+        """Test that the router does nothing while there is no shard"""
+        router = sharding.ShardRouter()
+        with override_settings(DATABASE_SHARDS=[]):
+            self.assertIsNone(router.db_for_read(Account))
+            self.assertIsNone(router.db_for_write(Account))
+            self.assertIsNone(sharding.shard_for_branch(uuid.uuid4()))
+
+    @override_settings(DATABASE_SHARDS=['shard_0', 'shard_1'])
+    def test_hashed_shard_is_stable(self):
+        """Test that a bank id is always hashed to the same shard"""
+        bank_ids = [uuid.uuid4() for _ in range(50)]
+        picked = [sharding.hashed_shard(bank_id) for bank_id in bank_ids]
+        self.assertEqual(picked,
+                         [sharding.hashed_shard(str(bank_id))
+                          for bank_id in bank_ids])
+        self.assertEqual(set(picked), {'shard_0', 'shard_1'})
+
+    @override_settings(DATABASE_SHARDS=['shard_0', 'shard_1'])
+    def test_current_shard_is_used(self):
+        """Test that queries inside using_shard go to that shard"""
+        router = sharding.ShardRouter()
+        with sharding.using_shard('shard_1'):
+            self.assertEqual(router.db_for_read(Account), 'shard_1')
+            self.assertEqual(router.db_for_write(Deposit), 'shard_1')
+            self.assertIsNone(router.db_for_read(get_user_model()))
+            self.assertEqual(router.db_for_read(ContentType), 'default')
+
+    @override_settings(DATABASE_SHARDS=['shard_0', 'shard_1'])
+    def test_read_without_shard_is_refused(self):
+        """Test that bank rows can't be read from the default database"""
+        with self.assertRaises(sharding.ShardNotSelected):
+            sharding.ShardRouter().db_for_read(Account)
+        self.assertIsNone(sharding.current_shard())
+
+
+@override_settings(DATABASE_SHARDS=settings.TEST_DATABASE_SHARDS)
+class TestShardedBank(TestCase):
+    databases = {'default', *settings.TEST_DATABASE_SHARDS}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.banker = sample_user('banker@gmail.com')
+        self.teller = sample_user('teller@gmail.com')
+        self.customer = sample_user('customer@gmail.com')
+        self.bank = Bank.objects.create(name='Meli', address='Tehran',
+                                        banker=self.banker)
+        self.branch = Branch.objects.create(name='USB', address='USB city',
+                                            bank=self.bank,
+                                            teller=self.teller)
+        self.shard = sharding.hashed_shard(self.bank.pk)
+
+    def test_bank_rows_are_stored_on_its_shard(self):
+        """Test that the bank and its branch are saved on the hashed shard"""
+        self.assertEqual(self.bank._state.db, self.shard)
+        self.assertEqual(self.branch._state.db, self.shard)
+        self.assertTrue(Branch.objects.using(self.shard)
+                        .filter(pk=self.branch.pk).exists())
+        self.assertFalse(Branch.objects.using('default')
+                         .filter(pk=self.branch.pk).exists())
+        self.assertEqual(sharding.shard_for_branch(self.branch.pk),
+                         self.shard)
+
+    def test_content_types_match_default(self):
+        """Test that the generic relations resolve the same on every shard"""
+        fields = ('pk', 'app_label', 'model')
+        content_types = set(ContentType.objects.using('default')
+                            .values_list(*fields))
+        for alias in settings.DATABASE_SHARDS:
+            self.assertEqual(set(ContentType.objects.using(alias)
+                                 .values_list(*fields)), content_types)
+
+    def test_admin_panels_are_off(self):
+        """Test that the admin doesn't list the empty default tables"""
+        admin = get_user_model().objects.create_superuser(
+            email='admin@gmail.com', password='test1234')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:bank_account_changelist'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deposit_is_routed_by_branch(self):
+        """Test that the deposit endpoint works on the shard of the branch"""
+        account = Account.objects.create(user=self.customer,
+                                         branch=self.branch,
+                                         number=1111111111111111)
+        url = reverse('deposit', args=[self.branch.id])
+        self.client.force_authenticate(self.teller)
+        response = self.client.post(url, data={'amount': 500,
+                                               'account': account.id})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        account.refresh_from_db()
+        self.assertEqual(account.balance, 500)
+        entry = Transaction.objects.using(self.shard).get()
+        self.assertEqual(entry.transaction_type.account, account)
+
+    def test_move_bank_to_another_shard(self):
+        """Test that move_bank copies every row and updates the directory"""
+        account = Account.objects.create(user=self.customer,
+                                         branch=self.branch,
+                                         number=1111111111111111)
+        deposit = Deposit.objects.create(account=account, amount=10)
+        Transaction.objects.create(branch=self.branch,
+                                   transaction_type=deposit)
+        target = next(alias for alias in settings.DATABASE_SHARDS
+                      if alias != self.shard)
+
+        call_command('move_bank', str(self.bank.pk), target,
+                     stdout=io.StringIO())
+
+        self.assertEqual(sharding.shard_for_bank(self.bank.pk), target)
+        self.assertEqual(sharding.shard_for_branch(self.branch.pk), target)
+        self.assertFalse(ShardDirectory.objects.exclude(shard=target)
+                         .filter(bank_id=self.bank.pk).exists())
+        for model in (Bank, Branch, Account, Deposit, Transaction):
+            self.assertFalse(model.objects.using(self.shard).exists())
+            self.assertEqual(model.objects.using(target).count(), 1)
+        moved = Deposit.objects.using(target).get()
+        self.assertEqual(moved.created, deposit.created)
+        event = LedgerEvent.objects.using(target).get()
+        self.assertEqual((event.movement, event.sequence), (deposit.pk, None))
+        self.assertFalse(LedgerEvent.objects.using(self.shard).exists())
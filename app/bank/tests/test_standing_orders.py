@@ -0,0 +1,191 @@
+import datetime
+import io
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .. import events, utils
+from ..models import Account, StandingOrder, Transfer, Transaction
+from .test_models import sample_user, sample_branch
+
+
+def sample_accounts(branch, *balances):
+    return [Account.objects.create(user=sample_user(f'user{number}@gmail.com'),
+                                   branch=branch,
+                                   number=1111111111111111 + number,
+                                   balance=balance)
+            for number, balance in enumerate(balances)]
+
+
+class TestStandingOrder(TestCase):
+    def setUp(self):
+        self.branch = sample_branch()
+        self.employer, self.first, self.second = sample_accounts(
+            self.branch, 1000, 0, 0)
+        self.past = timezone.now() - datetime.timedelta(hours=1)
+
+    def order(self, to_account, amount, **kwargs):
+        kwargs.setdefault('start', self.past)
+        return StandingOrder.objects.create(account=kwargs.pop(
+            'account', self.employer), to_account=to_account, amount=amount,
+            **kwargs)
+
+    def test_monthly_occurrences_keep_the_day(self):
+        """Test that months without the start day use their last day"""
+        start = datetime.datetime(2021, 1, 31, 9, tzinfo=datetime.timezone.utc)
+        order = StandingOrder(start=start, period=StandingOrder.MONTH)
+        self.assertEqual([order.occurrence(n).date() for n in range(3)],
+                         [datetime.date(2021, 1, 31),
+                          datetime.date(2021, 2, 28),
+                          datetime.date(2021, 3, 31)])
+
+    def test_due_orders_are_run(self):
+        """Test that due orders are transferred and moved to the next run"""
+        first = self.order(self.first, 300)
+        second = self.order(self.second, 200)
+        later = self.order(self.second, 100,
+                           start=timezone.now() + datetime.timedelta(days=1))
+
+        self.assertEqual(utils.run_standing_orders('default'), (2, 0))
+        self.assertEqual(utils.run_standing_orders('default'), (0, 0))
+
+        balances = [account.balance for account in Account.objects.filter(
+            pk__in=[self.employer.pk, self.first.pk, self.second.pk])
+            .order_by('number')]
+        self.assertEqual(balances, [500, 300, 200])
+        self.assertEqual(Transfer.objects.count(), 2)
+        self.assertEqual(Transaction.objects.filter(
+            transaction_id__in=Transfer.objects.values('pk')).count(), 2)
+
+        first.refresh_from_db()
+        self.assertEqual(first.runs, 1)
+        self.assertEqual(first.next_run, first.occurrence(1))
+        later.refresh_from_db()
+        self.assertEqual(later.runs, 0)
+        second.refresh_from_db()
+        self.assertEqual(second.failures, 0)
+
+    def test_transfers_are_published(self):
+        """Test that the transfers inserted in bulk reach the subscribers"""
+        self.order(self.first, 300)
+        subscription = events.get_broker().subscribe(
+            [events.account_channel(self.first.pk)])
+        self.addCleanup(subscription.close)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            utils.run_standing_orders('default')
+
+        event = subscription.get(0)
+        self.assertEqual((event['kind'], event['amount'], event['balance']),
+                         ('transfer', '300.00', '300.00'))
+
+    def test_failed_order_doesnt_stop_others(self):
+        """Test that an order without money fails alone"""
+        failing = self.order(self.first, 5000)
+        paid = self.order(self.second, 200)
+
+        self.assertEqual(utils.run_standing_orders('default'), (1, 1))
+
+        failing.refresh_from_db()
+        paid.refresh_from_db()
+        self.assertEqual((failing.runs, failing.failures), (1, 1))
+        self.assertEqual(failing.last_error, 'Insufficient balance')
+        self.assertEqual((paid.runs, paid.failures), (1, 0))
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.balance, 200)
+
+    def test_currency_mismatch_fails(self):
+        """Test that orders between currencies fail like transfers do"""
+        Account.objects.filter(pk=self.second.pk).update(currency='USD')
+        mismatched = self.order(self.second, 200)
+        paid = self.order(self.first, 300)
+
+        self.assertEqual(utils.run_standing_orders('default'), (1, 1))
+        mismatched.refresh_from_db()
+        self.assertEqual(mismatched.last_error, utils.CURRENCY_MISMATCH)
+        self.employer.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.employer.balance, self.second.balance),
+                         (700, 0))
+
+        with mock.patch.object(utils, '_transfer_in_bulk',
+                               side_effect=ValueError):
+            mismatched.next_run = paid.next_run = self.past
+            StandingOrder.objects.bulk_update([mismatched, paid],
+                                              ['next_run'])
+            self.assertEqual(utils.run_standing_orders('default'), (1, 1))
+        mismatched.refresh_from_db()
+        self.assertEqual(mismatched.last_error, utils.CURRENCY_MISMATCH)
+
+    def test_orders_run_one_by_one_when_batch_breaks(self):
+        """Test that orders are retried one by one if the batch fails"""
+        self.order(self.first, 300)
+        self.order(self.second, 200)
+
+        with mock.patch.object(utils, '_transfer_in_bulk',
+                               side_effect=ValueError):
+            self.assertEqual(utils.run_standing_orders('default'), (2, 0))
+
+        self.employer.refresh_from_db()
+        self.assertEqual(self.employer.balance, 500)
+        self.assertEqual(Transfer.objects.count(), 2)
+
+    def test_order_ends(self):
+        """Test that an order stops after its end"""
+        order = self.order(self.first, 100, period=StandingOrder.DAY,
+                           end=self.past + datetime.timedelta(hours=12))
+
+        call_command('run_standing_orders', stdout=io.StringIO())
+
+        order.refresh_from_db()
+        self.assertFalse(order.active)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.balance, 100)
+
+
+class TestStandingOrderAPI(APITestCase):
+    def setUp(self):
+        self.branch = sample_branch()
+        self.employer, self.first = sample_accounts(self.branch, 1000, 0)
+        self.url = reverse('standing_order', args=[self.branch.id])
+
+    def test_teller_creates_order(self):
+        """Test that a teller can create a standing order"""
+        self.client.force_authenticate(self.branch.teller)
+        payload = {'account': self.employer.id, 'to_account': self.first.id,
+                   'amount': 100, 'start': timezone.now().isoformat(),
+                   'period': 'week'}
+
+        response = self.client.post(self.url, data=payload)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        order = StandingOrder.objects.get()
+        self.assertEqual(order.next_run, order.start)
+
+    def test_currencies_must_match(self):
+        """Test that an order between currencies is refused"""
+        Account.objects.filter(pk=self.first.pk).update(currency='USD')
+        self.client.force_authenticate(self.branch.teller)
+        payload = {'account': self.employer.id, 'to_account': self.first.id,
+                   'amount': 100, 'start': timezone.now().isoformat()}
+
+        response = self.client.post(self.url, data=payload)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(StandingOrder.objects.exists())
+
+    def test_only_teller_creates_order(self):
+        """Test that other users can't create standing orders"""
+        self.client.force_authenticate(self.employer.user)
+        payload = {'account': self.employer.id, 'to_account': self.first.id,
+                   'amount': 100, 'start': timezone.now().isoformat()}
+
+        response = self.client.post(self.url, data=payload)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(StandingOrder.objects.exists())
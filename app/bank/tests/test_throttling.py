@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import AuthToken
+from .. import throttling
+from ..models import Account
+from .test_models import sample_user, sample_branch
+
+RATES = {'teller': '3/min', 'branch': '100/min', 'account': '2/min'}
+
+
+class FakeClockBuckets(throttling.LocalBuckets):
+    now = 1000.0
+
+    def clock(self):
+        return self.now
+
+
+class TestTokenBucket(SimpleTestCase):
+    def test_burst_then_rate(self):
+        """Test that a bucket allows a burst then one request per interval"""
+        buckets = FakeClockBuckets()
+        waits = [throttling.take_token(buckets, 'key', 3, 60)
+                 for _ in range(4)]
+        self.assertEqual(waits[:3], [0, 0, 0])
+        self.assertAlmostEqual(waits[3], 20)
+
+        buckets.now += 20
+        self.assertEqual(throttling.take_token(buckets, 'key', 3, 60), 0)
+        self.assertGreater(throttling.take_token(buckets, 'key', 3, 60), 0)
+
+    def test_keys_have_separate_buckets(self):
+        """Test that throttling a key doesn't affect the others"""
+        buckets = FakeClockBuckets()
+        throttling.take_token(buckets, 'a', 1, 60)
+        self.assertGreater(throttling.take_token(buckets, 'a', 1, 60), 0)
+        self.assertEqual(throttling.take_token(buckets, 'b', 1, 60), 0)
+
+
+@mock.patch.object(throttling.TokenBucketThrottle, 'THROTTLE_RATES', RATES)
+class TestThrottledEndpoints(APITestCase):
+    def setUp(self):
+        throttling.get_buckets().clear()
+        self.branch = sample_branch()
+        self.accounts = [Account.objects.create(
+            user=sample_user(f'user{number}@gmail.com'), branch=self.branch,
+            number=1111111111111111 + number) for number in range(3)]
+        self.url = reverse('deposit', args=[self.branch.id])
+        self.client.force_authenticate(self.branch.teller)
+
+    def tearDown(self):
+        throttling.get_buckets().clear()
+
+    def deposit(self, account):
+        return self.client.post(self.url, {'amount': 10,
+                                           'account': account.id})
+
+    def test_account_is_throttled(self):
+        """Test that an account gets 429 and Retry-After over its rate"""
+        for _ in range(2):
+            self.assertEqual(self.deposit(self.accounts[0]).status_code,
+                             status.HTTP_201_CREATED)
+
+        with self.assertNumQueries(0):
+            response = self.deposit(self.accounts[0])
+        self.assertEqual(response.status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+
+        self.accounts[0].refresh_from_db()
+        self.assertEqual(self.accounts[0].balance, 20)
+
+    def test_teller_is_throttled(self):
+        """Test that a teller is throttled over all of the accounts"""
+        statuses = [self.deposit(account).status_code
+                    for account in self.accounts + self.accounts[:1]]
+        self.assertEqual(statuses, [status.HTTP_201_CREATED] * 3 +
+                         [status.HTTP_429_TOO_MANY_REQUESTS])
+
+    def test_token_is_throttled_before_authentication(self):
+        """Test that a throttled teller token doesn't reach the database"""
+        token = AuthToken.objects.issue(self.branch.teller)
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        statuses = [self.deposit(account).status_code
+                    for account in self.accounts]
+        self.assertEqual(statuses, [status.HTTP_201_CREATED] * 3)
+
+        with self.assertNumQueries(0):
+            response = self.deposit(self.accounts[1])
+        self.assertEqual(response.status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
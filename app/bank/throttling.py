@@ -0,0 +1,158 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import get_authorization_header
+from rest_framework.throttling import SimpleRateThrottle
+
+from accounts.authentication import ExpiringTokenAuthentication
+
+# entries of full buckets are dropped when there are more keys than this
+MAX_LOCAL_KEYS = 100000
+
+
+class LocalBuckets:
+    """
+        Token buckets of this process. A bucket is stored as the time it is
+        full again, so taking a token is one read and one write of a dict and
+        no lock is taken; requests racing on the same key may both get a
+        token, which over admits by at most the number of threads
+    """
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self):
+        self._full_at = {}
+
+    def get(self, key):
+        return self._full_at.get(key)
+
+    def set(self, key, full_at, duration):
+        if len(self._full_at) >= MAX_LOCAL_KEYS:
+            now = self.clock()
+            self._full_at = {key: value for key, value
+                             in self._full_at.items() if value > now}
+        self._full_at[key] = full_at
+
+    def clear(self):
+        self._full_at = {}
+
+
+class CacheBuckets:
+    """
+        Token buckets in a Django cache shared by all processes, the buckets
+        are kept like LocalBuckets and expire once they are full. The cache
+        API has no compare and set, so the limit is approximate the same
+        way: requests of all processes racing on one key may each get a
+        token between the get and the set
+    """
+    clock = staticmethod(time.time)
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, full_at, duration):
+        self.cache.set(key, full_at, timeout=int(duration) + 1)
+
+    def clear(self):
+        self.cache.clear()
+
+
+_buckets = {}
+
+
+def get_buckets():
+    """Buckets of THROTTLE_CACHE or of this process when it is not set"""
+    alias = settings.THROTTLE_CACHE
+    if alias not in _buckets:
+        _buckets[alias] = CacheBuckets(alias) if alias else LocalBuckets()
+    return _buckets[alias]
+
+
+def take_token(buckets, key, num_requests, duration):
+    """
+        Take a token from the bucket of the key which holds num_requests
+        tokens and gets them back in duration seconds. Return the seconds to
+        wait for the next token, 0 when a token was taken
+    """
+    now = buckets.clock()
+    interval = duration / num_requests
+    full_at = max(buckets.get(key) or now, now) + interval
+    if full_at - now > duration:
+        return full_at - now - duration
+    buckets.set(key, full_at, duration)
+    return 0
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+        Throttle with a token bucket per key, a rate of '600/min' allows a
+        burst of 600 requests then one request every 0.1 seconds. It only
+        looks at the token, the url and the body of the request, so the
+        views run it before the authentication (see ThrottleFirstMixin)
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.wait_time = 0
+
+    def get_idents(self, request, view):
+        """Values the requests are throttled by"""
+        raise NotImplementedError('.get_idents() must be overridden')
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        buckets = get_buckets()
+        for ident in self.get_idents(request, view):
+            if ident is None:
+                continue
+            key = self.cache_format % {'scope': self.scope, 'ident': ident}
+            self.wait_time = take_token(buckets, key, self.num_requests,
+                                        self.duration)
+            if self.wait_time:
+                return False
+        return True
+
+    def wait(self):
+        return self.wait_time
+
+
+class TellerThrottle(TokenBucketThrottle):
+    """
+        Throttle the requests of each teller by its token, without reading
+        the token from the database, or by the user when it is not
+        authenticated by a token
+    """
+    scope = 'teller'
+
+    def get_idents(self, request, view):
+        auth = get_authorization_header(request).split()
+        keyword = ExpiringTokenAuthentication.keyword.lower().encode()
+        if len(auth) == 2 and auth[0].lower() == keyword:
+            # the key is a credential, it is not put in the cache as is
+            return [hashlib.sha256(auth[1]).hexdigest()]
+        return [request.user.pk]
+
+
+class BranchThrottle(TokenBucketThrottle):
+    """Throttle the requests made on each branch"""
+    scope = 'branch'
+
+    def get_idents(self, request, view):
+        return [view.kwargs.get('pk')]
+
+
+class AccountThrottle(TokenBucketThrottle):
+    """Throttle the requests made on each account"""
+    scope = 'account'
+
+    def get_idents(self, request, view):
+        try:
+            return [request.data.get('account')]
+        except AttributeError:  # not a dict body
+            return []
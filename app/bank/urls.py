@@ -22,6 +22,26 @@ urlpatterns = [
          views.TransferAPIView.as_view(),
          name='transfer'),
 
+    path('pay/<pk>/',
+         views.PayAPIView.as_view(),
+         name='pay'),
+
+    path('loan/<pk>/',
+         views.LoanAPIView.as_view(),
+         name='loan'),
+
+    path('repay/<pk>/',
+         views.RepaymentAPIView.as_view(),
+         name='repay'),
+
+    path('standing-order/<pk>/',
+         views.StandingOrderAPIView.as_view(),
+         name='standing_order'),
+
+    path('events/',
+         views.AccountEventsAPIView.as_view(),
+         name='account_events'),
+
     path('create-branch/',
          views.CreateBranchAPIView.as_view(),
          name='create_branch')
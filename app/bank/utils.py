@@ -1,42 +1,378 @@
-from django.db import transaction
+import random
+from decimal import ROUND_HALF_UP
 
-from bank.models import Account
+from django.conf import settings
+from django.db import transaction, router, connections
+from django.db.models import F
+from django.utils import timezone
+
+from bank.amortization import CENT
+from bank import events
+from bank.audit import link
+from bank.execution import execute, lock_accounts
+from bank.ledger import record_movements
+from core.money import Money
+from bank.models import Account, AccountCreditSlot, Pay, Loan, \
+    BaseTransaction, Settlement, Transfer, Transaction, StandingOrder
+
+SETTLEMENT_BATCH_SIZE = 1000
+STANDING_ORDER_BATCH_SIZE = 1000
+BULK_CREATE_BATCH_SIZE = 1000
+
+
+def _db_for(account):
+    """Database that stores the account, it differs per shard"""
+    return router.db_for_write(Account, instance=account)
+
+
+def _credit_slot(account, amount):
+    """
+        Add the amount to a random credit slot of a hot account, the account
+        row itself is neither read nor locked
+    """
+    amount = Money.of(amount)
+    slot = random.randrange(settings.HOT_ACCOUNT_SLOTS)
+    credit_slots = AccountCreditSlot.objects.using(_db_for(account))
+    slots = credit_slots.filter(account=account, slot=slot)
+    if not slots.update(amount=F('amount') + amount):
+        credit_slots.get_or_create(account=account, slot=slot)
+        slots.update(amount=F('amount') + amount)
+
+
+def _credit(account, amount):
+    if account.is_hot:
+        _credit_slot(account, amount)
+    else:
+        account.balance += amount
+        account.save(update_fields=['balance'])
+
+
+def fold_credits(account):
+    """Move the pending credits of a hot account into its balance"""
+    return execute(_db_for(account), _fold_credits, account)
+
+
+def _fold_credits(account):
+    # the account row is locked before its slots like in the movements
+    db = _db_for(account)
+    lock_accounts(db, account)
+    slots = list(AccountCreditSlot.objects.using(db).select_for_update()
+                 .filter(account=account, amount__gt=0))
+    pending = sum(slot.amount for slot in slots)
+    if pending:
+        AccountCreditSlot.objects.using(db).filter(
+            pk__in=[slot.pk for slot in slots]).update(amount=0)
+        Account.objects.using(db).filter(pk=account.pk).update(
+            balance=F('balance') + pending)
+    account.refresh_from_db(fields=['balance'])
+    return pending
 
 
-@transaction.atomic
 def apply_deposit(account, amount):
     """Apply atomic transaction for depositing"""
     assert isinstance(account, Account)
-    assert amount > 0.0
-    account.balance += amount
-    account.save()
+    assert amount > 0
+    return execute(_db_for(account), _deposit, account, amount)
+
+
+def _deposit(account, amount):
+    if not account.is_hot:
+        lock_accounts(_db_for(account), account)
+    _credit(account, amount)
     return True
 
 
-@transaction.atomic
 def apply_withdraw(account, amount):
     """Apply atomic transaction for withdraw"""
     assert isinstance(account, Account)
-    assert amount > 0.0
+    assert amount > 0
+    return execute(_db_for(account), _withdraw, account, amount)
+
+
+def _withdraw(account, amount):
+    lock_accounts(_db_for(account), account)
+    if account.is_hot:
+        fold_credits(account)
     if (account.balance - amount) < 0:
         return False
     else:
         account.balance -= amount
-        account.save()
+        account.save(update_fields=['balance'])
         return True
 
 
-@transaction.atomic
 def apply_transfer(from_account, to_account, amount):
     """Apply atomic transaction for transferring money"""
     assert isinstance(from_account, Account)
     assert isinstance(to_account, Account)
-    assert amount > 0.0
+    assert amount > 0
+    if from_account.currency != to_account.currency:
+        return False
+    return execute(_db_for(from_account), _transfer, from_account,
+                   to_account, amount)
+
+
+def _transfer(from_account, to_account, amount):
+    # a hot account is credited through a slot without locking its row,
+    # unless the slots of the sender are folded too: then both rows are
+    # locked first so the slots of two accounts are never locked crosswise
+    accounts = [from_account]
+    if from_account.is_hot or not to_account.is_hot:
+        accounts.append(to_account)
+    lock_accounts(_db_for(from_account), *accounts)
+    if from_account.is_hot:
+        fold_credits(from_account)
     if (from_account.balance - amount) < 0:
         return False
     else:
         from_account.balance -= amount
-        to_account.balance += amount
-        from_account.save()
-        to_account.save()
+        from_account.save(update_fields=['balance'])
+        _credit(to_account, amount)
         return True
+
+
+def apply_pay(account, merchant, amount):
+    """
+        Apply atomic transaction for paying a merchant, only the customer is
+        debited here, the merchant is credited by settle_payments
+    """
+    assert isinstance(account, Account)
+    assert isinstance(merchant, Account)
+    if account.currency != merchant.currency:
+        return False
+    return apply_withdraw(account, amount)
+
+
+def settle_payments(merchant, until=None):
+    """
+        Credit the merchant with all of its unsettled payments created up to
+        ``until`` as a single balance update, recorded by one Settlement
+        movement. Returns the number of payments and the settled amount
+    """
+    return execute(_db_for(merchant), _settle_payments, merchant,
+                   until or timezone.now())
+
+
+def _settle_payments(merchant, until):
+    db = _db_for(merchant)
+    payments = list(Pay.objects.using(db)
+                    .select_for_update(skip_locked=True)
+                    .filter(merchant=merchant,
+                            settled__isnull=True,
+                            created__lte=until)
+                    .values_list('pk', 'amount'))
+    if not payments:
+        return 0, 0
+
+    now = timezone.now()
+    for start in range(0, len(payments), SETTLEMENT_BATCH_SIZE):
+        batch = payments[start:start + SETTLEMENT_BATCH_SIZE]
+        Pay.objects.using(db).filter(pk__in=[pk for pk, _ in batch]) \
+            .update(settled=now)
+    total = sum(amount for _, amount in payments)
+    Account.objects.using(db).filter(pk=merchant.pk).update(
+        balance=F('balance') + total)
+    settlement = bulk_create_movements(
+        [Settlement(account=merchant, amount=total,
+                    payments=len(payments))], db)[0]
+    bulk_create_transactions(
+        [Transaction(branch_id=merchant.branch_id,
+                     transaction_type=settlement)], db)
+    return len(payments), total
+
+
+def apply_loan(account, amount):
+    """Apply atomic transaction for lending money to the account"""
+    return apply_deposit(account, amount)
+
+
+def apply_repayment(account, loan, amount):
+    """
+        Apply atomic transaction for paying back a loan, the accrued interest
+        is paid before the principal. Returns the paid interest or None when
+        the repayment can not be applied
+    """
+    assert isinstance(account, Account)
+    assert isinstance(loan, Loan)
+    assert amount > 0
+    return execute(_db_for(account), _repayment, account, loan,
+                   Money.of(amount))
+
+
+def _repayment(account, loan, amount):
+    db = _db_for(account)
+    lock_accounts(db, account)
+    loan = Loan.objects.using(db).select_for_update().get(pk=loan.pk)
+    accrued = loan.accrued_interest.quantize(CENT, ROUND_HALF_UP)
+    interest = min(amount, Money.of(accrued))
+    principal = amount - interest
+    if principal > loan.outstanding or not apply_withdraw(account, amount):
+        return None
+
+    loan.accrued_interest = max(loan.accrued_interest - interest.decimal, 0)
+    loan.outstanding -= principal
+    loan.save(update_fields=['accrued_interest', 'outstanding'])
+    return interest
+
+
+def bulk_create_movements(movements, using):
+    """
+        Insert movements of one BaseTransaction child model in bulk,
+        bulk_create doesn't support multi-table inheritance so the parent
+        rows are bulk created first and then the child rows are inserted.
+        Their change log events are written too, as no signal is sent
+    """
+    if not movements:
+        return movements
+    model = type(movements[0])
+    parent_fields = BaseTransaction._meta.concrete_fields
+    parents = BaseTransaction.objects.using(using).bulk_create(
+        [BaseTransaction(**{field.attname: getattr(movement, field.attname)
+                            for field in parent_fields})
+         for movement in movements],
+        batch_size=BULK_CREATE_BATCH_SIZE)
+    for movement, parent in zip(movements, parents):
+        movement.created = parent.created
+        movement.basetransaction_ptr_id = parent.pk
+
+    fields = model._meta.local_concrete_fields
+    manager = model._base_manager.db_manager(using)
+    size = connections[using].ops.bulk_batch_size(fields, movements) or \
+        len(movements)
+    for start in range(0, len(movements), size):
+        manager._insert(movements[start:start + size], fields=fields,
+                        using=using)
+    for movement in movements:
+        movement._state.adding = False
+        movement._state.db = using
+    record_movements(movements, using)
+    return movements
+
+
+def bulk_create_transactions(transactions, using):
+    """
+        Insert the ledger entries of movements in bulk, chained to the audit
+        log of their branch first and published to the account holders
+        since no signal is sent
+    """
+    with transaction.atomic(using=using):
+        transactions = Transaction.objects.using(using).bulk_create(
+            link(transactions, using), batch_size=BULK_CREATE_BATCH_SIZE)
+    events.publish_transactions(transactions, using)
+    return transactions
+
+
+CURRENCY_MISMATCH = 'The accounts have different currencies'
+
+
+def _transfer_in_bulk(orders, using):
+    """
+        Apply the transfers of the orders with apply_transfer semantics
+        using one statement per kind of row, the accounts are locked in
+        primary key order. Returns the errors of the failed orders by pk
+    """
+    account_ids = {order.account_id for order in orders} | \
+        {order.to_account_id for order in orders}
+    accounts = {account.pk: account for account in
+                Account.objects.using(using).select_for_update()
+                .filter(pk__in=account_ids).order_by('pk')}
+    debited = {order.account_id for order in orders}
+    for account in accounts.values():
+        if account.is_hot and account.pk in debited:
+            fold_credits(account)
+
+    errors, changed, hot_credits, transfers = {}, {}, {}, []
+    for order in orders:
+        source = accounts[order.account_id]
+        target = accounts[order.to_account_id]
+        if source.currency != target.currency:
+            errors[order.pk] = CURRENCY_MISMATCH
+            continue
+        if source.balance < order.amount:
+            errors[order.pk] = 'Insufficient balance'
+            continue
+        source.balance -= order.amount
+        changed[source.pk] = source
+        if target.is_hot:
+            hot_credits[target.pk] = \
+                hot_credits.get(target.pk, 0) + order.amount
+        else:
+            target.balance += order.amount
+            changed[target.pk] = target
+        transfers.append(Transfer(account=source, to_account=target,
+                                  amount=order.amount))
+
+    Account.objects.using(using).bulk_update(
+        list(changed.values()), ['balance'],
+        batch_size=STANDING_ORDER_BATCH_SIZE)
+    for pk, amount in hot_credits.items():
+        _credit_slot(accounts[pk], amount)
+    bulk_create_movements(transfers, using)
+    bulk_create_transactions(
+        [Transaction(branch_id=transfer.account.branch_id,
+                     transaction_type=transfer) for transfer in transfers],
+        using)
+    return errors
+
+
+def _transfer_one_by_one(orders, using):
+    """Apply the transfers of the orders each in its own savepoint"""
+    errors = {}
+    for order in orders:
+        try:
+            with transaction.atomic(using=using):
+                accounts = Account.objects.using(using).select_for_update()
+                source = accounts.get(pk=order.account_id)
+                target = accounts.get(pk=order.to_account_id)
+                if source.currency != target.currency:
+                    errors[order.pk] = CURRENCY_MISMATCH
+                    continue
+                if not apply_transfer(source, target, order.amount):
+                    errors[order.pk] = 'Insufficient balance'
+                    continue
+                transfer = Transfer.objects.using(using).create(
+                    account=source, to_account=target, amount=order.amount)
+                Transaction.objects.using(using).create(
+                    branch_id=source.branch_id, transaction_type=transfer)
+        except Exception as error:  # isolate the order that broke the batch
+            errors[order.pk] = str(error)
+    return errors
+
+
+def run_standing_orders(using, now=None,
+                        batch_size=STANDING_ORDER_BATCH_SIZE):
+    """
+        Run the due occurrence of up to batch_size standing orders and move
+        them to their next run in the same transaction. An order which fails
+        is counted and skips to its next run without failing the others.
+        Returns the number of executed and failed orders
+    """
+    return execute(using, _run_standing_orders, using, now or timezone.now(),
+                   batch_size)
+
+
+def _run_standing_orders(using, now, batch_size):
+    orders = list(StandingOrder.objects.using(using)
+                  .select_for_update(skip_locked=True)
+                  .filter(active=True, next_run__lte=now)
+                  .order_by('next_run')[:batch_size])
+    if not orders:
+        return 0, 0
+
+    try:
+        with transaction.atomic(using=using):
+            errors = _transfer_in_bulk(orders, using)
+    except Exception:
+        errors = _transfer_one_by_one(orders, using)
+
+    for order in orders:
+        order.runs += 1
+        order.next_run = order.occurrence(order.runs)
+        order.last_error = errors.get(order.pk, '')[:200]
+        if order.pk in errors:
+            order.failures += 1
+        if order.end and order.next_run > order.end:
+            order.active = False
+    StandingOrder.objects.using(using).bulk_update(
+        orders, ['runs', 'next_run', 'last_error', 'failures', 'active'])
+    return len(orders) - len(errors), len(errors)
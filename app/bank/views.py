@@ -1,32 +1,78 @@
-from rest_framework import generics, status
+from django.conf import settings
+from django.db import router, transaction
+from django.http import StreamingHttpResponse
+from rest_framework import generics, status, serializers
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.response import Response
-from .models import Account, Branch, Deposit, Transaction, Withdraw, Transfer, Bank
+from rest_framework.views import APIView
+from accounts.authentication import ExpiringTokenAuthentication
+from core.renderers import EventStreamRenderer
+from .models import Account, Branch, Deposit, Transaction, Withdraw, \
+    Transfer, Bank, Pay, Loan, Repayment
+from .exceptions import SuspectedFraudError
 from .permissions import IsTeller
-from .serializers import AccountSerializer, SerializerCreator, TransactionSerializer, BranchSerializer
-from . import utils
+from .throttling import TellerThrottle, BranchThrottle, AccountThrottle
+from .serializers import AccountSerializer, SerializerCreator, \
+    TransactionSerializer, BranchSerializer, StandingOrderSerializer
+from . import utils, sharding, fraud, events, execution, lanes, streams
 
 
 class AuthenticationMixin:
     """Mixin for all Views that require authentication"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (ExpiringTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
 
+class ThrottleFirstMixin:
+    """
+        Mixin checking the throttles before the authentication, they only
+        read the request so a throttled request is refused without a query,
+        apart from the shard lookup of ShardRoutingMixin when shards are on
+    """
+
+    def initial(self, request, *args, **kwargs):
+        self.check_throttles(request)
+        self.throttles_checked = True
+        super().initial(request, *args, **kwargs)
+
+    def check_throttles(self, request):
+        if not getattr(self, 'throttles_checked', False):
+            super().check_throttles(request)
+
+
+class ShardRoutingMixin:
+    """
+        Mixin for endpoints with a branch pk in the url, it runs the request
+        on the shard that stores the branch
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        shard = sharding.shard_for_branch(kwargs.get('pk'))
+        with sharding.using_shard(shard):
+            return super().dispatch(request, *args, **kwargs)
+
+
 class OpenAccountAPIView(AuthenticationMixin, generics.CreateAPIView):
     """
         API Endpoint to an account
     """
     serializer_class = AccountSerializer
 
+    def create(self, request, *args, **kwargs):
+        """Open the account on the shard of the requested branch"""
+        shard = sharding.shard_for_branch(request.data.get('branch'))
+        with sharding.using_shard(shard):
+            return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """Set account user to the current user before saving it"""
         return serializer.save(user=self.request.user)
 
 
-class DeleteAccountAPIView(AuthenticationMixin, generics.DestroyAPIView):
+class DeleteAccountAPIView(ShardRoutingMixin, AuthenticationMixin,
+                           generics.DestroyAPIView):
     """
         API Endpoint to remove an account
     """
@@ -42,7 +88,8 @@ class DeleteAccountAPIView(AuthenticationMixin, generics.DestroyAPIView):
             return Response(status=status.HTTP_403_FORBIDDEN)
 
 
-class BaseTransactionMixin(AuthenticationMixin, generics.CreateAPIView):
+class BaseTransactionMixin(ShardRoutingMixin, AuthenticationMixin,
+                           generics.CreateAPIView):
     """
         Mixin for all endpoints that deal with transaction creation
     """
@@ -57,25 +104,68 @@ class BaseTransactionMixin(AuthenticationMixin, generics.CreateAPIView):
         return SerializerCreator.model_serializer_factory(self.model)
 
 
-class DepositPaymentWithdrawMixin(BaseTransactionMixin):
+class DepositPaymentWithdrawMixin(ThrottleFirstMixin, BaseTransactionMixin):
     """
         Mixin for all API endpoint that are requested by teller
     """
     permission_classes = [IsAuthenticated, IsTeller]
+    throttle_classes = [TellerThrottle, BranchThrottle, AccountThrottle]
 
     def create(self, request, *args, **kwargs):
         """check permissions before processing creation"""
         self.check_object_permissions(request, self.get_object())
         return super().create(request, args, kwargs)
 
-    def apply_transaction(self, serializer, transaction_logic_method):
+    def perform_create(self, serializer):
+        """
+            Apply the movement and save it with its Transaction as one
+            database transaction, which is run again on deadlocks and
+            serialization failures. With MOVEMENT_LANES the movement is
+            applied by the lane of the branch it is entered in and the
+            request waits for the commit
+        """
+        def attempt():
+            serializer.instance = None  # saved by a rolled back attempt
+            return self.apply_movement(serializer)
+
+        using = router.db_for_write(self.model)
+        if settings.MOVEMENT_LANES:
+            branch = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+            return lanes.get_lanes().submit(branch, using, attempt).result()
+        return execution.execute(using, attempt)
+
+    def apply_movement(self, serializer):
+        raise NotImplementedError('.apply_movement() must be overridden')
+
+    def screen(self, account, amount, counterparty=None):
+        """
+            Check the movement with the fraud rules before it is applied,
+            it is returned to be recorded once it is applied
+        """
+        movement = fraud.pending_movement(self.model._meta.model_name,
+                                          account, amount, counterparty)
+        try:
+            fraud.get_engine().check(movement)
+        except SuspectedFraudError as error:
+            raise PermissionDenied(error.reason)
+        return movement
+
+    def record(self, movement):
+        """Add the movement to the fraud rules once it is committed"""
+        transaction.on_commit(lambda: fraud.get_engine().record(movement),
+                              using=router.db_for_write(self.model))
+
+    def apply_transaction(self, serializer, transaction_logic_method,
+                          **save_kwargs):
         account = serializer.validated_data['account']
         amount = serializer.validated_data['amount']
         if account.branch.bank == self.get_object().bank:
+            movement = self.screen(account, amount)
             if transaction_logic_method(account, amount):
-                transaction_type = serializer.save()
+                transaction_type = serializer.save(**save_kwargs)
                 Transaction.objects.create(branch=self.get_object(),
                                            transaction_type=transaction_type)
+                self.record(movement)
                 return transaction_type
 
         # TODO oops fix next line it returns 201!
@@ -88,7 +178,7 @@ class DepositAPIView(DepositPaymentWithdrawMixin):
     """
     model = Deposit
 
-    def perform_create(self, serializer):
+    def apply_movement(self, serializer):
         return super().apply_transaction(serializer, utils.apply_deposit)
 
 
@@ -98,7 +188,7 @@ class WithdrawAPIView(DepositPaymentWithdrawMixin):
     """
     model = Withdraw
 
-    def perform_create(self, serializer):
+    def apply_movement(self, serializer):
         return super().apply_transaction(serializer, utils.apply_withdraw)
 
 
@@ -108,7 +198,7 @@ class TransferAPIView(DepositPaymentWithdrawMixin):
     """
     model = Transfer
 
-    def perform_create(self, serializer):
+    def apply_movement(self, serializer):
         from_account = serializer.validated_data['account']
         to_account = serializer.validated_data['to_account']
         amount = serializer.validated_data['amount']
@@ -117,16 +207,112 @@ class TransferAPIView(DepositPaymentWithdrawMixin):
                                                 self.get_object().bank
 
         if accounts_and_teller_has_the_same_bank:
+            movement = self.screen(from_account, amount, to_account)
             if utils.apply_transfer(from_account, to_account, amount):
                 transaction_type = serializer.save()
                 Transaction.objects.create(branch=self.get_object(),
                                            transaction_type=transaction_type)
+                self.record(movement)
                 return transaction_type
 
         # TODO oops fix next line it returns 201!
         return Response(status=status.HTTP_409_CONFLICT)
 
 
+class PayAPIView(DepositPaymentWithdrawMixin):
+    """
+        API Endpoint to pay a merchant from an account, the merchant gets
+        the money when the payments are settled
+    """
+    model = Pay
+
+    def apply_movement(self, serializer):
+        account = serializer.validated_data['account']
+        merchant = serializer.validated_data.get('merchant')
+        amount = serializer.validated_data['amount']
+        if merchant is None or merchant == account:
+            raise serializers.ValidationError(
+                {'merchant': 'A merchant other than the account is required'})
+
+        if account.branch.bank == merchant.branch.bank == \
+                self.get_object().bank:
+            movement = self.screen(account, amount, merchant)
+            if utils.apply_pay(account, merchant, amount):
+                transaction_type = serializer.save()
+                Transaction.objects.create(branch=self.get_object(),
+                                           transaction_type=transaction_type)
+                self.record(movement)
+                return transaction_type
+
+        raise serializers.ValidationError(
+            'The payment can not be applied to these accounts')
+
+
+class LoanAPIView(DepositPaymentWithdrawMixin):
+    """
+        API Endpoint to lend money to an account
+    """
+    model = Loan
+
+    def apply_movement(self, serializer):
+        amount = serializer.validated_data['amount']
+        return super().apply_transaction(serializer, utils.apply_loan,
+                                         outstanding=amount)
+
+
+class RepaymentAPIView(DepositPaymentWithdrawMixin):
+    """
+        API Endpoint to pay back a loan from an account
+    """
+    model = Repayment
+
+    def apply_movement(self, serializer):
+        account = serializer.validated_data['account']
+        loan = serializer.validated_data.get('repaid_loan')
+        amount = serializer.validated_data['amount']
+        if loan is None or loan.account_id != account.pk:
+            raise serializers.ValidationError(
+                {'repaid_loan': 'A loan of the account is required'})
+
+        if account.branch.bank == self.get_object().bank:
+            movement = self.screen(account, amount)
+            interest = utils.apply_repayment(account, loan, amount)
+            if interest is not None:
+                transaction_type = serializer.save(interest_paid=interest)
+                Transaction.objects.create(branch=self.get_object(),
+                                           transaction_type=transaction_type)
+                self.record(movement)
+                return transaction_type
+
+        raise serializers.ValidationError(
+            'The repayment can not be applied to this loan')
+
+
+class StandingOrderAPIView(ShardRoutingMixin, AuthenticationMixin,
+                           generics.CreateAPIView):
+    """
+        API Endpoint to create a standing order, the transfers are made by
+        the run_standing_orders command
+    """
+    queryset = Branch.objects.all()
+    serializer_class = StandingOrderSerializer
+    permission_classes = [IsAuthenticated, IsTeller]
+
+    def create(self, request, *args, **kwargs):
+        """check permissions before processing creation"""
+        self.get_object()
+        return super().create(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        account = serializer.validated_data['account']
+        to_account = serializer.validated_data['to_account']
+        if not account.branch.bank == to_account.branch.bank == \
+                self.get_object().bank:
+            raise serializers.ValidationError(
+                'The accounts must be in the bank of the branch')
+        return serializer.save()
+
+
 class CreateBranchAPIView(AuthenticationMixin, generics.CreateAPIView):
     """
         API Endpoint, creating branch by banker
@@ -135,5 +321,58 @@ class CreateBranchAPIView(AuthenticationMixin, generics.CreateAPIView):
 
     def perform_create(self, serializer):
         """Set bank to current bankers bank before creating branch"""
-        bank = get_object_or_404(Bank, banker=self.request.user)
-        return serializer.save(bank=bank)
+        shard = sharding.shard_for_banker(self.request.user.pk)
+        with sharding.using_shard(shard):
+            bank = get_object_or_404(Bank, banker=self.request.user)
+            return serializer.save(bank=bank)
+
+
+class AccountEventsAPIView(AuthenticationMixin, APIView):
+    """
+        API Endpoint streaming the transactions and balances of the accounts
+        of the user as server-sent events
+    """
+    renderer_classes = [EventStreamRenderer] + \
+        APIView.renderer_classes
+
+    def get(self, request, *args, **kwargs):
+        """
+            Under WSGI a stream holds its thread, so a process serves at most
+            EVENT_MAX_STREAMS of them and answers 503 to the others. Under
+            ASGI the streams are served by bank.streams instead
+        """
+        if not events.stream_slots.acquire():
+            return Response(
+                {'detail': 'Too many event streams, try again later'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(settings.EVENT_KEEPALIVE)})
+        subscription = events.get_broker().subscribe(
+            streams.account_channels(request.user))
+        response = StreamingHttpResponse(EventStream(subscription),
+                                         content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # don't buffer in nginx
+        return response
+
+
+class EventStream:
+    """
+        Body of an events response, closing it (which the server does even
+        when the body was never read) frees its subscription and stream slot
+    """
+
+    def __init__(self, subscription):
+        self.subscription = subscription
+        self.closed = False
+
+    def __iter__(self):
+        yield events.retry_message()
+        while not self.closed:
+            yield events.message(
+                self.subscription.get(timeout=settings.EVENT_KEEPALIVE))
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.subscription.close()
+            events.stream_slots.release()
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# the account events are streamed on the event loop, see bank.streams
+from bank.streams import AccountEventsApp  # noqa: E402
+
+application = AccountEventsApp(application)
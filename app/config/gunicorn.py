@@ -0,0 +1,88 @@
+"""
+Gunicorn config of the production server, started from the app directory
+with ``gunicorn -c config/gunicorn.py``.
+
+SERVER_MODE picks the worker model:
+
+* ``sync``: one request at a time per process, 2 * cores + 1 processes.
+  The account events stream is refused, it would take the whole process
+* ``threaded``: GUNICORN_THREADS requests per process, one process per core.
+  An account events stream holds a thread, half of the threads may stream
+* ``asgi``: uvicorn workers serving config.asgi, one process per core. The
+  account events are streamed on the event loop without holding a thread,
+  this is the mode for many subscribers
+
+WEB_CONCURRENCY overrides the number of processes, ``manage.py bench_server``
+compares the modes on the bank endpoints.
+"""
+
+import multiprocessing
+import os
+
+MODES = ('sync', 'threaded', 'asgi')
+
+mode = os.environ.get('SERVER_MODE', 'threaded')
+if mode not in MODES:
+    raise RuntimeError(f'SERVER_MODE must be one of {", ".join(MODES)}')
+
+cores = multiprocessing.cpu_count()
+
+bind = f'0.0.0.0:{os.environ.get("PORT", 8000)}'
+workers = int(os.environ.get('WEB_CONCURRENCY',
+                             cores * 2 + 1 if mode == 'sync' else cores))
+
+if mode == 'asgi':
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'config.wsgi:application'
+    worker_class = 'gthread' if mode == 'threaded' else 'sync'
+    threads = int(os.environ.get('GUNICORN_THREADS', 4)) \
+        if mode == 'threaded' else 1
+
+# read by the settings when gunicorn loads the app (EVENT_MAX_STREAMS)
+if mode == 'sync':
+    os.environ.setdefault('EVENT_MAX_STREAMS', '0')
+elif mode == 'threaded':
+    os.environ.setdefault('EVENT_MAX_STREAMS', str(max(threads // 2, 1)))
+
+# the app is imported once by the master and the workers are forked with it
+preload_app = True
+
+# workers are replaced after a number of requests so memory growth is capped,
+# the jitter keeps them from restarting together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER',
+                                         max_requests // 10))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+
+def pre_fork(server, worker):
+    """
+        Close the connections the master opened while preloading, a forked
+        worker would otherwise share their sockets
+    """
+    from django.db import connections
+
+    for connection in connections.all():
+        connection.close()
+
+
+def post_fork(server, worker):
+    """
+        Warm the fraud engine before the worker accepts requests, the first
+        money request would otherwise scan the ledger. A failure is logged
+        and the engine is warmed by the first request as before
+    """
+    from bank.fraud import get_engine
+
+    try:
+        get_engine()
+    except Exception:
+        server.log.exception('Could not warm the fraud engine')
@@ -26,25 +26,37 @@ INSTALLED_APPS = [
 
     'rest_framework',
     'rest_framework.authtoken',
-    'coreapi',
-    'drf_yasg',
 
     'accounts.apps.AccountsConfig',
     'bank.apps.BankConfig',
 ]
 
+# The swagger and redoc pages, drf_yasg is neither installed nor imported
+# by processes running without them (API_DOCS=0), coreapi is only a library
+# of drf_yasg and is no app
+API_DOCS = os.environ.get('API_DOCS', '1') == '1'
+if API_DOCS:
+    INSTALLED_APPS.append('drf_yasg')
+
 # Application definition
 
+# The session, CSRF, auth and messages middleware of core.middleware skip
+# the requests under API_PATH_PREFIXES, the API authenticates them with
+# tokens, while the admin and the API docs keep the whole chain
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'core.middleware.CsrfViewMiddleware',
+    'core.middleware.AuthenticationMiddleware',
+    'core.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.PrimaryPinningMiddleware',
 ]
 
+API_PATH_PREFIXES = ('/bank/', '/accounts/', '/healthz', '/readyz')
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -75,6 +87,45 @@ DATABASES = {
     }
 }
 
+# Read replicas, comma separated hosts e.g. DB_REPLICA_HOSTS=replica1,replica2
+# reads outside of transaction.atomic go to a replica whose lag is lower
+# than REPLICA_MAX_LAG seconds, otherwise they fall back to the primary
+
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dict(DATABASES['default'], HOST=host,
+                            TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+
+# Bank shards, comma separated hosts e.g. DB_SHARD_HOSTS=shard1,shard2
+# each bank with all of its branches, accounts and transactions is stored on
+# one shard, users and the shard directory stay in the default database
+
+DATABASE_SHARDS = []
+for index, host in enumerate(
+        filter(None, os.environ.get('DB_SHARD_HOSTS', '').split(','))):
+    alias = f'shard_{index}'
+    DATABASES[alias] = dict(DATABASES['default'], HOST=host)
+    DATABASE_SHARDS.append(alias)
+
+# manage.py test adds two SQLite shards when DB_SHARD_HOSTS is unset and a
+# mirror of the default database when DB_REPLICA_HOSTS is, see
+# core.testing.TestRunner
+
+TEST_RUNNER = 'core.testing.TestRunner'
+
+DATABASE_ROUTERS = [
+    'bank.sharding.ShardRouter',
+    'core.routers.PrimaryReplicaRouter',
+]
+
+REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 5))
+
+REPLICA_LAG_CHECK_INTERVAL = float(
+    os.environ.get('DB_REPLICA_LAG_CHECK_INTERVAL', 1))
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -117,3 +168,117 @@ STATIC_URL = '/static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'accounts.user'
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # token buckets of the teller, branch and account throttles of the
+    # transaction endpoints (see bank.throttling)
+    'DEFAULT_THROTTLE_RATES': {
+        'teller': os.environ.get('THROTTLE_TELLER_RATE', '600/min'),
+        'branch': os.environ.get('THROTTLE_BRANCH_RATE', '6000/min'),
+        'account': os.environ.get('THROTTLE_ACCOUNT_RATE', '120/min'),
+    },
+}
+
+# Cache alias holding the throttle buckets so they are shared by all the
+# processes, the buckets are kept in each process when it is not set
+THROTTLE_CACHE = os.environ.get('THROTTLE_CACHE') or None
+
+# The API schema is generated once into this file (see generate_schema) and
+# regenerated when the URLconf changes, the UIs load it instead of
+# introspecting the views on every page view
+API_SCHEMA_FILE = os.environ.get('API_SCHEMA_FILE',
+                                 BASE_DIR / 'openapi.json')
+
+SWAGGER_SETTINGS = {
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+
+REDOC_SETTINGS = {
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+
+# Number of credit slots of each hot account, credits to a hot account scale
+# with the number of slots since each one is a separate row lock
+HOT_ACCOUNT_SLOTS = int(os.environ.get('HOT_ACCOUNT_SLOTS', 16))
+
+# Money movements lock their accounts in primary key order and run at
+# MONEY_ISOLATION_LEVEL on PostgreSQL (see bank.execution), a movement that
+# deadlocks or fails to serialize is run again up to MONEY_RETRY_ATTEMPTS
+# times after a random wait of up to MONEY_RETRY_BACKOFF * 2 ** attempt
+# seconds, capped at MONEY_RETRY_MAX_BACKOFF
+MONEY_ISOLATION_LEVEL = os.environ.get('MONEY_ISOLATION_LEVEL',
+                                       'READ COMMITTED')
+MONEY_RETRY_ATTEMPTS = int(os.environ.get('MONEY_RETRY_ATTEMPTS', 5))
+MONEY_RETRY_BACKOFF = 0.01
+MONEY_RETRY_MAX_BACKOFF = 0.5
+
+# Worker lanes per process applying the movements of the teller endpoints,
+# 0 applies them in the request thread. Each branch has one lane, which
+# commits the movements queued within MOVEMENT_LANE_WAIT seconds together,
+# up to MOVEMENT_LANE_BATCH_SIZE per transaction
+MOVEMENT_LANES = int(os.environ.get('MOVEMENT_LANES', 0))
+MOVEMENT_LANE_BATCH_SIZE = 100
+MOVEMENT_LANE_WAIT = 0.002
+
+# Rules checked before a transaction is applied (see bank.fraud), their state
+# is kept in memory and warmed from the ledger on the first transaction
+FRAUD_RULES = [
+    {
+        'NAME': 'bank.fraud.VelocityRule',
+        'OPTIONS': {'window': 3600, 'max_amount': 50000, 'max_count': 30},
+    },
+    {
+        'NAME': 'bank.fraud.NewCounterpartyRule',
+        'OPTIONS': {'max_amount': 10000, 'days': 90},
+    },
+    {
+        'NAME': 'bank.fraud.RoundTripRule',
+        'OPTIONS': {'window': 24 * 3600},
+    },
+]
+
+# Backend of the account events pushed to the clients, LocalBackend only
+# reaches the subscribers of the same process, bank.events.PostgresBackend
+# reaches all processes using LISTEN/NOTIFY
+EVENT_BACKEND = os.environ.get('EVENT_BACKEND', 'bank.events.LocalBackend')
+# events kept for a slow subscriber and seconds between keepalive comments
+EVENT_QUEUE_SIZE = 100
+EVENT_KEEPALIVE = 15
+# streams a process serves from WSGI threads, each holds its thread until the
+# client leaves and 0 refuses them (see config/gunicorn.py), under ASGI they
+# are served on the event loop without a limit
+EVENT_MAX_STREAMS = int(os.environ.get('EVENT_MAX_STREAMS', 100))
+
+# Seconds a serialized user profile is cached, it is also dropped on update
+PROFILE_CACHE_TIMEOUT = 300
+
+# Sampling profiler of requests (see core.middleware.ProfilingMiddleware),
+# it is off unless PROFILING_DIRECTORY is set. PROFILING_VIEWS maps url names,
+# with the namespace of the app when it has one, to the rate of their requests
+# to profile, e.g. {'deposit': 0.1, 'user:me': 1}, and requests slower than
+# PROFILING_SLOW_REQUEST seconds are kept as well
+PROFILING_DIRECTORY = os.environ.get('PROFILING_DIRECTORY') or None
+PROFILING_INTERVAL = float(os.environ.get('PROFILING_INTERVAL', 0.005))
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+PROFILING_VIEWS = {}
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN') or None
+PROFILING_SLOW_REQUEST = float(os.environ.get('PROFILING_SLOW_REQUEST', 0))
+
+# Seconds the results of the readiness checks (see core.health) are reused,
+# the migrations are checked until they are found applied
+HEALTH_CHECK_TTL = float(os.environ.get('HEALTH_CHECK_TTL', 5))
+
+# Seconds an API token (see accounts.models.AuthToken) is valid, tokens are
+# replaced with accounts/token/rotate/ and their last use is written at most
+# once per AUTH_TOKEN_LAST_USED_INTERVAL seconds
+AUTH_TOKEN_TTL = int(os.environ.get('AUTH_TOKEN_TTL', 7 * 24 * 3600))
+AUTH_TOKEN_LAST_USED_INTERVAL = 300
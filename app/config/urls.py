@@ -1,35 +1,17 @@
-from django.conf.urls import url
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Digify API",
-        default_version='v1',
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
-)
+from core.views import healthz, readyz
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('accounts.urls')),
     path('bank/', include('bank.urls')),
-
-
-    url(r'^swagger(?P<format>\.json|\.yaml)$',
-        schema_view.without_ui(cache_timeout=0),
-        name='schema-json'),
-
-    url(r'^swagger/$',
-        schema_view.with_ui('swagger', cache_timeout=0),
-        name='schema-swagger-ui'),
-
-    url(r'^redoc/$',
-        schema_view.with_ui('redoc', cache_timeout=0),
-        name='schema-redoc'),
-
+    path('healthz', healthz, name='healthz'),
+    path('readyz', readyz, name='readyz'),
 ]
+
+# the API documentation and its drf_yasg views are only loaded when enabled
+if settings.API_DOCS:
+    urlpatterns.append(path('', include('core.urls')))
@@ -0,0 +1,91 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+HEALTH_CACHE_KEY = 'core:health'
+
+_lock = threading.Lock()
+_results = {}  # check name -> (checked_at, error)
+
+
+def check_databases():
+    """Replicas are left out, their reads fall back to the primary"""
+    replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+    for alias in connections:
+        if alias in replicas:
+            continue
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+
+def check_migrations():
+    connection = connections[DEFAULT_DB_ALIAS]
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if plan:
+        raise RuntimeError(f'{len(plan)} migrations are not applied')
+
+
+def check_caches():
+    for alias in settings.CACHES:
+        cache = caches[alias]
+        cache.set(HEALTH_CACHE_KEY, 1, 10)
+        if cache.get(HEALTH_CACHE_KEY) != 1:
+            raise RuntimeError(f'cache {alias} did not keep a value')
+
+
+CHECKS = {
+    'database': check_databases,
+    'migrations': check_migrations,
+    'caches': check_caches,
+}
+
+# the migrations of the running code stay applied once they are
+PASS_ONCE = {'migrations'}
+
+
+def _cached(name, now):
+    checked_at, error = _results.get(name, (None, None))
+    if checked_at is None:
+        return False, None
+    if error is None and name in PASS_ONCE:
+        return True, None
+    return now - checked_at < settings.HEALTH_CHECK_TTL, error
+
+
+def run_check(name):
+    """
+        Error of the check or None, results are kept for HEALTH_CHECK_TTL
+        seconds so frequent probes hit the database and the caches only now
+        and then, and a single thread runs a check at a time
+    """
+    now = time.monotonic()
+    fresh, error = _cached(name, now)
+    if fresh:
+        return error
+
+    with _lock:
+        fresh, error = _cached(name, now)
+        if fresh:
+            return error
+        try:
+            CHECKS[name]()
+        except Exception as exc:
+            error = f'{type(exc).__name__}: {exc}'
+        else:
+            error = None
+        _results[name] = (time.monotonic(), error)
+    return error
+
+
+def readiness():
+    """Error of each check, None for the ones that passed"""
+    return {name: run_check(name) for name in CHECKS}
+
+
+def clear_results():
+    _results.clear()
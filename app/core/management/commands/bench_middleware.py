@@ -0,0 +1,45 @@
+import time
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+
+class Command(BaseCommand):
+    """
+        Django command to measure the time the middleware chain adds to the
+        API requests, the paths are served in process through the WSGI
+        handler with every middleware and with the lean API chain
+    """
+    help = 'Benchmark the middleware overhead of the API requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=['/healthz'])
+        parser.add_argument('--requests', type=int, default=5000)
+
+    def serve(self, path, requests):
+        """Microseconds per request"""
+        handler = WSGIHandler()
+
+        def start_response(status, headers):
+            pass
+
+        for _ in range(2):
+            start = time.perf_counter()
+            for _ in range(requests):
+                environ = {'PATH_INFO': path}
+                setup_testing_defaults(environ)
+                for _ in handler(environ, start_response):
+                    pass
+            seconds = time.perf_counter() - start
+        return seconds / requests * 1e6
+
+    def handle(self, *args, **options):
+        for path in options['paths']:
+            lean = self.serve(path, options['requests'])
+            with override_settings(API_PATH_PREFIXES=()):
+                full = self.serve(path, options['requests'])
+            self.stdout.write(f'{path:<20} full {full:8.1f} us  '
+                              f'lean {lean:8.1f} us  '
+                              f'saved {full - lean:8.1f} us/request')
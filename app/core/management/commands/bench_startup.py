@@ -0,0 +1,76 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# code run by each cold process, urls is the extra cost of the first request
+TARGETS = {
+    'manage': ['manage.py', 'help'],
+    'wsgi': ['-c', 'import config.wsgi'],
+    'asgi': ['-c', 'import config.asgi'],
+    'urls': ['-c', 'import config.wsgi; from django.urls import get_resolver;'
+                   ' get_resolver().url_patterns'],
+}
+
+
+def parse_importtime(output):
+    """
+        Total import time and the self time of each top level package, in
+        microseconds, from the report of python -X importtime
+    """
+    total, packages = 0, Counter()
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|', 2)
+        if not name[1:].startswith(' '):
+            total += int(cumulative)
+        packages[name.strip().split('.')[0]] += int(own)
+    return total, packages
+
+
+class Command(BaseCommand):
+    """
+        Django command to benchmark the cold start of manage.py and of the
+        WSGI and ASGI applications. Each target runs in new interpreters with
+        -X importtime, the median of the runs is reported with the packages
+        taking the most time to import
+    """
+    help = 'Benchmark the import time of the processes of the project'
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*',
+                            help=f'any of {", ".join(TARGETS)}, all of them '
+                                 f'by default')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--top', type=int, default=10)
+
+    def run(self, target):
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime'] + TARGETS[target],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1'))
+        seconds = time.perf_counter() - start
+        if process.returncode:
+            raise CommandError(f'{target} failed:\n{process.stderr[-2000:]}')
+        return seconds, parse_importtime(process.stderr)
+
+    def handle(self, *args, **options):
+        targets = options['targets'] or list(TARGETS)
+        unknown = set(targets) - set(TARGETS)
+        if unknown:
+            raise CommandError(f'Unknown targets: {", ".join(unknown)}')
+        for target in targets:
+            runs = [self.run(target) for _ in range(options['repeat'])]
+            wall = statistics.median(seconds for seconds, _ in runs)
+            imports = statistics.median(total for _, (total, _) in runs)
+            self.stdout.write(f'{target:<8} {wall * 1000:8.1f} ms total '
+                              f'{imports / 1000:8.1f} ms imports')
+            for package, own in runs[-1][1][1].most_common(options['top']):
+                self.stdout.write(f'    {package:<28} {own / 1000:8.1f} ms')
@@ -0,0 +1,49 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import read_profiles
+
+
+class Command(BaseCommand):
+    """
+        Django command to sum the samples of the stored request profiles into
+        collapsed stacks, one "frame;frame;frame count" line per stack, which
+        flamegraph.pl and speedscope read
+    """
+    help = 'Aggregate the request profiles into collapsed stacks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory',
+                            default=settings.PROFILING_DIRECTORY)
+        parser.add_argument('--view', action='append',
+                            help='only the profiles of this url name')
+        parser.add_argument('--by-view', action='store_true',
+                            help='root the stacks at the url name')
+        parser.add_argument('--output', help='file written instead of stdout')
+
+    def handle(self, *args, **options):
+        if not options['directory']:
+            raise CommandError('No profiles directory, set '
+                               'PROFILING_DIRECTORY or use --directory')
+        stacks, profiles = Counter(), 0
+        for profile in read_profiles(options['directory']):
+            view = profile.get('view') or 'unresolved'
+            if options['view'] and view not in options['view']:
+                continue
+            profiles += 1
+            for stack, count in profile['samples']:
+                if options['by_view']:
+                    stack = f'{view};{stack}'
+                stacks[stack] += count
+
+        lines = [f'{stack} {count}\n'
+                 for stack, count in sorted(stacks.items())]
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.writelines(lines)
+            self.stderr.write(f'{profiles} profiles collapsed into '
+                              f'{options["output"]}')
+        else:
+            self.stdout.write(''.join(lines), ending='')
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import schema
+
+
+class Command(BaseCommand):
+    """Django command to generate the API schema file"""
+    help = 'Generate the OpenAPI schema served by the swagger endpoints'
+
+    def handle(self, *args, **options):
+        fingerprint = schema.urlconf_fingerprint()
+        schema.write_schema(schema.generate_schema(fingerprint))
+        self.stdout.write(self.style.SUCCESS(
+            f'Schema written to {settings.API_SCHEMA_FILE}'))
@@ -2,19 +2,48 @@ import time
 
 from django.db import connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
-    """Django command to wait until database is available"""
+    """
+        Django command to wait until the databases accept connections. A
+        connection is opened on each try, failed tries are retried after a
+        delay doubling up to --max-interval until the --timeout deadline
+    """
+    help = 'Wait until the databases are available'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', action='append', dest='databases',
+                            help='alias to wait for, all of them by default')
+        parser.add_argument('--timeout', type=float, default=60)
+        parser.add_argument('--interval', type=float, default=0.1)
+        parser.add_argument('--max-interval', type=float, default=5)
+
+    def connect(self, alias):
+        connection = connections[alias]
+        try:
+            connection.ensure_connection()
+        finally:
+            connection.close()
 
     def handle(self, *args, **options):
-        self.stdout.write('waiting for database.....')
-        db_conn = None
-        while not db_conn:
-            try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('database not connected, wait 1 second...')
-                time.sleep(100)
+        deadline = time.monotonic() + options['timeout']
+        for alias in options['databases'] or list(connections):
+            self.stdout.write(f'waiting for database {alias}.....')
+            delay = options['interval']
+            while True:
+                try:
+                    self.connect(alias)
+                    break
+                except OperationalError as error:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise CommandError(
+                            f'database {alias} is not available: {error}')
+                    delay = min(delay, options['max_interval'], remaining)
+                    self.stdout.write(f'database {alias} not connected, '
+                                      f'retrying in {delay:.1f} seconds...')
+                    time.sleep(delay)
+                    delay *= 2
         self.stdout.write(self.style.SUCCESS('Database is available!'))
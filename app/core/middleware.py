@@ -0,0 +1,131 @@
+import hmac
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import middleware as auth
+from django.contrib.messages import middleware as messages
+from django.contrib.sessions import middleware as sessions
+from django.core.exceptions import MiddlewareNotUsed
+from django.middleware import csrf
+from django.urls import resolve, Resolver404
+
+from . import profiling
+from .routers import use_primary
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def is_api_request(request):
+    return request.path_info.startswith(settings.API_PATH_PREFIXES)
+
+
+class BrowserOnlyMixin:
+    """
+        Mixin for middleware only browsers need, the token authenticated API
+        requests (see API_PATH_PREFIXES) are passed on untouched
+    """
+
+    def __call__(self, request):
+        if is_api_request(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionMiddleware(BrowserOnlyMixin, sessions.SessionMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(BrowserOnlyMixin, csrf.CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if is_api_request(request):
+            return None
+        return super().process_view(request, callback, callback_args,
+                                    callback_kwargs)
+
+
+class AuthenticationMiddleware(BrowserOnlyMixin,
+                               auth.AuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(BrowserOnlyMixin, messages.MessageMiddleware):
+    pass
+
+
+class PrimaryPinningMiddleware:
+    """
+        Middleware to send all queries of unsafe requests (POST, PUT, PATCH,
+        DELETE) to the primary database, rows that are read to be written
+        back must never come from a replica
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method in SAFE_METHODS:
+            return self.get_response(request)
+        with use_primary():
+            return self.get_response(request)
+
+
+class ProfilingMiddleware:
+    """
+        Middleware to profile a sample of the requests with the sampling
+        profiler, it is only loaded when PROFILING_DIRECTORY is set. A
+        request is profiled by PROFILING_SAMPLE_RATE, by the rate of its url
+        name in PROFILING_VIEWS or when its X-Profile-Token header is
+        PROFILING_TOKEN. With PROFILING_SLOW_REQUEST every request is sampled
+        and the ones slower than it are kept too
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_DIRECTORY:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def view_rate(self, request):
+        if not settings.PROFILING_VIEWS:
+            return 0
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return 0
+        return settings.PROFILING_VIEWS.get(match.view_name, 0)
+
+    def selected(self, request):
+        token = request.headers.get('X-Profile-Token')
+        if token and settings.PROFILING_TOKEN and \
+                hmac.compare_digest(token, settings.PROFILING_TOKEN):
+            return True
+        rate = max(settings.PROFILING_SAMPLE_RATE, self.view_rate(request))
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        selected = self.selected(request)
+        slow_request = settings.PROFILING_SLOW_REQUEST
+        if not selected and not slow_request:
+            return self.get_response(request)
+
+        sampler, thread_id = profiling.get_sampler(), threading.get_ident()
+        stats = profiling.QueryStats()
+        start = time.perf_counter()
+        sampler.start(thread_id)
+        try:
+            with stats.installed():
+                response = self.get_response(request)
+        finally:
+            stacks = sampler.stop(thread_id)
+        duration = time.perf_counter() - start
+
+        if selected or duration >= slow_request:
+            match = request.resolver_match
+            profiling.save_profile(
+                settings.PROFILING_DIRECTORY, stacks,
+                view=match.view_name if match else None,
+                method=request.method, path=request.path,
+                status=response.status_code, duration=duration,
+                queries=stats.count, query_time=stats.time)
+        return response
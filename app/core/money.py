@@ -0,0 +1,269 @@
+import sqlite3
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django import forms
+from django.core import exceptions
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+try:
+    from psycopg2.extensions import AsIs, register_adapter
+except ImportError:  # pragma: no cover
+    register_adapter = None
+
+DEFAULT_CURRENCY = 'IRR'
+DECIMAL_PLACES = 2
+MINOR_UNITS = 10 ** DECIMAL_PLACES
+# largest amount a BIGINT column of minor units holds, in major units
+MAX_AMOUNT = Decimal((2 ** 63 - 1) // MINOR_UNITS)
+
+
+def _round(value):
+    return int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+class Money:
+    """
+        Amount of money kept as an integer number of minor units, so adding
+        and comparing amounts is integer arithmetic. Plain numbers are read
+        as major units: Money(1050) == Decimal('10.50') == 10.5
+    """
+    __slots__ = ('minor',)
+
+    def __init__(self, minor):
+        self.minor = minor
+
+    @classmethod
+    def of(cls, value):
+        """Money of an amount in major units, Money is returned as it is"""
+        if isinstance(value, Money):
+            return value
+        if isinstance(value, int):
+            return cls(value * MINOR_UNITS)
+        if type(value) is Decimal:
+            scaled = value * MINOR_UNITS
+            minor = int(scaled)
+            if minor == scaled:
+                return cls(minor)
+            return cls(_round(scaled))
+        if isinstance(value, float):
+            value = repr(value)
+        return cls(_round(Decimal(value).scaleb(DECIMAL_PLACES)))
+
+    @classmethod
+    def sum(cls, amounts):
+        """Total of amounts of Money, added up as ints"""
+        return cls(sum(amount.minor for amount in amounts))
+
+    @property
+    def decimal(self):
+        return Decimal(self.minor).scaleb(-DECIMAL_PLACES)
+
+    @staticmethod
+    def _minor(other):
+        if type(other) is Money:
+            return other.minor
+        if isinstance(other, int):
+            return other * MINOR_UNITS
+        if isinstance(other, (Decimal, float)):
+            return Money.of(other).minor
+        return None
+
+    def __add__(self, other):
+        # exact types first, they are most of the operands
+        if type(other) is Money:
+            return Money(self.minor + other.minor)
+        if type(other) is int:
+            return Money(self.minor + other * MINOR_UNITS)
+        minor = self._minor(other)
+        if minor is None:
+            return NotImplemented
+        return Money(self.minor + minor)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        # exact types first, they are most of the operands
+        if type(other) is Money:
+            return Money(self.minor - other.minor)
+        if type(other) is int:
+            return Money(self.minor - other * MINOR_UNITS)
+        minor = self._minor(other)
+        if minor is None:
+            return NotImplemented
+        return Money(self.minor - minor)
+
+    def __rsub__(self, other):
+        minor = self._minor(other)
+        if minor is None:
+            return NotImplemented
+        return Money(minor - self.minor)
+
+    def __mul__(self, factor):
+        if isinstance(factor, int):
+            return Money(self.minor * factor)
+        if isinstance(factor, (Decimal, float)):
+            return Money(_round(self.minor * Decimal(factor)))
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Money(-self.minor)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return Money(abs(self.minor))
+
+    def __bool__(self):
+        return self.minor != 0
+
+    def __eq__(self, other):
+        if type(other) is Money:
+            return self.minor == other.minor
+        if type(other) is int:
+            return self.minor == other * MINOR_UNITS
+        minor = self._minor(other)
+        if minor is None:
+            return NotImplemented
+        return self.minor == minor
+
+    def __lt__(self, other):
+        if type(other) is Money:
+            return self.minor < other.minor
+        if type(other) is int:
+            return self.minor < other * MINOR_UNITS
+        minor = self._minor(other)
+        if minor is None:
+            return NotImplemented
+        return self.minor < minor
+
+    def __le__(self, other):
+        if type(other) is Money:
+            return self.minor <= other.minor
+        if type(other) is int:
+            return self.minor <= other * MINOR_UNITS
+        minor = self._minor(other)
+        if minor is None:
+            return NotImplemented
+        return self.minor <= minor
+
+    def __gt__(self, other):
+        if type(other) is Money:
+            return self.minor > other.minor
+        if type(other) is int:
+            return self.minor > other * MINOR_UNITS
+        minor = self._minor(other)
+        if minor is None:
+            return NotImplemented
+        return self.minor > minor
+
+    def __ge__(self, other):
+        if type(other) is Money:
+            return self.minor >= other.minor
+        if type(other) is int:
+            return self.minor >= other * MINOR_UNITS
+        minor = self._minor(other)
+        if minor is None:
+            return NotImplemented
+        return self.minor >= minor
+
+    def __hash__(self):
+        # equal to the hash of the same amount as an int or a Decimal
+        major, cents = divmod(self.minor, MINOR_UNITS)
+        return hash(major) if not cents else hash(self.decimal)
+
+    def __float__(self):
+        return self.minor / MINOR_UNITS
+
+    def __str__(self):
+        major, cents = divmod(abs(self.minor), MINOR_UNITS)
+        sign = '-' if self.minor < 0 else ''
+        return f'{sign}{major}.{cents:0{DECIMAL_PLACES}d}'
+
+    def __repr__(self):
+        return f"Money('{self}')"
+
+    def __format__(self, format_spec):
+        if not format_spec:
+            return str(self)
+        return format(self.decimal, format_spec)
+
+    def __reduce__(self):
+        return Money, (self.minor,)
+
+
+# amounts in raw query parameters, e.g. F('balance') + amount
+sqlite3.register_adapter(Money, lambda money: money.minor)
+if register_adapter is not None:
+    register_adapter(Money, lambda money: AsIs(money.minor))
+
+
+class MoneyAttribute(DeferredAttribute):
+    """
+        Turn the values set on the model field into Money. Having __set__
+        makes every read of the field go through __get__, so a loaded value
+        is returned without the deferred field checks
+    """
+
+    def __init__(self, field):
+        super().__init__(field)
+        self.attname = field.attname
+
+    def __get__(self, instance, cls=None):
+        try:
+            return instance.__dict__[self.attname]
+        except (AttributeError, KeyError):
+            return super().__get__(instance, cls)
+
+    def __set__(self, instance, value):
+        if type(value) is not Money:
+            value = self.field.to_python(value)
+        instance.__dict__[self.attname] = value
+
+
+class MoneyField(models.BigIntegerField):
+    """
+        Amount of money stored as a BIGINT of minor units, the value on the
+        model is always Money or None. Numbers assigned to the field are
+        read as major units
+    """
+    descriptor_class = MoneyAttribute
+    description = 'Amount of money in minor units'
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Money):
+            return value
+        try:
+            return Money.of(value)
+        except (InvalidOperation, TypeError, ValueError):
+            raise exceptions.ValidationError(
+                self.error_messages['invalid'],
+                code='invalid',
+                params={'value': value},
+            )
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return Money(int(value))
+
+    def get_prep_value(self, value):
+        if type(value) is Money:
+            return value.minor
+        if value is None:
+            return value
+        return self.to_python(value).minor
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        return '' if value is None else str(value)
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(self, **{
+            'form_class': forms.DecimalField,
+            'decimal_places': DECIMAL_PLACES,
+            **kwargs,
+        })
@@ -0,0 +1,58 @@
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimated_count(queryset):
+    """
+        Number of rows of the queryset as estimated by the PostgreSQL
+        planner, None on other databases or when there are no statistics
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute('SELECT reltuples FROM pg_class '
+                           'WHERE oid = %s::regclass',
+                           [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+            estimate = row[0] if row else None
+        else:
+            sql, params = queryset.query.get_compiler(
+                using=queryset.db).as_sql()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = plan[0]['Plan']['Plan Rows']
+
+    # reltuples is -1 (0 before PostgreSQL 14) for tables which were never
+    # analyzed, an empty table reads as no statistics too
+    if estimate is None or estimate <= 0:
+        return None
+    return int(estimate)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+        Paginator that doesn't scan big tables with COUNT(*). The rows are
+        counted up to exact_count_limit + 1 first, so small tables cost the
+        one query they always did, past that the planner estimate is used
+    """
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        probe = self.object_list[:self.exact_count_limit + 1].count()
+        if probe <= self.exact_count_limit:
+            return probe
+        estimate = estimated_count(self.object_list)
+        if estimate is None or estimate < self.exact_count_limit:
+            return super().count
+        return estimate
@@ -0,0 +1,22 @@
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from .renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(parsers.JSONParser):
+    """
+        JSON parser built on orjson, it falls back to the default parser
+        when orjson is not installed. Numbers with a fraction are parsed as
+        floats, DecimalField turns them back into the exact Decimal for
+        values of up to 15 significant digits
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,140 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections
+
+
+def stack_of(frame):
+    """Code objects of the stack of the frame, from the outermost one"""
+    codes = []
+    while frame is not None:
+        codes.append(frame.f_code)
+        frame = frame.f_back
+    return tuple(reversed(codes))
+
+
+@lru_cache(maxsize=4096)
+def frame_label(code):
+    """Name of a frame in the collapsed stacks, it never has a semicolon"""
+    filename = code.co_filename
+    for path in sorted(sys.path, key=len, reverse=True):
+        if path and filename.startswith(path + os.sep):
+            filename = filename[len(path) + 1:]
+            break
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})' \
+        .replace(';', ':')
+
+
+class Sampler:
+    """
+        Thread taking the stack of the registered threads every interval
+        seconds. sys._current_frames() reads the frames without stopping
+        the threads, so a profiled request only pays for the GIL the sampler
+        takes, and the sampler sleeps while no thread is registered
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.active = threading.Event()
+        self.stacks = {}
+        self.thread = None
+
+    def start(self, thread_id):
+        with self.lock:
+            self.stacks[thread_id] = Counter()
+            self.active.set()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run,
+                                               name='profiling-sampler',
+                                               daemon=True)
+                self.thread.start()
+
+    def stop(self, thread_id):
+        """Stop sampling the thread and return the count of its stacks"""
+        with self.lock:
+            return self.stacks.pop(thread_id, Counter())
+
+    def run(self):
+        while True:
+            self.active.wait()
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.stacks:
+                    self.active.clear()
+                    continue
+                frames = sys._current_frames()
+                for thread_id, counter in self.stacks.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        counter[stack_of(frame)] += 1
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = Sampler(settings.PROFILING_INTERVAL)
+    return _sampler
+
+
+class QueryStats:
+    """Number and duration of the queries run while it is installed"""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += time.perf_counter() - start
+
+    @contextmanager
+    def installed(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+
+def save_profile(directory, stacks, **info):
+    """
+        Write the profile of a request as JSON, the stacks are stored as
+        collapsed stacks with their number of samples
+    """
+    os.makedirs(directory, exist_ok=True)
+    view = info.get('view') or 'unresolved'
+    name = f'{time.time():.6f}-{os.getpid()}-{threading.get_ident()}-' \
+           f'{view.replace(os.sep, "_").replace(":", "_")}.json'
+    samples = Counter()
+    for stack, count in stacks.items():
+        samples[';'.join(frame_label(code) for code in stack)] += count
+    profile = dict(info, interval=settings.PROFILING_INTERVAL,
+                   samples=sorted(samples.items()))
+    path = os.path.join(directory, name)
+    with open(path, 'w') as file:
+        json.dump(profile, file)
+    return path
+
+
+def read_profiles(directory):
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.json'):
+            with open(os.path.join(directory, name)) as file:
+                yield json.load(file)
@@ -0,0 +1,62 @@
+import decimal
+
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+from .money import Money
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_encoder = encoders.JSONEncoder()
+
+
+def _default(obj):
+    """Types orjson does not know, Decimals are kept exact as strings"""
+    if isinstance(obj, (decimal.Decimal, Money)):
+        return str(obj)
+    return _encoder.default(obj)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+        JSON renderer built on orjson, it falls back to the default renderer
+        when orjson is not installed. Pretty printing always uses an indent
+        of 2
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        # dates go through the DRF encoder to keep its format
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+        ret = orjson.dumps(data, default=_default, option=option)
+
+        # escape U+2028 and U+2029 like the default renderer does
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028') \
+                .replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class EventStreamRenderer(renderers.BaseRenderer):
+    """
+        Renderer accepting text/event-stream requests, streams are returned
+        as they are and other responses (errors) are sent as an error event
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return b'event: error\ndata: ' + \
+            FastJSONRenderer().render(data) + b'\n\n'
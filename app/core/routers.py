@@ -0,0 +1,123 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import DatabaseError
+
+_local = threading.local()
+
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM
+                      now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+@contextmanager
+def use_primary():
+    """Send every read made inside the block to the primary database"""
+    previous = getattr(_local, 'pinned', False)
+    _local.pinned = True
+    try:
+        yield
+    finally:
+        _local.pinned = previous
+
+
+def is_pinned_to_primary(using=DEFAULT_DB_ALIAS):
+    """
+        Return True when reads of the current thread must hit the primary
+        ``using`` rather than its replicas, inside ``use_primary`` or a
+        transaction on that database
+    """
+    return getattr(_local, 'pinned', False) or \
+        connections[using].in_atomic_block
+
+
+class PrimaryReplicaRouter:
+    """
+        Database router that sends reads to healthy replicas and writes to
+        the primary. Reads made inside ``transaction.atomic`` or
+        ``use_primary`` stay on the primary, so the money movements in
+        ``bank.utils`` never see replicated (possibly stale) rows.
+    """
+
+    def __init__(self):
+        self._health = {}  # alias -> (checked_at, healthy)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def replicas():
+        return getattr(settings, 'DATABASE_REPLICAS', [])
+
+    @staticmethod
+    def replica_lag(alias):
+        """Return the replication lag of the replica in seconds"""
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            return 0.0
+        with connection.cursor() as cursor:
+            cursor.execute(REPLICA_LAG_SQL)
+            return float(cursor.fetchone()[0])
+
+    def is_healthy(self, alias):
+        """
+            Check whether the replica is reachable and not lagging behind,
+            the result is cached for REPLICA_LAG_CHECK_INTERVAL seconds
+        """
+        now = time.monotonic()
+        interval = getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 1.0)
+        checked_at, healthy = self._health.get(alias, (None, False))
+        if checked_at is not None and now - checked_at < interval:
+            return healthy
+
+        try:
+            lag = self.replica_lag(alias)
+        except DatabaseError:
+            healthy = False
+        else:
+            healthy = lag <= getattr(settings, 'REPLICA_MAX_LAG', 5.0)
+
+        with self._lock:
+            self._health[alias] = (now, healthy)
+        return healthy
+
+    def db_for_read(self, model, **hints):
+        # the replicas follow the default database, the bank shards have
+        # none so their reads stay on them anyway
+        if is_pinned_to_primary(DEFAULT_DB_ALIAS):
+            return DEFAULT_DB_ALIAS
+
+        instance = hints.get('instance')
+        if instance is not None and \
+                instance._state.db in (DEFAULT_DB_ALIAS, *self.replicas()):
+            return instance._state.db
+
+        candidates = [alias for alias in self.replicas()
+                      if self.is_healthy(alias)]
+        if candidates:
+            return random.choice(candidates)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db and \
+                instance._state.db not in self.replicas():
+            return instance._state.db
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *self.replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in self.replicas():
+            return False
+        return None
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.urls import get_resolver, URLPattern
+
+# drf_yasg is imported by the functions using it, serving the saved schema
+# as JSON does not load it
+
+FINGERPRINT_KEY = 'x-urlconf-fingerprint'
+
+_lock = threading.Lock()
+_cache = {}
+
+
+def _describe(patterns, prefix=''):
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLPattern):
+            callback = pattern.callback
+            yield f'{route} {callback.__module__}.{callback.__qualname__}'
+        else:
+            yield from _describe(pattern.url_patterns, route)
+
+
+def urlconf_fingerprint():
+    """Hash of all url routes and their views, it changes with the URLconf"""
+    routes = '\n'.join(sorted(_describe(get_resolver().url_patterns)))
+    return hashlib.sha256(routes.encode()).hexdigest()
+
+
+def api_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Digify API",
+        default_version='v1',
+    )
+
+
+def generate_schema(fingerprint):
+    """Introspect all views and return the schema as a dict"""
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    generator = OpenAPISchemaGenerator(api_info())
+    schema = generator.get_schema(request=None, public=True)
+    schema = json.loads(OpenAPICodecJson(validators=[]).encode(schema))
+    schema[FINGERPRINT_KEY] = fingerprint
+    return schema
+
+
+def _load(fingerprint):
+    """Read the schema file unless it was made for another URLconf"""
+    try:
+        with open(settings.API_SCHEMA_FILE) as schema_file:
+            schema = json.load(schema_file)
+    except (OSError, ValueError):
+        return None
+    if schema.get(FINGERPRINT_KEY) != fingerprint:
+        return None
+    return schema
+
+
+def write_schema(schema):
+    with open(settings.API_SCHEMA_FILE, 'w') as schema_file:
+        json.dump(schema, schema_file)
+
+
+def get_schema(fmt='.json'):
+    """
+        Return the encoded schema and its ETag, the schema is taken from
+        API_SCHEMA_FILE and generated (then saved) only when the file is
+        missing or was made for another URLconf
+    """
+    if fmt not in _cache:
+        with _lock:
+            if 'schema' not in _cache:
+                fingerprint = urlconf_fingerprint()
+                schema = _load(fingerprint)
+                if schema is None:
+                    schema = generate_schema(fingerprint)
+                    try:
+                        write_schema(schema)
+                    except OSError:
+                        pass  # serve from memory on a read only disk
+                _cache['schema'] = schema
+
+            if fmt == '.yaml':
+                from drf_yasg.codecs import yaml_sane_dump
+                content = yaml_sane_dump(_cache['schema'], binary=True)
+            else:
+                content = json.dumps(_cache['schema']).encode()
+            _cache[fmt] = (content, hashlib.sha256(content).hexdigest()[:32])
+    return _cache[fmt]
+
+
+def clear_cache():
+    _cache.clear()
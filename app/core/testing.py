@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+        Test runner adding two SQLite shards when no shard is configured and
+        a mirror of the default database when no replica is, they are listed
+        in the TEST_DATABASE_SHARDS and TEST_DATABASE_REPLICAS settings. The
+        sharding and replica tests turn them on with override_settings and
+        every other test keeps the plain routing
+    """
+    shards = ('test_shard_0', 'test_shard_1')
+    replica = 'test_replica'
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.add_replica()
+        self.add_shards()
+
+    def add_replica(self):
+        settings.TEST_DATABASE_REPLICAS = list(settings.DATABASE_REPLICAS)
+        if settings.TEST_DATABASE_REPLICAS:
+            return
+        # a second connection to the test database of the primary
+        connections.settings[self.replica] = dict(
+            connections.settings[DEFAULT_DB_ALIAS],
+            TEST={'MIRROR': DEFAULT_DB_ALIAS})
+        settings.TEST_DATABASE_REPLICAS.append(self.replica)
+
+    def add_shards(self):
+        settings.TEST_DATABASE_SHARDS = list(settings.DATABASE_SHARDS)
+        if settings.TEST_DATABASE_SHARDS:
+            return
+        for alias in self.shards:
+            name = os.path.join(tempfile.gettempdir(), f'{alias}.sqlite3')
+            # the connection handler reads the aliases from this dict
+            connections.settings[alias] = {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': name,
+                'TEST': {'NAME': os.path.join(tempfile.gettempdir(),
+                                              f'test_{alias}.sqlite3')},
+            }
+            settings.TEST_DATABASE_SHARDS.append(alias)
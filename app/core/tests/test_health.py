@@ -0,0 +1,67 @@
+import io
+from unittest import mock
+
+from django.core.management import call_command, CommandError
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase, TestCase
+
+from .. import health
+from ..management.commands.wait_for_db import Command as WaitForDb
+
+
+@mock.patch('core.management.commands.wait_for_db.time.sleep')
+class TestWaitForDb(SimpleTestCase):
+    def test_retries_with_backoff(self, sleep):
+        """Test that failed connections are retried with growing delays"""
+        with mock.patch.object(WaitForDb, 'connect',
+                               side_effect=[OperationalError] * 3 + [None]):
+            call_command('wait_for_db', database=['default'],
+                         stdout=io.StringIO())
+        self.assertEqual([call.args[0] for call in sleep.call_args_list],
+                         [0.1, 0.2, 0.4])
+
+    def test_gives_up_at_deadline(self, sleep):
+        """Test that the command fails once the timeout is over"""
+        with mock.patch.object(WaitForDb, 'connect',
+                               side_effect=OperationalError('down')):
+            with self.assertRaisesMessage(CommandError, 'down'):
+                call_command('wait_for_db', database=['default'], timeout=0,
+                             stdout=io.StringIO())
+        sleep.assert_not_called()
+
+
+class TestProbes(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        health.clear_results()
+        self.addCleanup(health.clear_results)
+
+    def test_healthz(self):
+        """Test that the liveness probe runs no check"""
+        with mock.patch.object(health, 'readiness') as readiness:
+            response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, 200)
+        readiness.assert_not_called()
+
+    def test_readyz(self):
+        """Test that the readiness probe passes with all checks"""
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['checks'], {
+            'database': 'ok', 'migrations': 'ok', 'caches': 'ok'})
+
+    def test_results_are_cached(self):
+        """Test that a failing check is reported and reused until it expires"""
+        check = mock.Mock(side_effect=OperationalError('down'))
+        with mock.patch.dict(health.CHECKS, database=check):
+            for _ in range(3):
+                response = self.client.get('/readyz')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(check.call_count, 1)
+
+            with self.settings(HEALTH_CHECK_TTL=0):
+                check.side_effect = None
+                response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(check.call_count, 2)
@@ -0,0 +1,49 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+from ..middleware import SessionMiddleware, AuthenticationMiddleware, \
+    MessageMiddleware, CsrfViewMiddleware
+
+BROWSER_MIDDLEWARE = (SessionMiddleware, AuthenticationMiddleware,
+                      MessageMiddleware)
+
+
+class TestBrowserOnlyMiddleware(SimpleTestCase):
+    def serve(self, path):
+        def view(request):
+            return HttpResponse()
+
+        handler = view
+        for middleware in reversed(BROWSER_MIDDLEWARE):
+            handler = middleware(handler)
+        request = RequestFactory().post(path)
+        return request, handler(request)
+
+    def test_api_requests_skip(self):
+        """Test that API requests get no session, user or messages"""
+        request, _ = self.serve('/bank/deposit/1/')
+        for attribute in ('session', 'user', '_messages'):
+            self.assertFalse(hasattr(request, attribute))
+
+    def test_other_requests_go_through(self):
+        """Test that the other requests keep the browser middleware"""
+        request, _ = self.serve('/admin/login/')
+        for attribute in ('session', 'user', '_messages'):
+            self.assertTrue(hasattr(request, attribute))
+
+    def test_csrf_is_not_checked_for_api(self):
+        """Test that unsafe API requests are not rejected by CSRF"""
+        middleware = CsrfViewMiddleware(lambda request: HttpResponse())
+        request = RequestFactory().post('/bank/deposit/1/')
+        self.assertIsNone(middleware.process_view(request, None, (), {}))
+        request = RequestFactory().post('/admin/login/')
+        self.assertEqual(middleware.process_view(
+            request, None, (), {}).status_code, 403)
+
+
+class TestAdminChain(TestCase):
+    def test_admin_login_page(self):
+        """Test that the admin still gets its CSRF cookie"""
+        response = self.client.get('/admin/login/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('csrftoken', response.cookies)
@@ -0,0 +1,81 @@
+import pickle
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase
+
+from bank.models import Account
+from bank.serializers import MoneyField
+from bank.tests.test_models import sample_user, sample_branch
+from core.money import Money
+
+
+class TestMoney(SimpleTestCase):
+    def test_numbers_are_major_units(self):
+        """Test that plain numbers are read as major units"""
+        self.assertEqual(Money.of(10).minor, 1000)
+        self.assertEqual(Money.of('10.50').minor, 1050)
+        self.assertEqual(Money.of(0.1).minor, 10)
+        self.assertEqual(Money.of(Decimal('0.005')).minor, 1)
+        self.assertEqual(Money.of(Decimal('-0.005')).minor, -1)
+        self.assertEqual(Money.of(Decimal('12.34')).minor, 1234)
+
+    def test_arithmetic_and_comparison(self):
+        """Test that Money adds up and compares with plain numbers"""
+        amount = Money.of('10.50')
+        self.assertEqual(amount + 1, Money(1150))
+        self.assertEqual(20 - amount, Decimal('9.50'))
+        self.assertEqual(amount * 2, 21)
+        self.assertEqual(Money.sum([amount, amount, Money(1)]), Money(2101))
+        self.assertTrue(amount > 10)
+        self.assertTrue(amount <= Decimal('10.50'))
+        self.assertEqual(amount - True, Money(950))
+        self.assertFalse(amount == ' 10.50')
+        self.assertEqual(hash(Money.of(3)), hash(3))
+        self.assertEqual(hash(amount), hash(Decimal('10.50')))
+
+    def test_format(self):
+        """Test that Money is shown with the decimal places"""
+        self.assertEqual(str(Money(-5)), '-0.05')
+        self.assertEqual(str(Money.of(500)), '500.00')
+        self.assertEqual(f'{Money(123456):,.1f}', '1,234.6')
+        self.assertEqual(pickle.loads(pickle.dumps(Money(7))), Money(7))
+
+
+class TestMoneyField(TestCase):
+    def setUp(self):
+        self.account = Account.objects.create(
+            user=sample_user('owner@gmail.com'), branch=sample_branch(),
+            number=1111111111111111, balance='12.34')
+
+    def test_stored_as_minor_units(self):
+        """Test that the column holds an integer number of minor units"""
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT balance FROM bank_account')
+            self.assertEqual(cursor.fetchone()[0], 1234)
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Money(1234))
+        self.assertTrue(Account.objects.filter(balance=Decimal('12.34'))
+                        .exists())
+
+    def test_deferred(self):
+        """Test that a deferred amount is loaded when it is read"""
+        account = Account.objects.defer('balance').get()
+        with self.assertNumQueries(1):
+            self.assertEqual(account.balance, Money(1234))
+        account.balance = 1
+        self.assertEqual(account.balance, Money(100))
+
+    def test_expressions(self):
+        """Test that amounts can be added to the column in the database"""
+        Account.objects.update(balance=F('balance') + Money.of(1))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('13.34'))
+
+    def test_serializer(self):
+        """Test that the API shows and reads amounts in major units"""
+        field = MoneyField()
+        self.assertEqual(field.to_representation(Money.of(500)), '500.00')
+        self.assertEqual(field.to_internal_value('0.10'), Money(10))
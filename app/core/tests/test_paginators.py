@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core.paginators import EstimatedCountPaginator, estimated_count
+
+
+class TestEstimatedCountPaginator(TestCase):
+    def setUp(self):
+        for number in range(3):
+            get_user_model().objects.create_user(
+                email=f'user{number}@gmail.com', password='test1234')
+
+    def test_exact_count_without_statistics(self):
+        """Test that the exact count is used when there is no estimate"""
+        users = get_user_model().objects.order_by('id')
+        self.assertIsNone(estimated_count(users))
+
+        paginator = EstimatedCountPaginator(users, 2)
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(paginator.num_pages, 2)
+
+    def test_small_tables_are_counted_once(self):
+        """Test that a count under the limit takes a single query"""
+        paginator = EstimatedCountPaginator(
+            get_user_model().objects.order_by('id'), 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 3)
+
+    def test_count_past_the_limit(self):
+        """Test that the rows are counted when the estimate is missing"""
+        paginator = EstimatedCountPaginator(
+            get_user_model().objects.order_by('id'), 2)
+        paginator.exact_count_limit = 2
+        self.assertEqual(paginator.count, 3)
+
+    def test_lists_are_counted(self):
+        """Test that plain lists are paginated as usual"""
+        self.assertEqual(EstimatedCountPaginator([1, 2, 3], 2).count, 3)
@@ -0,0 +1,106 @@
+import io
+import os
+import tempfile
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..profiling import Sampler, read_profiles, save_profile
+
+ME_URL = reverse('user:me')
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestSampler(SimpleTestCase):
+    def test_samples_registered_thread(self):
+        """Test that the stacks of the running function are counted"""
+        sampler = Sampler(0.001)
+        sampler.start(threading.get_ident())
+        busy(0.05)
+        stacks = sampler.stop(threading.get_ident())
+
+        self.assertTrue(stacks)
+        self.assertTrue(all(stack[-1] is busy.__code__ or
+                            busy.__code__ in stack for stack in stacks))
+        self.assertEqual(sampler.stop(threading.get_ident()), {})
+
+
+class TestProfilingMiddleware(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            email='test@gmail.com', password='test1234'))
+
+    def profiles(self):
+        return list(read_profiles(self.directory))
+
+    def test_view_rate(self):
+        """Test that the requests of a view in PROFILING_VIEWS are kept"""
+        with override_settings(PROFILING_DIRECTORY=self.directory,
+                               PROFILING_VIEWS={'user:me': 1}):
+            self.client.patch(ME_URL, {'name': 'new name'})
+
+        profile, = self.profiles()
+        self.assertEqual(profile['view'], 'user:me')
+        self.assertEqual((profile['method'], profile['status']),
+                         ('PATCH', 200))
+        self.assertGreater(profile['queries'], 0)
+        self.assertIn('samples', profile)
+
+    def test_token_header(self):
+        """Test that a request with the profiling token is kept"""
+        with override_settings(PROFILING_DIRECTORY=self.directory,
+                               PROFILING_TOKEN='secret'):
+            self.client.get(ME_URL, HTTP_X_PROFILE_TOKEN='wrong')
+            self.assertEqual(self.profiles(), [])
+            self.client.get(ME_URL, HTTP_X_PROFILE_TOKEN='secret')
+
+        self.assertEqual(len(self.profiles()), 1)
+
+    def test_unselected_requests(self):
+        """Test that nothing is written for requests not sampled"""
+        with override_settings(PROFILING_DIRECTORY=self.directory):
+            self.client.get(ME_URL)
+        self.client.get(ME_URL)
+        self.assertEqual(self.profiles(), [])
+
+    def test_slow_requests(self):
+        """Test that requests slower than the threshold are kept"""
+        with override_settings(PROFILING_DIRECTORY=self.directory,
+                               PROFILING_SLOW_REQUEST=1e-9):
+            self.client.get(ME_URL)
+        self.assertEqual(len(self.profiles()), 1)
+
+
+class TestCollapseProfiles(SimpleTestCase):
+    def test_stacks_are_summed(self):
+        """Test that the samples of all profiles are summed per stack"""
+        directory = tempfile.mkdtemp()
+        code = busy.__code__
+        save_profile(directory, {(code,): 2}, view='user:me')
+        save_profile(directory, {(code,): 3}, view='user:me')
+        save_profile(directory, {(code,): 7}, view='deposit')
+
+        out = io.StringIO()
+        call_command('collapse_profiles', directory=directory,
+                     view=['user:me'], by_view=True, stdout=out)
+        stack, count = out.getvalue().strip().rsplit(' ', 1)
+        self.assertEqual(count, '5')
+        self.assertTrue(stack.startswith('user:me;busy ('))
+
+        output = os.path.join(directory, 'stacks.txt')
+        call_command('collapse_profiles', directory=directory, output=output,
+                     stderr=io.StringIO())
+        with open(output) as file:
+            self.assertEqual(file.read().split()[-1], '12')
@@ -0,0 +1,52 @@
+import io
+import json
+import uuid
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from ..parsers import FastJSONParser
+from ..renderers import FastJSONRenderer
+
+
+class TestFastJSON(SimpleTestCase):
+    def test_render_matches_default_renderer(self):
+        """Test that the rendered data is the same as the default one"""
+        data = {'id': uuid.uuid4(), 'amount': '500.00', 'name': 'سلمان',
+                'created': timezone.now(), 'items': [1, 2.5, None, True]}
+
+        fast = json.loads(FastJSONRenderer().render(data))
+        default = json.loads(JSONRenderer().render(data))
+
+        self.assertEqual(fast, default)
+
+    def test_render_decimal_is_exact(self):
+        """Test that decimals are rendered without going through floats"""
+        data = {'balance': Decimal('12345678901234567.89')}
+        rendered = FastJSONRenderer().render(data)
+        self.assertEqual(json.loads(rendered)['balance'],
+                         '12345678901234567.89')
+
+    def test_render_escapes_line_separators(self):
+        """Test that U+2028 and U+2029 are escaped"""
+        rendered = FastJSONRenderer().render({'name': 'a b c'})
+        self.assertEqual(rendered, b'{"name":"a\\u2028b\\u2029c"}')
+
+    def test_render_indent(self):
+        """Test that an indent in the media type pretty prints"""
+        rendered = FastJSONRenderer().render(
+            {'a': 1}, 'application/json; indent=4')
+        self.assertEqual(rendered, b'{\n  "a": 1\n}')
+
+    def test_parse(self):
+        """Test that json bodies are parsed and errors are reported"""
+        parser = FastJSONParser()
+        data = parser.parse(io.BytesIO(b'{"amount": 500.1, "account": "x"}'))
+        self.assertEqual(data, {'amount': 500.1, 'account': 'x'})
+        self.assertEqual(Decimal(str(data['amount'])), Decimal('500.1'))
+
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{"amount": '))
@@ -0,0 +1,109 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase, TransactionTestCase, \
+    override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..routers import PrimaryReplicaRouter, use_primary, \
+    is_pinned_to_primary
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'], REPLICA_MAX_LAG=5)
+class TestPrimaryReplicaRouter(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        patcher = mock.patch.object(connections[DEFAULT_DB_ALIAS],
+                                    'in_atomic_block', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_read_goes_to_replica(self):
+        """Test that reads are sent to a healthy replica"""
+        with mock.patch.object(self.router, 'replica_lag', return_value=0):
+            self.assertEqual(self.router.db_for_read(None), 'replica_0')
+
+    def test_write_goes_to_primary(self):
+        """Test that writes are always sent to the primary"""
+        self.assertEqual(self.router.db_for_write(None), DEFAULT_DB_ALIAS)
+
+    def test_read_inside_atomic_goes_to_primary(self):
+        """Test that reads inside transaction.atomic stay on the primary"""
+        with mock.patch.object(connections[DEFAULT_DB_ALIAS],
+                               'in_atomic_block', True):
+            self.assertEqual(self.router.db_for_read(None), DEFAULT_DB_ALIAS)
+
+    def test_read_inside_use_primary_goes_to_primary(self):
+        """Test that use_primary pins the reads to the primary"""
+        with mock.patch.object(self.router, 'replica_lag', return_value=0):
+            with use_primary():
+                self.assertEqual(self.router.db_for_read(None),
+                                 DEFAULT_DB_ALIAS)
+            self.assertEqual(self.router.db_for_read(None), 'replica_0')
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        """Test that a replica lagging too much is not used"""
+        with mock.patch.object(self.router, 'replica_lag', return_value=60):
+            self.assertEqual(self.router.db_for_read(None), DEFAULT_DB_ALIAS)
+
+    def test_unreachable_replica_falls_back_to_primary(self):
+        """Test that a replica that can not be reached is not used"""
+        with mock.patch.object(self.router, 'replica_lag',
+                               side_effect=OperationalError):
+            self.assertEqual(self.router.db_for_read(None), DEFAULT_DB_ALIAS)
+
+    def test_replica_health_is_cached(self):
+        """Test that the lag is not checked on every read"""
+        with mock.patch.object(self.router, 'replica_lag',
+                               return_value=0) as replica_lag:
+            for _ in range(10):
+                self.router.db_for_read(None)
+        self.assertEqual(replica_lag.call_count, 1)
+
+    def test_replicas_are_not_migrated(self):
+        """Test that migrations only run on the primary"""
+        self.assertFalse(self.router.allow_migrate('replica_0', 'bank'))
+        self.assertIsNone(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'bank'))
+
+
+@override_settings(DATABASE_REPLICAS=settings.TEST_DATABASE_REPLICAS)
+class TestPrimaryReplicaDatabases(TransactionTestCase):
+    """Reads through a second connection standing in for the replica"""
+    databases = {DEFAULT_DB_ALIAS, *settings.TEST_DATABASE_REPLICAS,
+                 *settings.TEST_DATABASE_SHARDS}
+
+    def setUp(self):
+        self.replica = settings.TEST_DATABASE_REPLICAS[0]
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='test1234')
+
+    def read(self):
+        """Aliases whose connection served a read of the user"""
+        aliases = (DEFAULT_DB_ALIAS, self.replica)
+        captures = [CaptureQueriesContext(connections[alias])
+                    for alias in aliases]
+        with captures[0], captures[1]:
+            self.assertTrue(get_user_model().objects.filter(
+                pk=self.user.pk).exists())
+        return [alias for alias, capture in zip(aliases, captures)
+                if capture.captured_queries]
+
+    def test_read_hits_the_replica(self):
+        """Test that a committed row is read from the replica"""
+        self.assertEqual(self.read(), [self.replica])
+
+    def test_read_inside_atomic_hits_the_primary(self):
+        """Test that a transaction on the primary pins its reads"""
+        with transaction.atomic():
+            self.assertEqual(self.read(), [DEFAULT_DB_ALIAS])
+        self.assertEqual(self.read(), [self.replica])
+
+    def test_atomic_pins_its_own_database(self):
+        """Test that a transaction pins the database it is opened on"""
+        shard = settings.TEST_DATABASE_SHARDS[0]
+        with transaction.atomic(using=shard):
+            self.assertTrue(is_pinned_to_primary(shard))
+            self.assertFalse(is_pinned_to_primary(DEFAULT_DB_ALIAS))
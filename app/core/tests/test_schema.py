@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from .. import schema
+
+
+class TestSchema(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.schema_file = os.path.join(directory.name, 'openapi.json')
+        settings_override = override_settings(API_SCHEMA_FILE=self.schema_file)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        schema.clear_cache()
+        self.addCleanup(schema.clear_cache)
+
+    def test_schema_is_generated_once(self):
+        """Test that the views are introspected only on the first request"""
+        with mock.patch.object(schema, 'generate_schema',
+                               wraps=schema.generate_schema) as generate:
+            for _ in range(3):
+                response = self.client.get('/swagger.json')
+                self.assertEqual(response.status_code, 200)
+            self.client.get('/swagger.yaml')
+
+        self.assertEqual(generate.call_count, 1)
+        self.assertIn('/bank/deposit/{id}/', response.json()['paths'])
+        self.assertTrue(os.path.exists(self.schema_file))
+
+    def test_conditional_get(self):
+        """Test that a matching ETag is answered with 304"""
+        response = self.client.get('/swagger.json')
+        etag = response['ETag']
+
+        response = self.client.get('/swagger.json', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_schema_file_is_reused(self):
+        """Test that a schema file of the same URLconf is not regenerated"""
+        fingerprint = schema.urlconf_fingerprint()
+        with open(self.schema_file, 'w') as schema_file:
+            json.dump({'paths': {}, schema.FINGERPRINT_KEY: fingerprint},
+                      schema_file)
+
+        with mock.patch.object(schema, 'generate_schema') as generate:
+            response = self.client.get('/swagger.json')
+
+        generate.assert_not_called()
+        self.assertEqual(response.json()['paths'], {})
+
+    def test_schema_file_of_other_urlconf_is_regenerated(self):
+        """Test that the schema is generated again when the urls change"""
+        with open(self.schema_file, 'w') as schema_file:
+            json.dump({'paths': {}, schema.FINGERPRINT_KEY: 'old'},
+                      schema_file)
+
+        response = self.client.get('/swagger.json')
+
+        self.assertNotEqual(response.json()['paths'], {})
+        with open(self.schema_file) as schema_file:
+            self.assertEqual(json.load(schema_file)[schema.FINGERPRINT_KEY],
+                             schema.urlconf_fingerprint())
@@ -0,0 +1,63 @@
+import os
+import runpy
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from ..management.commands.bench_startup import parse_importtime
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   _io
+import time:        50 |        150 | io
+import time:       300 |        300 |     django.utils.version
+import time:       200 |        500 |   django.utils
+import time:        40 |        540 | django
+"""
+
+
+class TestBenchStartup(SimpleTestCase):
+    def test_parse_importtime(self):
+        """Test that only top level imports add up to the total"""
+        total, packages = parse_importtime(IMPORTTIME)
+        self.assertEqual(total, 690)
+        self.assertEqual(packages['django'], 540)
+        self.assertEqual(packages['_io'], 100)
+
+
+class TestServerConfig(SimpleTestCase):
+    def load(self, **env):
+        with mock.patch.dict(os.environ, env):
+            return runpy.run_path(os.path.join(settings.BASE_DIR, 'config',
+                                               'gunicorn.py'))
+
+    def test_modes(self):
+        """Test that each mode picks its workers and application"""
+        with mock.patch('multiprocessing.cpu_count', return_value=4):
+            sync = self.load(SERVER_MODE='sync')
+            threaded = self.load(SERVER_MODE='threaded', GUNICORN_THREADS='8')
+            asgi = self.load(SERVER_MODE='asgi', WEB_CONCURRENCY='3')
+
+        self.assertEqual((sync['worker_class'], sync['workers']), ('sync', 9))
+        self.assertEqual((threaded['worker_class'], threaded['workers'],
+                          threaded['threads']), ('gthread', 4, 8))
+        self.assertEqual((asgi['wsgi_app'], asgi['workers']),
+                         ('config.asgi:application', 3))
+        self.assertTrue(sync['preload_app'])
+
+    def test_unknown_mode(self):
+        """Test that an unknown SERVER_MODE stops the server"""
+        with self.assertRaises(RuntimeError):
+            self.load(SERVER_MODE='eventlet')
+
+    def test_workers_warm_the_fraud_engine(self):
+        """Test that a forked worker builds the fraud engine before serving"""
+        server = mock.Mock()
+        with mock.patch('bank.fraud.get_engine') as get_engine:
+            self.load()['post_fork'](server, mock.Mock())
+            get_engine.assert_called_once_with()
+
+            get_engine.side_effect = OSError
+            self.load()['post_fork'](server, mock.Mock())
+            server.log.exception.assert_called_once()
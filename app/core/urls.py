@@ -0,0 +1,26 @@
+from django.conf.urls import url
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+
+from .schema import api_info
+from .views import openapi_schema
+
+schema_view = get_schema_view(
+    api_info(),
+    public=True,
+    permission_classes=[permissions.AllowAny],
+)
+
+urlpatterns = [
+    url(r'^swagger(?P<format>\.json|\.yaml)$',
+        openapi_schema,
+        name='schema-json'),
+
+    url(r'^swagger/$',
+        schema_view.with_ui('swagger', cache_timeout=0),
+        name='schema-swagger-ui'),
+
+    url(r'^redoc/$',
+        schema_view.with_ui('redoc', cache_timeout=0),
+        name='schema-redoc'),
+]
@@ -0,0 +1,107 @@
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_cache_control, get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+from django.views.decorators.http import condition, require_safe
+
+from . import health, schema
+
+CONTENT_TYPES = {
+    '.json': 'application/json',
+    '.yaml': 'application/yaml',
+}
+
+
+def _schema_etag(request, format):
+    return schema.get_schema(format)[1]
+
+
+@require_safe
+@condition(etag_func=_schema_etag)
+def openapi_schema(request, format):
+    """
+        Serve the precomputed API schema, clients sending the ETag back get
+        a 304 response without a body
+    """
+    content, _ = schema.get_schema(format)
+    response = HttpResponse(content, content_type=CONTENT_TYPES[format])
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def _probe_response(checks):
+    ready = not any(checks.values())
+    response = JsonResponse({
+        'status': 'ok' if ready else 'unavailable',
+        'checks': {name: error or 'ok' for name, error in checks.items()},
+    }, status=200 if ready else 503)
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+@require_safe
+def healthz(request):
+    """
+        Liveness probe, it only tells that the process serves requests so
+        an outage of the database does not get the workers restarted
+    """
+    return _probe_response({})
+
+
+@require_safe
+def readyz(request):
+    """
+        Readiness probe, the database, the migrations and the caches are
+        checked with the results cached by core.health
+    """
+    return _probe_response(health.readiness())
+
+
+class ConditionalRetrieveMixin:
+    """
+        Mixin for retrieve views answering conditional GETs. The ETag and
+        Last-Modified come from the ``updated`` column of the object so a
+        304 is sent without serializing it. When cache_prefix is set the
+        serialized data is cached until the ETag changes
+    """
+    version_field = 'updated'
+    cache_prefix = None
+    cache_timeout = None
+
+    def get_version(self, instance):
+        return getattr(instance, self.version_field)
+
+    def get_etag(self, instance):
+        version = self.get_version(instance)
+        return quote_etag(f'{instance.pk}-{version.timestamp():f}')
+
+    def get_cache_key(self, pk):
+        return f'{self.cache_prefix}:{pk}'
+
+    def get_data(self, instance, etag):
+        """Serialized instance, it is taken from the cache when possible"""
+        if not self.cache_prefix:
+            return self.get_serializer(instance).data
+        key = self.get_cache_key(instance.pk)
+        cached = cache.get(key)
+        if cached and cached[0] == etag:
+            return cached[1]
+        data = self.get_serializer(instance).data
+        cache.set(key, (etag, data), self.cache_timeout)
+        return data
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = self.get_etag(instance)
+        last_modified = int(self.get_version(instance).timestamp())
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = Response(self.get_data(instance, etag))
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response